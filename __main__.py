@@ -21,6 +21,11 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    # Аргументы командной строки — режим без GUI
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
     try:
         from PyQt6.QtWidgets import QApplication
         from gui import MainWindow
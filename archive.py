@@ -0,0 +1,213 @@
+"""
+Офлайн-архив руководства: исходный HTML + все изображения
+
+Формат — zip:
+  manifest.json   — URL, метаданные загрузки, версия программы, индекс картинок
+  page.html.z     — HTML, сжатый zlib со словарём под разметку Steam
+  media/<sha256>  — изображения как есть (уже сжаты — ZIP_STORED)
+
+render_archive() пересобирает DOCX из архива без единого сетевого запроса.
+"""
+
+import json
+import time
+import zlib
+import hashlib
+import logging
+import zipfile
+import dataclasses
+from io import BytesIO
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import requests
+
+from about import APP_VERSION
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXT = ".guide.zip"
+ARCHIVE_FORMAT = 1
+HTML_CODEC = "zlib-steam-1"
+
+# Предустановленный словарь zlib: частые фрагменты страниц Steam.
+# Самые частые — ближе к концу (ближе к окну при сжатии).
+# Менять нельзя без смены HTML_CODEC — старые архивы не прочитаются.
+STEAM_ZDICT = (
+    '<!DOCTYPE html><html class=" responsive" lang="en"><head>'
+    '<meta http-equiv="Content-Type" content="text/html; charset=UTF-8">'
+    '<meta name="viewport" content="width=device-width,initial-scale=1">'
+    '<link href="https://community.akamai.steamstatic.com/public/shared/css/'
+    'motiva_sans.css?v=" rel="stylesheet" type="text/css" >'
+    '<script type="text/javascript" src="https://community.akamai.steamstatic.com'
+    '/public/javascript/"></script>'
+    '<script type="text/javascript">$J( function() { '
+    '<div class="commentthread_comment responsive_body_text" id="comment_">'
+    '<div class="commentthread_comment_avatar playerAvatar online">'
+    '<div class="commentthread_comment_content"><div class="commentthread_comment_author">'
+    '<a class="hoverunderline commentthread_author_link" href="https://steamcommunity.com/id/"'
+    ' data-miniprofile=""><bdi></bdi></a>'
+    '<span class="commentthread_comment_timestamp" title="" data-timestamp="">'
+    '<div class="commentthread_comment_text" id="comment_content_">'
+    '<div class="rightDetailsBlock"><div class="detailsStatsContainerRight">'
+    '<div class="detailsStatRight">'
+    '<div class="workshopItemTitle"></div>'
+    '<div class="guideTopDescription">'
+    '<div class="guide subSections" id="guideContent">'
+    '<div class="subSection detailBox" id="">'
+    '<div class="subSectionTitle"></div>'
+    '<div class="subSectionDesc">'
+    '<a class="bb_link" href="https://steamcommunity.com/linkfilter/?u=" '
+    'target="_blank" rel=" noopener" >'
+    '<img src="https://images.steamusercontent.com/ugc/" >'
+    '<img src="https://steamuserimages-a.akamaihd.net/ugc/" >'
+    '<div class="bb_table"><div class="bb_table_tr">'
+    '<div class="bb_table_th"></div><div class="bb_table_td"></div>'
+    '<ul class="bb_ul"><li></li></ul><ol><li></li></ol>'
+    '<blockquote class="bb_blockquote"><div class="quoteauthor"></div></blockquote>'
+    '<div class="bb_code"></div><span class="bb_spoiler"><span></span></span>'
+    '<div class="bb_h1"></div><div class="bb_h2"></div><div class="bb_h3"></div>'
+    '<span class="bb_strike"></span><b></b><i></i><u></u>'
+    '</div></div><br><br>\n\t\t\t\t\t\t\t'
+).encode("utf-8")
+
+
+def compress_html(html: str) -> bytes:
+    c = zlib.compressobj(level=9, zdict=STEAM_ZDICT)
+    return c.compress(html.encode("utf-8")) + c.flush()
+
+
+def decompress_html(blob: bytes) -> str:
+    d = zlib.decompressobj(zdict=STEAM_ZDICT)
+    return (d.decompress(blob) + d.flush()).decode("utf-8")
+
+
+@dataclass
+class GuideArchive:
+    url: str
+    html: str
+    images: dict[str, bytes] = field(default_factory=dict)
+    meta: dict = field(default_factory=dict)
+
+
+def write_archive(path: str, archive: GuideArchive):
+    index = {}
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("page.html.z", compress_html(archive.html),
+                    compress_type=zipfile.ZIP_STORED)
+        written = set()
+        for url, blob in archive.images.items():
+            name = "media/" + hashlib.sha256(blob).hexdigest()
+            if name not in written:
+                zf.writestr(name, blob, compress_type=zipfile.ZIP_STORED)
+                written.add(name)
+            index[url] = name
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "app_version": APP_VERSION,
+            "url": archive.url,
+            "html_codec": HTML_CODEC,
+            "created": time.time(),
+            "fetch": archive.meta,
+            "images": index,
+        }
+        zf.writestr("manifest.json",
+                    json.dumps(manifest, ensure_ascii=False, indent=1),
+                    compress_type=zipfile.ZIP_DEFLATED)
+
+
+def read_archive(path: str) -> GuideArchive:
+    with zipfile.ZipFile(path, "r") as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        if manifest.get("html_codec") != HTML_CODEC:
+            raise ValueError(f"Unsupported archive codec: {manifest.get('html_codec')}")
+        html = decompress_html(zf.read("page.html.z"))
+        blobs = {}
+        images = {}
+        for url, name in manifest.get("images", {}).items():
+            if name not in blobs:
+                blobs[name] = zf.read(name)
+            images[url] = blobs[name]
+    return GuideArchive(manifest["url"], html, images, manifest)
+
+
+# ==========================================
+# Запись картинок при загрузке / выдача при рендере
+# ==========================================
+
+class RecordingImageCache:
+    """Прокси к кешу изображений, запоминающий все выданные картинки"""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.images: dict[str, bytes] = {}
+
+    def get(self, url: str) -> Optional[BytesIO]:
+        data = self._inner.get(url)
+        if data is not None and url not in self.images:
+            self.images[url] = data.getvalue()
+        return data
+
+    def put(self, url: str, data: BytesIO):
+        self.images[url] = data.getvalue()
+        self._inner.put(url, data)
+
+    def clear(self):
+        self._inner.clear()
+
+    @property
+    def stats(self) -> str:
+        return self._inner.stats
+
+
+class ArchiveImageCache:
+    """Кеш только для чтения поверх картинок архива"""
+
+    def __init__(self, images: dict[str, bytes]):
+        self._images = images
+        self._misses = 0
+
+    def get(self, url: str) -> Optional[BytesIO]:
+        blob = self._images.get(url)
+        if blob is None:
+            self._misses += 1
+            return None
+        return BytesIO(blob)
+
+    def put(self, url: str, data: BytesIO):
+        pass
+
+    def clear(self):
+        pass
+
+    @property
+    def stats(self) -> str:
+        return f"Archive: {len(self._images)} images, miss={self._misses}"
+
+
+class OfflineSession:
+    """Сессия, запрещающая сеть: любая загрузка — ConnectionError"""
+
+    headers: dict = {}
+
+    def get(self, url, *args, **kwargs):
+        raise requests.ConnectionError(f"Offline: {url}")
+
+
+def render_archive(config: AppConfig, path: str, save_dir: str,
+                   lang_code: str, log_func: Callable,
+                   convert_pdf: bool = False):
+    """Собрать DOCX (и PDF) из архива без сети"""
+    from parser import GuideDownloader
+
+    archive = read_archive(path)
+    offline_config = dataclasses.replace(config, write_archive=False)
+    downloader = GuideDownloader(
+        offline_config, session=OfflineSession(),
+        image_cache=ArchiveImageCache(archive.images),
+    )
+    return downloader.download(
+        archive.url, save_dir, lang_code, log_func,
+        lambda: None, convert_pdf, html=archive.html,
+    )
@@ -0,0 +1,142 @@
+"""
+Пакетная выгрузка в нескольких процессах
+
+Разбор HTML и сборка DOCX — чистый Python, поэтому потоки упираются в GIL.
+Руководства раздаются пулу процессов; у каждого процесса своя сессия,
+кеш изображений и корзины ограничителя запросов общие — в SQLite (WAL).
+Строки лога и результаты возвращаются координатору. Телеметрия
+руководств сводится в перцентили (и пишется рядом с telemetry_file, если он задан).
+"""
+
+import os
+import json
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import Callable, Optional
+
+from config import AppConfig
+from network import HostRateLimiter, SQLiteImageCache
+from parser import GuideDownloader, DownloadResult
+from telemetry import format_summary, summarize, summary_path
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = ".image_cache.sqlite"
+RATE_FILE = ".rate_limit.sqlite"
+
+# Состояние процесса-воркера
+_downloader: Optional[GuideDownloader] = None
+_log_queue = None
+
+
+def _init_worker(config: AppConfig, cache_path: str, log_queue):
+    global _downloader, _log_queue
+    _log_queue = log_queue
+    _downloader = GuideDownloader(
+        config, image_cache=SQLiteImageCache(cache_path)
+    )
+
+
+def _download_one(url: str, save_dir: str, convert_pdf: bool) -> DownloadResult:
+    log = lambda msg: _log_queue.put((url, msg))
+    return _downloader.download(
+        url, save_dir, _downloader.config.language,
+        log, lambda: None, convert_pdf,
+    )
+
+
+def _start_method() -> str:
+    # Не fork: к моменту запуска воркеров у координатора уже есть потоки
+    # (BatchLog, feeder очереди, потоки логирования), и fork копирует
+    # захваченные ими блокировки — редкие зависания воркеров.
+    # forkserver форкает из чистого однопоточного процесса
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def default_processes(config: AppConfig) -> int:
+    return config.batch_processes or os.cpu_count() or 1
+
+
+def run_batch(config: AppConfig, urls: list[str], save_dir: str,
+              processes: Optional[int] = None,
+              log_func: Optional[Callable] = None,
+              cache_path: Optional[str] = None) -> list[DownloadResult]:
+    """Выгрузить список руководств; результаты в порядке завершения"""
+    log_func = log_func or (lambda msg: None)
+    processes = max(1, min(processes or default_processes(config), len(urls) or 1))
+    os.makedirs(save_dir, exist_ok=True)
+    cache_path = cache_path or os.path.join(save_dir, CACHE_FILE)
+    # Создаём схему заранее, чтобы воркеры не соревновались за неё,
+    # и закрываем соединение: воркерам оно не нужно
+    SQLiteImageCache(cache_path).close()
+    # Лимит скорости — на весь пакет, а не на каждый процесс
+    if not config.rate_limit_file:
+        config = replace(config, rate_limit_file=os.path.join(save_dir, RATE_FILE))
+    limiter = HostRateLimiter.from_config(config)
+    if limiter is not None:
+        limiter.close()
+
+    ctx = multiprocessing.get_context(_start_method())
+    log_queue = ctx.Queue()
+
+    def drain():
+        while True:
+            item = log_queue.get()
+            if item is None:
+                break
+            url, msg = item
+            log_func(f"[{url.rsplit('=', 1)[-1]}] {msg}")
+
+    drainer = threading.Thread(target=drain, daemon=True, name="BatchLog")
+    drainer.start()
+
+    results = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(config, cache_path, log_queue),
+        ) as pool:
+            futures = {
+                pool.submit(_download_one, url, save_dir,
+                            config.convert_to_pdf): url
+                for url in urls
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"Пакет: {url}: {e}")
+                    results.append(DownloadResult(url))
+    finally:
+        log_queue.put(None)
+        drainer.join(timeout=5)
+
+    ok = sum(1 for r in results if r.ok)
+    logger.info(f"Пакет: {ok}/{len(results)} успешно, процессов: {processes}")
+    report_telemetry(config, results, log_func)
+    return results
+
+
+def report_telemetry(config: AppConfig, results: list[DownloadResult],
+                     log_func: Callable) -> Optional[dict]:
+    """Сводка p50/p95/p99 по записям телеметрии пакета"""
+    records = [r.telemetry for r in results if r.telemetry]
+    if not records:
+        return None
+    summary = summarize(records)
+    for line in format_summary(summary).splitlines():
+        log_func(line)
+    if config.telemetry_file:
+        path = summary_path(config.telemetry_file)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"Телеметрия: {e}")
+    return summary
@@ -0,0 +1 @@
+"""Замеры производительности (не входят в тесты)"""
@@ -0,0 +1,98 @@
+"""
+Замер обхода дерева в DocxBuilder на патологических страницах
+
+Запуск: python -m benchmarks.bench_builder [--parser lxml-native] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import zipfile
+import argparse
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from docx_builder import DocxBuilder, register_character_styles
+from ooxml_builder import OoxmlDocxBuilder
+from html_backends import parse_guide
+from benchmarks.synthetic import (
+    deep_page, links_page, many_text_page, span_soup_page, styled_page,
+    table_page,
+)
+
+BUILDERS = {"python-docx": DocxBuilder, "ooxml": OoxmlDocxBuilder}
+
+CASES = {
+    "deep_2000": lambda: deep_page(2000),
+    "text_100k": lambda: many_text_page(100_000),
+    "span_soup": lambda: span_soup_page(30_000),
+    "styled": lambda: styled_page(5_000),
+    "table_200x10": lambda: table_page(200, 10),
+    "links_2000": lambda: links_page(2000, 1500),
+}
+
+
+def bench_case(html: str, parser: str, repeat: int, styles: bool = True,
+               builder_cls=DocxBuilder) -> dict:
+    best = None
+    best_save = None
+    stats = None
+    xml_size = 0
+    for _ in range(repeat):
+        regions = parse_guide(html, parser)
+        doc = Document()
+        if styles:
+            register_character_styles(doc)
+        builder = builder_cls(doc)
+        start = time.perf_counter()
+        for sec in regions.sections:
+            builder.process_node(sec.desc)
+            builder.close_paragraph()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        stats = builder.stats
+
+        buf = BytesIO()
+        start = time.perf_counter()
+        doc.save(buf)
+        elapsed = time.perf_counter() - start
+        best_save = elapsed if best_save is None else min(best_save, elapsed)
+        with zipfile.ZipFile(buf) as zf:
+            xml_size = zf.getinfo("word/document.xml").file_size
+    return {
+        "seconds": round(best, 4),
+        "save_seconds": round(best_save, 4),
+        "document_xml": xml_size,
+        "nodes": stats.nodes_visited,
+        "nodes_per_sec": int(stats.nodes_visited / best) if best else 0,
+        "paragraphs": stats.paragraphs,
+        "runs": stats.runs,
+        "skipped": stats.subtrees_skipped,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--parser", default="auto")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--direct-formatting", action="store_true",
+                    help="без стилей символов (прямое форматирование run-ов)")
+    ap.add_argument("--case", choices=sorted(CASES), action="append")
+    ap.add_argument("--backend", choices=sorted(BUILDERS), action="append",
+                    help="по умолчанию — оба")
+    args = ap.parse_args(argv)
+    for name in args.case or CASES:
+        html = CASES[name]()
+        for backend in args.backend or BUILDERS:
+            result = bench_case(html, args.parser, args.repeat,
+                                styles=not args.direct_formatting,
+                                builder_cls=BUILDERS[backend])
+            print(f"{name:12s} {backend:12s} "
+                  + " ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
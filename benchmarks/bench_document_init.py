@@ -0,0 +1,48 @@
+"""
+Стоимость подготовки документа на одно руководство:
+Document() + _setup_styles против копии заготовки (new_document)
+
+Запуск: python -m benchmarks.bench_document_init [--count 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from parser import GuideDownloader
+
+
+def fresh_document():
+    doc = Document()
+    GuideDownloader._setup_styles(doc)
+    return doc
+
+
+def bench(make, count: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(count):
+        make()
+    total = time.perf_counter() - start
+    return {"ms_per_doc": round(total / count * 1000, 2),
+            "docs_per_sec": int(count / total)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--count", type=int, default=200)
+    args = ap.parse_args(argv)
+    # Первая копия собирает заготовку — в замер не входит
+    GuideDownloader.new_document()
+    for name, make in (("fresh", fresh_document),
+                       ("template", GuideDownloader.new_document)):
+        result = bench(make, args.count)
+        print(f"{name:10s} " + " ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
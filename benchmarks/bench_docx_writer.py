@@ -0,0 +1,118 @@
+"""
+Пик памяти и время сохранения DOCX с большим числом картинок:
+doc.save() против потоковой записи (docx_writer), затем только
+стадия сохранения — doc.save() против StreamingDocxWriter.save()
+с картинками без пережатия и разными уровнями deflate для XML
+
+Запуск: python -m benchmarks.bench_docx_writer [--images 100] [--size 512]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from PIL import Image
+
+from docx_writer import StreamingDocxWriter
+from ooxml_builder import OoxmlDocxBuilder
+from html_backends import parse_guide
+from benchmarks.synthetic import image_page
+
+
+def noise_loader(size: int, fmt: str = "PNG"):
+    """Загрузчик картинок: шумная картинка (почти не сжимается) по URL"""
+    def load(url, session=None, config=None, cache=None):
+        rng = random.Random(url)
+        img = Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+        buf = BytesIO()
+        if fmt == "PNG":
+            img.save(buf, "PNG", compress_level=0)
+        else:
+            img.save(buf, fmt)
+        buf.seek(0)
+        return buf
+    return load
+
+
+def run(html: str, size: int, stream: bool, path: str) -> dict:
+    regions = parse_guide(html)
+    tracemalloc.start()
+    start = time.perf_counter()
+    doc = Document()
+    writer = StreamingDocxWriter(path) if stream else None
+    if writer is not None:
+        writer.attach(doc)
+    builder = OoxmlDocxBuilder(doc, image_loader=noise_loader(size))
+    for sec in regions.sections:
+        builder.process_node(sec.desc)
+        builder.close_paragraph()
+    built = time.perf_counter()
+    if writer is not None:
+        writer.save(doc)
+    else:
+        doc.save(path)
+    done = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "build_seconds": round(built - start, 3),
+        "save_seconds": round(done - built, 3),
+        "peak_mb": round(peak / 2**20, 1),
+        "file_mb": round(os.path.getsize(path) / 2**20, 1),
+    }
+
+
+def bench_save(html: str, size: int, fmt: str, path: str) -> list:
+    """Только стадия сохранения: один и тот же документ разными способами"""
+    regions = parse_guide(html)
+    doc = Document()
+    builder = OoxmlDocxBuilder(doc, image_loader=noise_loader(size, fmt))
+    for sec in regions.sections:
+        builder.process_node(sec.desc)
+        builder.close_paragraph()
+
+    def timed(save):
+        start = time.perf_counter()
+        save()
+        return {
+            "save_seconds": round(time.perf_counter() - start, 3),
+            "file_mb": round(os.path.getsize(path) / 2**20, 2),
+        }
+
+    results = [("doc.save", timed(lambda: doc.save(path)))]
+    for level in (1, 6, 9):
+        writer = StreamingDocxWriter(path, compress_level=level)
+        results.append((f"stored+z{level}", timed(lambda: writer.save(doc))))
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--images", type=int, default=100)
+    ap.add_argument("--size", type=int, default=512, help="сторона картинки, px")
+    ap.add_argument("--format", default="JPEG", choices=["JPEG", "PNG"],
+                    help="формат картинок для замера сохранения")
+    args = ap.parse_args(argv)
+    html = image_page(args.images)
+    with tempfile.TemporaryDirectory() as tmp:
+        print("# build + save, PNG")
+        for stream in (False, True):
+            name = "streaming" if stream else "doc.save"
+            result = run(html, args.size, stream, os.path.join(tmp, f"{name}.docx"))
+            print(f"{name:12s} " + " ".join(f"{k}={v}" for k, v in result.items()))
+        print(f"# save only, {args.format}")
+        path = os.path.join(tmp, "save.docx")
+        for name, result in bench_save(html, args.size, args.format, path):
+            print(f"{name:12s} " + " ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Набор замеров по руководствам из benchmarks.fixtures
+
+  parse  — разбор страницы (parse_guide)
+  build  — сборка документа (картинки — из памяти, без сети)
+  save   — запись DOCX
+  e2e    — одно руководство целиком через локальный сервер
+           (benchmarks.steam_server) с задержкой и ограничением скорости
+  batch  — пропускная способность пакетного режима (run_batch);
+           с --scaling 1,2,4,8 — по прогону на каждое число процессов
+           (batch/pN) и эффективность относительно первого
+
+Запуск: python -m benchmarks.bench_suite [--bench e2e] [--fixture huge]
+        [--repeat 5] [--latency 0.02] [--bandwidth 5e6] [--out results.json]
+        python -m benchmarks.bench_suite --bench batch --scaling 1,2,4,8,16,32
+
+В JSON сохраняются все выборки, а не только медианы —
+версии сравнивает benchmarks.compare. Пик памяти сборки
+(peak_bytes) снимается отдельным прогоном под tracemalloc.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AppConfig, DOCX_BACKENDS, HTML_PARSERS
+from docx_builder import DocxBuilder
+from docx_writer import StreamingDocxWriter
+from html_backends import parse_guide
+from ooxml_builder import OoxmlDocxBuilder
+from parser import GuideDownloader
+from benchmarks.fixtures import image_loader, load_fixtures, numbered_copy
+from benchmarks.steam_server import StandInServer
+
+BENCHES = ("parse", "build", "save", "e2e", "batch")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_parse(html: str, config: AppConfig, repeat: int) -> dict:
+    return {"seconds": [
+        _timed(lambda: parse_guide(html, config.html_parser,
+                                   partial=config.partial_parse))
+        for _ in range(repeat)
+    ]}
+
+
+def _build(html: str, config: AppConfig, loader, path: str):
+    """Сборка как в GuideDownloader, но без сети и журнала"""
+    regions = parse_guide(html, config.html_parser, partial=config.partial_parse)
+    start = time.perf_counter()
+    doc = GuideDownloader.new_document()
+    doc.add_heading(regions.title, 0)
+    writer = StreamingDocxWriter(path, config.docx_compress_level)
+    if config.stream_docx:
+        writer.attach(doc)
+    builder_cls = OoxmlDocxBuilder if config.docx_backend == "ooxml" else DocxBuilder
+    builder = builder_cls(doc, config=config, image_loader=loader)
+    nodes = [s.desc for s in regions.sections if s.desc is not None]
+    if not nodes and regions.content is not None:
+        nodes = [regions.content]
+    for node in nodes:
+        builder.process_node(node)
+        builder.close_paragraph()
+    built = time.perf_counter() - start
+    save = _timed(lambda: writer.save(doc))
+    return built, save
+
+
+def bench_build_save(html: str, config: AppConfig, repeat: int,
+                     tmp: str) -> tuple[dict, dict]:
+    loader = image_loader()
+    path = os.path.join(tmp, "bench.docx")
+    # Прогрев: картинки-заглушки и заготовка документа создаются один раз
+    _build(html, config, loader, path)
+    build, save = [], []
+    for _ in range(repeat):
+        built, saved = _build(html, config, loader, path)
+        build.append(built)
+        save.append(saved)
+    # Пик памяти — отдельным прогоном: tracemalloc искажает время
+    tracemalloc.start()
+    _build(html, config, loader, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ({"seconds": build, "peak_bytes": [peak]},
+            {"seconds": save, "docx_bytes": [os.path.getsize(path)]})
+
+
+def bench_e2e(server: StandInServer, name: str, config: AppConfig,
+              repeat: int, tmp: str) -> dict:
+    metrics = {"seconds": []}
+    for n in range(repeat):
+        # Новый загрузчик — холодный кеш картинок на каждый прогон
+        downloader = GuideDownloader(config)
+        out = os.path.join(tmp, f"e2e-{name}-{n}")
+        start = time.perf_counter()
+        result = downloader.download(server.page_url(name), out, "en",
+                                     lambda msg: None, lambda: None)
+        metrics["seconds"].append(time.perf_counter() - start)
+        if not result.ok:
+            raise RuntimeError(f"e2e {name}: загрузка не удалась")
+        for stage, values in result.telemetry["stages"].items():
+            metrics.setdefault(f"{stage}_seconds", []).append(values["wall"])
+        shutil.rmtree(out, ignore_errors=True)
+    return metrics
+
+
+def bench_batch(server: StandInServer, names: list[str], config: AppConfig,
+                repeat: int, copies: int, processes: int, tmp: str) -> dict:
+    from batch import run_batch
+    urls = [server.page_url(f"{name}~{n}") for name in names for n in range(copies)]
+    metrics = {"seconds": [], "guides_per_sec": []}
+    for n in range(repeat):
+        out = os.path.join(tmp, f"batch-{n}")
+        start = time.perf_counter()
+        results = run_batch(config, urls, out, processes=processes)
+        elapsed = time.perf_counter() - start
+        if not all(r.ok for r in results):
+            raise RuntimeError(f"batch p{processes}: не все руководства выгружены")
+        metrics["seconds"].append(elapsed)
+        metrics["guides_per_sec"].append(len(urls) / elapsed)
+        shutil.rmtree(out, ignore_errors=True)
+    return metrics
+
+
+def scaling_efficiency(results: dict) -> dict[int, float]:
+    """
+    batch/pN → доля идеального линейного роста относительно
+    наименьшего N: (скорость_N / скорость_min) / (N / min)
+    """
+    rates = {
+        int(name[len("batch/p"):]): statistics.median(metrics["guides_per_sec"])
+        for name, metrics in results.items() if name.startswith("batch/p")
+    }
+    if not rates:
+        return {}
+    base = min(rates)
+    return {n: rates[n] / rates[base] / (n / base) for n in sorted(rates)}
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(benches, pages: dict[str, str], config: AppConfig,
+              repeat: int = 5, latency: float = 0.0, bandwidth: float = 0,
+              copies: int = 4, processes: int = 0,
+              scaling: tuple[int, ...] = ()) -> dict:
+    """Прогнать замеры; результат — словарь для JSON"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, html in pages.items():
+            if "parse" in benches:
+                results[f"parse/{name}"] = bench_parse(html, config, repeat)
+            if "build" in benches or "save" in benches:
+                build, save = bench_build_save(html, config, repeat, tmp)
+                if "build" in benches:
+                    results[f"build/{name}"] = build
+                if "save" in benches:
+                    results[f"save/{name}"] = save
+        if "e2e" in benches or "batch" in benches:
+            # Копии для пакета — каждая со своим заголовком и файлом
+            served = dict(pages)
+            served.update({
+                f"{name}~{n}": numbered_copy(html, n)
+                for name, html in pages.items() for n in range(copies)
+            })
+            with StandInServer(served, latency, bandwidth) as server:
+                if "e2e" in benches:
+                    for name in pages:
+                        results[f"e2e/{name}"] = bench_e2e(
+                            server, name, config, repeat, tmp)
+                if "batch" in benches and scaling:
+                    for n in scaling:
+                        results[f"batch/p{n}"] = bench_batch(
+                            server, list(pages), config, repeat, copies, n, tmp)
+                elif "batch" in benches:
+                    results["batch/all"] = bench_batch(
+                        server, list(pages), config, repeat, copies,
+                        processes, tmp)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "latency": latency,
+            "bandwidth": bandwidth,
+            "html_parser": config.html_parser,
+            "docx_backend": config.docx_backend,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--bench", choices=BENCHES, action="append",
+                    help="по умолчанию — все")
+    ap.add_argument("--fixture", action="append", help="по умолчанию — все")
+    ap.add_argument("--fixtures-dir", default="",
+                    help="замороженный набор *.html (benchmarks.fixtures --write)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.0, help="секунды")
+    ap.add_argument("--bandwidth", type=float, default=0, help="байт/с")
+    ap.add_argument("--copies", type=int, default=4,
+                    help="копий каждого руководства в пакете")
+    ap.add_argument("--processes", type=int, default=0)
+    ap.add_argument("--scaling", default="",
+                    help="числа процессов для batch через запятую: 1,2,4,8")
+    ap.add_argument("--parser", default="auto", choices=HTML_PARSERS)
+    ap.add_argument("--backend", default="ooxml", choices=DOCX_BACKENDS)
+    ap.add_argument("--out", default="", help="файл JSON с результатами")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    pages = load_fixtures(args.fixtures_dir)
+    if args.fixture:
+        pages = {name: pages[name] for name in args.fixture}
+    config = AppConfig(html_parser=args.parser, docx_backend=args.backend,
+                       batch_processes=args.processes)
+    scaling = tuple(int(n) for n in args.scaling.split(",") if n)
+    report = run_suite(args.bench or BENCHES, pages, config, args.repeat,
+                       args.latency, args.bandwidth, args.copies, args.processes,
+                       scaling)
+    for name, metrics in report["results"].items():
+        print(f"{name:24s} " + " ".join(
+            f"{metric}={statistics.median(values):.4g}"
+            for metric, values in metrics.items()
+        ))
+    efficiency = scaling_efficiency(report["results"])
+    if efficiency:
+        report["meta"]["scaling_efficiency"] = efficiency
+        print("эффективность: " + ", ".join(
+            f"p{n}={value:.0%}" for n, value in efficiency.items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"→ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Сравнение двух прогонов bench_suite — порог регрессий
+
+Для каждой метрики берутся медиана и MAD выборок. Регрессия — если
+медиана ухудшилась сильнее порога метрики И сдвиг больше шума:
+|Δ| > NOISE_K · 1.4826 · (MAD_base + MAD_new), и не меньше min_delta
+(микросекундные замеры не валят проверку).
+Размер DOCX и пик памяти детерминированы (MAD = 0) — там только порог.
+
+Запуск:
+  python -m benchmarks.compare base.json new.json
+  python -m benchmarks.compare base.json --run [--bench parse] [--latency 0.02]
+  python -m benchmarks.compare base.json new.json --threshold "e2e/*:seconds=0.3"
+Код выхода 1 — есть регрессии.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+from dataclasses import dataclass, replace
+from fnmatch import fnmatchcase
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# MAD → σ для нормального шума
+MAD_SCALE = 1.4826
+NOISE_K = 3.0
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Порог для метрик «замер/руководство:метрика» (шаблон fnmatch)"""
+    pattern: str
+    threshold: float
+    higher_is_better: bool = False
+    # Меньший сдвиг медианы не считается регрессией (единицы метрики)
+    min_delta: float = 0.0
+
+
+# Первое совпадение побеждает; метрики без правила не проверяются
+DEFAULT_RULES = (
+    Rule("parse/*:seconds", 0.15, min_delta=0.002),
+    Rule("build/*:seconds", 0.15, min_delta=0.005),
+    Rule("build/*:peak_bytes", 0.10, min_delta=256 * 1024),
+    Rule("save/*:seconds", 0.20, min_delta=0.005),
+    Rule("save/*:docx_bytes", 0.02),
+    Rule("e2e/*:seconds", 0.20, min_delta=0.01),
+    Rule("batch/*:guides_per_sec", 0.15, higher_is_better=True),
+)
+
+
+@dataclass
+class Comparison:
+    metric: str
+    rule: Rule
+    base: float
+    new: float
+    noise: float
+    regressed: bool
+
+    @property
+    def change(self) -> float:
+        return (self.new - self.base) / self.base if self.base else 0.0
+
+
+def mad(values: list[float]) -> float:
+    median = statistics.median(values)
+    return statistics.median(abs(v - median) for v in values)
+
+
+def find_rule(metric: str, rules) -> Optional[Rule]:
+    for rule in rules:
+        if fnmatchcase(metric, rule.pattern):
+            return rule
+    return None
+
+
+def _metrics(report: dict) -> dict[str, list[float]]:
+    return {
+        f"{name}:{metric}": values
+        for name, metrics in report["results"].items()
+        for metric, values in metrics.items() if values
+    }
+
+
+def compare(base: dict, new: dict, rules=DEFAULT_RULES) -> list[Comparison]:
+    """Сравнить отчёты bench_suite по общим метрикам с правилом"""
+    base_metrics = _metrics(base)
+    new_metrics = _metrics(new)
+    result = []
+    for metric in sorted(base_metrics.keys() & new_metrics.keys()):
+        rule = find_rule(metric, rules)
+        if rule is None:
+            continue
+        old_values, new_values = base_metrics[metric], new_metrics[metric]
+        old, cur = statistics.median(old_values), statistics.median(new_values)
+        noise = NOISE_K * MAD_SCALE * (mad(old_values) + mad(new_values))
+        worse = old - cur if rule.higher_is_better else cur - old
+        regressed = (
+            worse > rule.threshold * abs(old)
+            and worse > noise
+            and worse > rule.min_delta
+        )
+        result.append(Comparison(metric, rule, old, cur, noise, regressed))
+    return result
+
+
+def parse_threshold(text: str) -> tuple[str, float]:
+    pattern, _, value = text.rpartition("=")
+    if not pattern:
+        raise argparse.ArgumentTypeError(f"ожидается ШАБЛОН=ПОРОГ: {text}")
+    return pattern, float(value)
+
+
+def apply_overrides(rules, overrides) -> tuple:
+    """Новые пороги для правил с теми же шаблонами; прочие — в начало"""
+    rules = list(rules)
+    for pattern, threshold in overrides:
+        for i, rule in enumerate(rules):
+            if rule.pattern == pattern:
+                rules[i] = replace(rule, threshold=threshold)
+                break
+        else:
+            rules.insert(0, Rule(pattern, threshold))
+    return tuple(rules)
+
+
+def format_report(comparisons: list[Comparison]) -> str:
+    lines = []
+    for c in comparisons:
+        mark = "REGRESSION" if c.regressed else "ok"
+        lines.append(
+            f"{c.metric:36s} {c.base:12.4g} → {c.new:<12.4g} "
+            f"{c.change:+7.1%} (порог {c.rule.threshold:.0%}, шум {c.noise:.3g}) {mark}"
+        )
+    return "\n".join(lines)
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("base", help="эталонный JSON bench_suite")
+    ap.add_argument("new", nargs="?", help="новый JSON (или --run)")
+    ap.add_argument("--run", action="store_true",
+                    help="прогнать bench_suite на текущем дереве")
+    ap.add_argument("--threshold", type=parse_threshold, action="append",
+                    default=[], metavar="PATTERN=VALUE")
+    args, suite_args = ap.parse_known_args(argv)
+    if args.new and args.run or not args.new and not args.run:
+        ap.error("нужен второй JSON или --run")
+    if suite_args and not args.run:
+        ap.error(f"неизвестные аргументы: {' '.join(suite_args)}")
+
+    base = load(args.base)
+    if args.run:
+        from benchmarks.bench_suite import main as suite_main
+        out = os.path.splitext(args.base)[0] + ".new.json"
+        suite_main(suite_args + ["--out", out])
+        new = load(out)
+    else:
+        new = load(args.new)
+
+    comparisons = compare(base, new, apply_overrides(DEFAULT_RULES, args.threshold))
+    print(format_report(comparisons))
+    regressions = [c for c in comparisons if c.regressed]
+    print(f"{len(regressions)} regression(s) in {len(comparisons)} metric(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
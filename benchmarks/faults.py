@@ -0,0 +1,144 @@
+"""
+Сбои для StandInServer
+
+Правило — вид сбоя, вероятность и окно действия:
+    FaultRule("429", 0.5, retry_after=2, start=1, end=6, path="/ugc/")
+или строкой (--fault в load_harness):
+    429:0.5:retry_after=2,start=1,end=6,path=/ugc/
+
+Виды:
+  429, 503  — статус с заголовком Retry-After (если задан)
+  reset     — половина тела, затем RST (SO_LINGER 0)
+  truncate  — Content-Length полный, тело обрезано на половине
+  slow      — slow-loris: тело порциями chunk байт раз в delay секунд
+  stall     — заголовки, затем тишина hold секунд (таймаут чтения)
+
+Правила проверяются по порядку; первое сработавшее побеждает.
+Случайность детерминирована (seed), окна — от старта сервера.
+"""
+
+import math
+import time
+import random
+import socket
+import struct
+import threading
+from dataclasses import dataclass, fields
+from typing import Optional
+
+FAULT_KINDS = ("429", "503", "reset", "truncate", "slow", "stall")
+# Ответы, которые клиент не может использовать; slow доходит целиком
+WASTED_KINDS = frozenset({"429", "503", "reset", "truncate", "stall"})
+
+
+@dataclass
+class FaultRule:
+    kind: str
+    probability: float = 1.0
+    # Окно действия, секунды от старта сервера
+    start: float = 0.0
+    end: float = math.inf
+    # Только для путей с этим префиксом ("" — все)
+    path: str = ""
+    retry_after: Optional[float] = None
+    delay: float = 0.5
+    chunk: int = 256
+    hold: float = 30.0
+
+    def __post_init__(self):
+        if self.kind not in FAULT_KINDS:
+            raise ValueError(f"Неизвестный сбой: {self.kind}")
+        if not 0 <= self.probability <= 1:
+            raise ValueError(f"Вероятность вне [0, 1]: {self.probability}")
+
+    @classmethod
+    def parse(cls, text: str) -> "FaultRule":
+        """kind:probability[:key=value,...]"""
+        kind, _, rest = text.partition(":")
+        probability, _, options = rest.partition(":")
+        kwargs = {}
+        types = {f.name: f.type for f in fields(cls)}
+        for item in filter(None, options.split(",")):
+            key, _, value = item.partition("=")
+            if key not in types or key in ("kind", "probability"):
+                raise ValueError(f"Неизвестный параметр сбоя: {key}")
+            kwargs[key] = value if key == "path" else float(value)
+        if "chunk" in kwargs:
+            kwargs["chunk"] = int(kwargs["chunk"])
+        return cls(kind, float(probability or 1.0), **kwargs)
+
+
+class FaultPlan:
+    def __init__(self, rules: list[FaultRule], seed: int = 0):
+        self.rules = list(rules)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.injected: dict[str, int] = {}
+
+    def restart(self):
+        self._started = time.monotonic()
+
+    def pick(self, path: str) -> Optional[FaultRule]:
+        elapsed = time.monotonic() - self._started
+        with self._lock:
+            for rule in self.rules:
+                if not rule.start <= elapsed < rule.end:
+                    continue
+                if rule.path and not path.startswith(rule.path):
+                    continue
+                if self._rng.random() < rule.probability:
+                    self.injected[rule.kind] = self.injected.get(rule.kind, 0) + 1
+                    return rule
+        return None
+
+
+def _reset(connection):
+    # RST вместо FIN: клиент видит «connection reset by peer»
+    connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                          struct.pack("ii", 1, 0))
+    connection.close()
+
+
+def inject(handler, rule: FaultRule, body: bytes, content_type: str) -> int:
+    """Ответить со сбоем; возвращает число отправленных байт тела"""
+    handler.close_connection = True
+    if rule.kind in ("429", "503"):
+        payload = b"Too Many Requests" if rule.kind == "429" else b"Unavailable"
+        handler.send_response(int(rule.kind))
+        if rule.retry_after is not None:
+            handler.send_header("Retry-After", str(int(math.ceil(rule.retry_after))))
+        handler.send_header("Content-Type", "text/plain")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.wfile.write(payload)
+        return len(payload)
+
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    half = body[:len(body) // 2]
+    if rule.kind == "reset":
+        handler.wfile.write(half)
+        handler.wfile.flush()
+        _reset(handler.connection)
+        return len(half)
+    if rule.kind == "truncate":
+        handler.wfile.write(half)
+        return len(half)
+    if rule.kind == "stall":
+        handler.wfile.flush()
+        time.sleep(rule.hold)
+        return 0
+    # slow: каждая порция укладывается в таймаут чтения клиента
+    sent = 0
+    for offset in range(0, len(body), rule.chunk):
+        chunk = body[offset:offset + rule.chunk]
+        handler.wfile.write(chunk)
+        handler.wfile.flush()
+        sent += len(chunk)
+        time.sleep(rule.delay)
+    return sent
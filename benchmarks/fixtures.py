@@ -0,0 +1,163 @@
+"""
+Набор руководств для замеров
+
+  small        — записанная страница из tests/fixtures
+  image_heavy  — галерея: много скриншотов
+  table_heavy  — таблицы предметов
+  deep         — глубоко вложенная разметка
+  huge         — сотни секций со всем подряд
+
+Синтетические страницы детерминированы, но меняются вместе с
+synthetic.py. Для сравнения версий набор лучше заморозить:
+  python -m benchmarks.fixtures --write DIR
+  python -m benchmarks.fixtures --record ID [ID ...] --write DIR
+(--record сохраняет настоящие страницы Steam) и передавать
+каталог замерам через --fixtures-dir.
+"""
+
+import os
+import re
+import sys
+import random
+import argparse
+from io import BytesIO
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from benchmarks.synthetic import (
+    deep_body, deep_page, image_page, links_body, many_text_body, page,
+    section, styled_body, table_body, table_page,
+)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDED_PAGE = os.path.join(REPO_DIR, "tests", "fixtures", "guide_sections.html")
+
+CDN_PREFIX = "https://images.steamusercontent.com"
+IMAGE_SIZE = (640, 360)
+
+_TITLE_OPEN = re.compile(r'(<div class="workshopItemTitle"[^>]*>)')
+
+
+def _recorded() -> str:
+    with open(RECORDED_PAGE, encoding="utf-8") as f:
+        return f.read()
+
+
+def huge_page(sections: int = 200) -> str:
+    """Длинное руководство: текст, стили, списки, таблицы, ссылки, картинки"""
+    result = []
+    for n in range(sections):
+        kind = n % 6
+        if kind == 0:
+            body = many_text_body(400)
+        elif kind == 1:
+            body = styled_body(40)
+        elif kind == 2:
+            body = table_body(20, 5)
+        elif kind == 3:
+            body = links_body(60, 40) + deep_body(30)
+        elif kind == 4:
+            body = "<ul>" + "".join(
+                f"<li>step {i} <b>key</b><ol><li>sub {i}</li></ol></li>"
+                for i in range(40)
+            ) + "</ul>"
+        else:
+            body = "".join(
+                f'Shot {n}.{i}<br><img src="{CDN_PREFIX}/ugc/h{n}/{i}/"><br>'
+                for i in range(3)
+            )
+        result.append(section(f"Part {n}", body))
+    return page("Huge", result)
+
+
+FIXTURES: dict[str, Callable[[], str]] = {
+    "small": _recorded,
+    "image_heavy": lambda: image_page(60, 6),
+    "table_heavy": lambda: table_page(100, 8, tables=10),
+    "deep": lambda: deep_page(1500),
+    "huge": huge_page,
+}
+
+
+def load_fixtures(directory: str = "") -> dict[str, str]:
+    """Страницы набора: из каталога (*.html) или сгенерированные"""
+    if not directory:
+        return {name: build() for name, build in FIXTURES.items()}
+    pages = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext == ".html":
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def numbered_copy(html: str, n: int) -> str:
+    """Та же страница с номером в заголовке — у копии свой файл DOCX"""
+    return _TITLE_OPEN.sub(lambda m: f"{m.group(1)}{n} ", html, count=1)
+
+
+def image_bytes(url: str, size=IMAGE_SIZE) -> bytes:
+    """Скриншот-заглушка: JPEG, одинаковый для одного URL"""
+    rng = random.Random(url)
+    w, h = size
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    # Шумная полоса — чтобы JPEG не сжимался до пары килобайт
+    strip = Image.frombytes("RGB", (w, h // 4), rng.randbytes(w * (h // 4) * 3))
+    img.paste(strip, (0, h // 2))
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def image_loader(store: dict = None):
+    """Загрузчик картинок для DocxBuilder без сети"""
+    store = {} if store is None else store
+
+    def load(url, session=None, config=None, cache=None):
+        if not url or not url.startswith("http"):
+            return None
+        data = store.get(url)
+        if data is None:
+            data = store[url] = image_bytes(url)
+        return BytesIO(data)
+    return load
+
+
+def record(guide_ids: list[str]) -> dict[str, str]:
+    """Скачать настоящие страницы руководств Steam"""
+    from config import AppConfig
+    from network import create_session
+    config = AppConfig()
+    session = create_session(config)
+    pages = {}
+    for gid in guide_ids:
+        url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={gid}"
+        response = session.get(url, timeout=config.timeout)
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        pages[f"guide_{gid}"] = response.text
+    return pages
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Набор руководств для замеров")
+    ap.add_argument("--write", required=True, metavar="DIR",
+                    help="каталог для *.html")
+    ap.add_argument("--record", nargs="+", metavar="ID",
+                    help="записать настоящие руководства вместо синтетики")
+    args = ap.parse_args(argv)
+    pages = record(args.record) if args.record else load_fixtures()
+    os.makedirs(args.write, exist_ok=True)
+    for name, html in pages.items():
+        path = os.path.join(args.write, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{path}: {len(html)} chars")
+
+
+if __name__ == "__main__":
+    main()
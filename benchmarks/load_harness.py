@@ -0,0 +1,231 @@
+"""
+Нагрузка на сетевой слой со сбоями
+
+Гоняет download_image и загрузку страницы (как GuideDownloader._fetch_page)
+через create_session против StandInServer со сбоями из benchmarks.faults.
+Параллельность — пул потоков с общей сессией, как у ImagePrefetcher.
+
+Отчёт:
+  throughput           — успешных операций в секунду
+  latency p50/p95/p99  — по всем операциям и отдельно картинки/страницы
+  retry_amplification  — запросов на сервере / логических операций
+  wasted_bytes         — байты оборванных ответов и ответов 429/503
+                         (отданы, но бесполезны; slow-loris сюда не входит)
+
+Что видно сразу: 429/503 повторяются urllib3 Retry (с учётом Retry-After),
+а обрезанное тело и обрыв на середине тела — нет: ошибка случается при
+чтении, после того как Retry уже отработал. Slow-loris с паузами меньше
+config.timeout таймаутом не ловится — растёт только хвост задержек.
+
+Запуск:
+  python -m benchmarks.load_harness --scenario storm
+  python -m benchmarks.load_harness --fault 429:0.3:retry_after=1 \\
+      --fault reset:0.05 --images 400 --concurrency 16 --max-retries 5
+  python -m benchmarks.load_harness --scenario storm --rate-images 50
+(--rate-* включают ограничитель запросов network.HostRateLimiter)
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from config import AppConfig
+from network import ImageCache, create_session, download_image
+from streaming import GuideStreamScanner, fetch_streaming
+from telemetry import PERCENTILES, percentile
+from benchmarks.faults import FaultPlan, FaultRule
+from benchmarks.fixtures import load_fixtures
+from benchmarks.steam_server import IMAGE_PATH, StandInServer
+
+# Готовые наборы сбоев; --fault добавляет правила поверх
+SCENARIOS = {
+    "clean": [],
+    # 2 секунды все отвечают 429, потом отпускает
+    "storm": ["429:1:retry_after=1,end=2"],
+    "flaky": ["503:0.05", "reset:0.05", "truncate:0.05"],
+    "slowloris": ["slow:0.05:delay=0.2,chunk=2048"],
+    "stall": ["stall:0.02:hold=60"],
+}
+
+
+@dataclass
+class Outcome:
+    kind: str
+    ok: bool
+    seconds: float
+    error: str = ""
+
+
+def _fetch_image(session, config: AppConfig, cache, url: str) -> Outcome:
+    start = time.perf_counter()
+    data = download_image(url, session, config, cache)
+    # download_image глотает ошибки — причина видна только по серверу
+    return Outcome("image", data is not None, time.perf_counter() - start)
+
+
+def _fetch_page(session, config: AppConfig, url: str) -> Outcome:
+    start = time.perf_counter()
+    error = ""
+    try:
+        if config.stream_parse:
+            fetch_streaming(session, url, config, GuideStreamScanner())
+        else:
+            response = session.get(url, timeout=config.timeout)
+            response.raise_for_status()
+            response.text
+    except requests.RequestException as e:
+        error = type(e).__name__
+    return Outcome("page", not error, time.perf_counter() - start, error)
+
+
+def _latency(values: list[float]) -> dict:
+    stats = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+    stats["max"] = max(values, default=0.0)
+    return stats
+
+
+def run_load(server: StandInServer, config: AppConfig, page: str,
+             images: int = 200, pages: int = 20, concurrency: int = 8) -> dict:
+    """Прогнать images картинок и pages страниц; метрики — словарь"""
+    session = create_session(config, pool_size=concurrency)
+    # Адреса не повторяются — кеш не прячет сбои
+    cache = ImageCache(max_size=images + 1)
+    tasks = [
+        (lambda n=n: _fetch_image(session, config, cache,
+                                  f"{server.base_url}{IMAGE_PATH}load/{n}/"))
+        for n in range(images)
+    ] + [
+        (lambda: _fetch_page(session, config, server.page_url(page)))
+        for _ in range(pages)
+    ]
+    server.reset_counters()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda task: task(), tasks))
+    wall = time.perf_counter() - start
+    session.close()
+    server.wait_idle()
+
+    ok = [o for o in outcomes if o.ok]
+    errors: dict[str, int] = {}
+    for o in outcomes:
+        if o.error:
+            errors[o.error] = errors.get(o.error, 0) + 1
+    result = {
+        "operations": len(outcomes),
+        "ok": len(ok),
+        "failed": len(outcomes) - len(ok),
+        "seconds": wall,
+        "throughput": len(ok) / wall if wall else 0.0,
+        "latency": _latency([o.seconds for o in outcomes]),
+        "server_requests": server.requests,
+        "retry_amplification": server.requests / len(outcomes) if outcomes else 0.0,
+        "bytes_sent": server.bytes_sent,
+        "wasted_bytes": server.wasted_bytes,
+        "faults": dict(server.faults.injected) if server.faults else {},
+        "errors": errors,
+    }
+    for kind in ("image", "page"):
+        part = [o for o in outcomes if o.kind == kind]
+        if part:
+            result[kind] = {
+                "operations": len(part),
+                "ok": sum(o.ok for o in part),
+                "latency": _latency([o.seconds for o in part]),
+            }
+    return result
+
+
+def format_report(result: dict) -> str:
+    lat = result["latency"]
+    lines = [
+        f"операций {result['operations']}, успешно {result['ok']}, "
+        f"сбоев {result['failed']} за {result['seconds']:.2f} с",
+        f"throughput {result['throughput']:.1f}/с, latency "
+        + " ".join(f"{k}={v * 1000:.0f}ms" for k, v in lat.items()),
+        f"запросов на сервере {result['server_requests']} "
+        f"(amplification ×{result['retry_amplification']:.2f}), "
+        f"wasted {result['wasted_bytes']} из {result['bytes_sent']} байт",
+    ]
+    for kind in ("image", "page"):
+        if kind in result:
+            part = result[kind]
+            lines.append(
+                f"  {kind:5s} {part['ok']}/{part['operations']} "
+                f"p99={part['latency']['p99'] * 1000:.0f}ms"
+            )
+    if result["faults"]:
+        lines.append("сбои: " + ", ".join(f"{k}={v}" for k, v in result["faults"].items()))
+    if result["errors"]:
+        lines.append("ошибки страниц: " + ", ".join(
+            f"{k}={v}" for k, v in result["errors"].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scenario", choices=SCENARIOS, default="clean")
+    ap.add_argument("--fault", type=FaultRule.parse, action="append", default=[],
+                    metavar="KIND:P[:OPTS]", help="см. benchmarks.faults")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--images", type=int, default=200)
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--page", default="small", help="руководство из набора")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--latency", type=float, default=0.0, help="секунды")
+    ap.add_argument("--bandwidth", type=float, default=0, help="байт/с")
+    ap.add_argument("--timeout", type=int, default=AppConfig.timeout)
+    ap.add_argument("--max-retries", type=int, default=AppConfig.max_retries)
+    ap.add_argument("--backoff", type=float, default=AppConfig.retry_backoff)
+    ap.add_argument("--rate-pages", type=float, default=0.0, help="запросов/с")
+    ap.add_argument("--rate-images", type=float, default=0.0, help="запросов/с")
+    ap.add_argument("--burst", type=int, default=AppConfig.rate_limit_burst)
+    ap.add_argument("--out", default="", help="файл JSON с результатом")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    rules = [FaultRule.parse(spec) for spec in SCENARIOS[args.scenario]] + args.fault
+    config = AppConfig(timeout=args.timeout, max_retries=args.max_retries,
+                       retry_backoff=args.backoff, rate_limit_pages=args.rate_pages,
+                       rate_limit_images=args.rate_images, rate_limit_burst=args.burst)
+    pages = {args.page: load_fixtures()[args.page]}
+    with StandInServer(pages, args.latency, args.bandwidth,
+                       faults=FaultPlan(rules, args.seed)) as server:
+        result = run_load(server, config, args.page, args.images,
+                          args.pages, args.concurrency)
+    print(format_report(result))
+    if args.out:
+        report = {
+            "meta": {
+                "scenario": args.scenario,
+                # Бесконечное окно → null: Infinity не JSON
+                "faults": [
+                    {**vars(rule), "end": None if math.isinf(rule.end) else rule.end}
+                    for rule in rules
+                ],
+                "concurrency": args.concurrency,
+                "timeout": config.timeout,
+                "max_retries": config.max_retries,
+                "retry_backoff": config.retry_backoff,
+                "rate_limit_pages": config.rate_limit_pages,
+                "rate_limit_images": config.rate_limit_images,
+            },
+            "results": result,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"→ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Локальная замена steamcommunity.com и CDN картинок
+
+  /sharedfiles/filedetails/?id=<имя>  — страница из набора;
+                                       адреса CDN переписаны на этот сервер
+  /ugc/...                            — JPEG-заглушка (fixtures.image_bytes)
+
+latency   — задержка перед ответом, секунды (время до первого байта)
+bandwidth — ограничение скорости отдачи тела, байт/с (0 — без ограничения)
+faults    — FaultPlan (benchmarks.faults): 429, обрывы, slow-loris...;
+            байты оборванных и ошибочных ответов копятся в wasted_bytes
+
+В коде:
+    with StandInServer(pages, latency=0.05) as server:
+        downloader.download(server.page_url("small"), ...)
+Отдельно:
+    python -m benchmarks.steam_server --port 8931 --latency 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.faults import WASTED_KINDS, FaultPlan, FaultRule, inject
+from benchmarks.fixtures import CDN_PREFIX, image_bytes, load_fixtures
+
+PAGE_PATH = "/sharedfiles/filedetails/"
+IMAGE_PATH = "/ugc/"
+CHUNK_SIZE = 16 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "StandInSteam/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stand_in: StandInServer = self.server.stand_in
+        stand_in.begin_request()
+        try:
+            self._respond(stand_in)
+        finally:
+            stand_in.end_request()
+
+    def _respond(self, stand_in: "StandInServer"):
+        url = urlparse(self.path)
+        if url.path == PAGE_PATH:
+            name = parse_qs(url.query).get("id", [""])[0]
+            body = stand_in.page_bytes(name)
+            content_type = "text/html; charset=utf-8"
+        elif url.path.startswith(IMAGE_PATH):
+            body = stand_in.image(self.path)
+            content_type = "image/jpeg"
+        else:
+            body = None
+            content_type = ""
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        if body is None:
+            self.send_error(404)
+            return
+        fault = stand_in.faults.pick(url.path) if stand_in.faults else None
+        if fault is not None:
+            try:
+                sent = inject(self, fault, body, content_type)
+            except OSError:
+                # Клиент ушёл раньше (таймаут чтения) — байты не сосчитать
+                sent = 0
+            stand_in.count_bytes(sent, wasted=fault.kind in WASTED_KINDS)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self._send_body(body, stand_in.bandwidth)
+        stand_in.count_bytes(len(body))
+
+    def _send_body(self, body: bytes, bandwidth: float):
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        # Порциями с паузами — средняя скорость не выше bandwidth
+        started = time.perf_counter()
+        sent = 0
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = body[offset:offset + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            ahead = sent / bandwidth - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Обрывы соединений при сбоях — ожидаемы, трассировки не нужны
+        pass
+
+
+class StandInServer:
+    def __init__(self, pages: dict[str, str], latency: float = 0.0,
+                 bandwidth: float = 0, host: str = "127.0.0.1", port: int = 0,
+                 faults: FaultPlan = None):
+        self.pages = pages
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.faults = faults
+        self._httpd = _QuietServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self.base_url = f"http://{host}:{self._httpd.server_port}"
+        self._encoded: dict[str, bytes] = {}
+        self._images: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active = 0
+        self._thread = None
+        self.requests = 0
+        self.bytes_sent = 0
+        self.wasted_bytes = 0
+
+    def page_url(self, name: str) -> str:
+        return f"{self.base_url}{PAGE_PATH}?id={name}"
+
+    def page_bytes(self, name: str):
+        with self._lock:
+            body = self._encoded.get(name)
+            if body is None and name in self.pages:
+                html = self.pages[name].replace(CDN_PREFIX, self.base_url)
+                body = self._encoded[name] = html.encode("utf-8")
+            return body
+
+    def image(self, path: str) -> bytes:
+        with self._lock:
+            body = self._images.get(path)
+        if body is None:
+            # Тот же URL, что и на настоящем CDN — та же картинка
+            body = image_bytes(CDN_PREFIX + path)
+            with self._lock:
+                self._images[path] = body
+        return body
+
+    def begin_request(self):
+        with self._lock:
+            self.requests += 1
+            self._active += 1
+
+    def end_request(self):
+        with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """
+        Дождаться конца всех ответов: клиент может дочитать тело
+        раньше, чем поток сервера сосчитает отданные байты
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._active == 0, timeout)
+
+    def count_bytes(self, size: int, wasted: bool = False):
+        with self._lock:
+            self.bytes_sent += size
+            if wasted:
+                self.wasted_bytes += size
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.bytes_sent = self.wasted_bytes = 0
+        if self.faults:
+            self.faults.restart()
+
+    def start(self) -> "StandInServer":
+        if self.faults:
+            self.faults.restart()
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True, name="StandInSteam"
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Локальная замена Steam для замеров")
+    ap.add_argument("--port", type=int, default=8931)
+    ap.add_argument("--latency", type=float, default=0.0, help="секунды")
+    ap.add_argument("--bandwidth", type=float, default=0, help="байт/с")
+    ap.add_argument("--fixtures-dir", default="")
+    ap.add_argument("--fault", type=FaultRule.parse, action="append", default=[],
+                    metavar="KIND:P[:OPTS]", help="см. benchmarks.faults")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    faults = FaultPlan(args.fault, args.seed) if args.fault else None
+    server = StandInServer(load_fixtures(args.fixtures_dir), args.latency,
+                           args.bandwidth, port=args.port, faults=faults)
+    with server:
+        for name in server.pages:
+            print(server.page_url(name))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
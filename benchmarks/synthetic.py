@@ -0,0 +1,138 @@
+"""
+Синтетические страницы для замеров
+
+Разметка повторяет то, что отдаёт Steam (subSection detailBox,
+bb_*-классы), но размеры и вложенность доводятся до крайностей.
+"""
+
+PAGE_HEAD = (
+    '<html><head><title>{title} :: Steam Community</title></head><body>'
+    '<div class="workshopItemTitle">{title}</div>'
+    '<div class="guide subSections" id="guideContent">'
+)
+PAGE_TAIL = '</div></body></html>'
+
+
+def section(title: str, body: str) -> str:
+    return (
+        '<div class="subSection detailBox">'
+        f'<div class="subSectionTitle">{title}</div>'
+        f'<div class="subSectionDesc">{body}</div></div>'
+    )
+
+
+def page(title: str, sections: list[str]) -> str:
+    return PAGE_HEAD.format(title=title) + "".join(sections) + PAGE_TAIL
+
+
+def deep_body(depth: int) -> str:
+    """Цепочка вложенных тегов глубиной depth с текстом на каждом уровне"""
+    tags = ("span", "b", "i", "u", "div")
+    opening = []
+    closing = []
+    for level in range(depth):
+        tag = tags[level % len(tags)]
+        opening.append(f"<{tag}>L{level} ")
+        closing.append(f"</{tag}>")
+    closing.reverse()
+    return "".join(opening) + "".join(closing)
+
+
+def many_text_body(count: int) -> str:
+    """count текстовых узлов вперемешку с инлайн-разметкой"""
+    parts = []
+    for n in range(count // 2):
+        parts.append(f"word{n} <b>bold{n}</b>")
+        if n % 20 == 19:
+            parts.append("<br>")
+    return " ".join(parts)
+
+
+def span_soup_body(count: int) -> str:
+    """Текст, порезанный на мелкие инлайн-теги без смены стиля"""
+    parts = []
+    for n in range(count):
+        parts.append(f'<span>w{n} </span><b>b{n}</b><b> b{n}</b>')
+        if n % 50 == 49:
+            parts.append("<br>")
+    return "".join(parts)
+
+
+def styled_body(count: int) -> str:
+    """Код, спойлеры и цитаты вперемешку с обычным текстом"""
+    parts = []
+    for n in range(count):
+        parts.append(
+            f'text{n} <span class="bb_spoiler"><span>secret{n} '
+            f'<b>bold</b></span></span><br>'
+            f'<code>value_{n} = {n}</code><br>'
+            f'<blockquote class="bb_blockquote">quote {n} '
+            f'<span class="bb_spoiler">hidden</span></blockquote>'
+        )
+    return "".join(parts)
+
+
+def deep_page(depth: int = 2000) -> str:
+    return page("Deep", [section("Deep", deep_body(depth))])
+
+
+def many_text_page(count: int = 100_000, sections: int = 10) -> str:
+    per_section = many_text_body(count // sections)
+    return page("Text", [section(f"S{n}", per_section) for n in range(sections)])
+
+
+def span_soup_page(count: int = 30_000, sections: int = 10) -> str:
+    per_section = span_soup_body(count // sections)
+    return page("Spans", [section(f"S{n}", per_section) for n in range(sections)])
+
+
+def styled_page(count: int = 5_000, sections: int = 10) -> str:
+    per_section = styled_body(count // sections)
+    return page("Styled", [section(f"S{n}", per_section) for n in range(sections)])
+
+
+def image_page(count: int = 100, sections: int = 10) -> str:
+    """Руководство-галерея: count разных картинок с подписями"""
+    per = max(1, count // sections)
+    result = []
+    for s in range(sections):
+        body = "".join(
+            f'Screenshot {s}.{n}<br>'
+            f'<img src="https://images.steamusercontent.com/ugc/{s}/{n}/"><br>'
+            for n in range(per)
+        )
+        result.append(section(f"Gallery {s}", body))
+    return page("Gallery", result)
+
+
+def table_body(rows: int, cols: int) -> str:
+    """Таблица предметов: строка заголовков + rows строк по cols ячеек"""
+    head = "".join(f'<div class="bb_table_th">Stat {c}</div>' for c in range(cols))
+    parts = [f'<div class="bb_table"><div class="bb_table_tr">{head}</div>']
+    for r in range(rows):
+        cells = "".join(
+            f'<div class="bb_table_td">{"<b>" if c == 0 else ""}'
+            f'Item {r}.{c}{"</b>" if c == 0 else ""}</div>'
+            for c in range(cols)
+        )
+        parts.append(f'<div class="bb_table_tr">{cells}</div>')
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def table_page(rows: int = 200, cols: int = 10, tables: int = 1) -> str:
+    return page("Tables", [section(f"T{n}", table_body(rows, cols))
+                           for n in range(tables)])
+
+
+def links_body(count: int, distinct: int) -> str:
+    """Каталог ссылок: count ссылок на distinct разных адресов"""
+    return "".join(
+        f'<a class="bb_link" href="https://steamcommunity.com/sharedfiles/'
+        f'filedetails/?id={n % distinct}">Guide #{n}</a><br>'
+        for n in range(count)
+    )
+
+
+def links_page(count: int = 2000, distinct: int = 1500) -> str:
+    return page("Links", [section("Directory", links_body(count, distinct))])
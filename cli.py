@@ -0,0 +1,182 @@
+"""
+Командная строка / command line
+
+  python __main__.py serve [--host H] [--port P] [--workers N] [--out DIR]
+  python __main__.py watch ID [ID ...] [--out DIR] [--once]
+  python __main__.py batch ID [ID ...] [--file LIST] [--processes N] [--out DIR]
+                           [--telemetry FILE] [--rate-limit PAGES IMAGES]
+                           [--profile [MODE]] [--profile-memory]
+  python __main__.py render ARCHIVE [--out DIR] [--pdf] [--profile [MODE]]
+  python __main__.py media-report [--store DIR]
+"""
+
+import argparse
+import logging
+from typing import Optional
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _cmd_serve(args, config: AppConfig) -> int:
+    from server import serve
+    serve(config, output_dir=args.out, host=args.host,
+          port=args.port, workers=args.workers)
+    return 0
+
+
+def _cmd_watch(args, config: AppConfig) -> int:
+    from watcher import GuideWatcher
+    ids = _read_guides(args)
+    if not ids:
+        return 2
+    if args.min_interval:
+        config.watch_min_interval = args.min_interval
+    if args.max_interval:
+        config.watch_max_interval = args.max_interval
+    if args.per_host:
+        config.watch_per_host = args.per_host
+    watcher = GuideWatcher(config, ids, args.out or config.save_dir,
+                           log_func=print)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def _read_guides(args) -> Optional[list[str]]:
+    from watcher import normalize_guide
+    values = list(args.guides)
+    if getattr(args, "file", None):
+        with open(args.file, "r", encoding="utf-8") as f:
+            values.extend(line for line in f if line.strip())
+    ids = []
+    for value in values:
+        gid = normalize_guide(value)
+        if gid is None:
+            print(f"Invalid guide: {value.strip()}")
+            return None
+        ids.append(gid)
+    return ids
+
+
+def _cmd_batch(args, config: AppConfig) -> int:
+    from batch import run_batch
+    ids = _read_guides(args)
+    if not ids:
+        return 2
+    urls = [f"https://steamcommunity.com/sharedfiles/filedetails/?id={gid}"
+            for gid in ids]
+    if args.archive:
+        config.write_archive = True
+    if args.export_images:
+        config.export_images = True
+    if args.telemetry:
+        config.telemetry_file = args.telemetry
+    if args.rate_limit:
+        config.rate_limit_pages, config.rate_limit_images = args.rate_limit
+    _apply_profile_args(args, config)
+    results = run_batch(config, urls, args.out or config.save_dir,
+                        processes=args.processes, log_func=print)
+    failed = [r.url for r in results if not r.ok]
+    print(f"Done: {len(results) - len(failed)}/{len(results)}")
+    return 1 if failed else 0
+
+
+def _apply_profile_args(args, config: AppConfig):
+    if args.profile:
+        config.profile = args.profile
+    if args.profile_memory:
+        config.profile_memory = True
+
+
+def _add_profile_args(p):
+    p.add_argument("--profile", nargs="?", const="cprofile", default=None,
+                   choices=["cprofile", "sampling"],
+                   help="write .prof and .collapsed next to each DOCX")
+    p.add_argument("--profile-memory", action="store_true",
+                   help="also write tracemalloc diffs between stages")
+
+
+def _cmd_render(args, config: AppConfig) -> int:
+    from archive import render_archive
+    _apply_profile_args(args, config)
+    result = render_archive(config, args.archive, args.out or config.save_dir,
+                            config.language, print, convert_pdf=args.pdf)
+    return 0 if result.ok else 1
+
+
+def _cmd_media_report(args, config: AppConfig) -> int:
+    import os
+    from media_store import MediaStore
+    from parser import MEDIA_STORE_DIR
+    root = (args.store or config.media_store_dir
+            or os.path.join(config.save_dir, MEDIA_STORE_DIR))
+    if not os.path.isdir(root):
+        print(f"No media store: {root}")
+        return 1
+    for key, value in MediaStore(root).report().items():
+        print(f"{key}: {value}")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="SteamGuideSaver",
+        description="Steam Community guide downloader",
+    )
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="run local HTTP job server")
+    p.add_argument("--host", default=None)
+    p.add_argument("--port", type=int, default=None)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--out", default=None, help="output directory")
+    p.set_defaults(func=_cmd_serve)
+
+    p = sub.add_parser("watch", help="keep a mirror of guides up to date")
+    p.add_argument("guides", nargs="+", help="guide IDs or URLs")
+    p.add_argument("--out", default=None, help="output directory")
+    p.add_argument("--min-interval", type=int, default=None)
+    p.add_argument("--max-interval", type=int, default=None)
+    p.add_argument("--per-host", type=int, default=None)
+    p.add_argument("--once", action="store_true", help="single pass")
+    p.set_defaults(func=_cmd_watch)
+
+    p = sub.add_parser("batch", help="export many guides with a process pool")
+    p.add_argument("guides", nargs="*", help="guide IDs or URLs")
+    p.add_argument("--file", default=None, help="file with one ID/URL per line")
+    p.add_argument("--out", default=None, help="output directory")
+    p.add_argument("--processes", type=int, default=None)
+    p.add_argument("--archive", action="store_true",
+                   help="also write offline archives")
+    p.add_argument("--export-images", action="store_true",
+                   help="also export images via the shared media store")
+    p.add_argument("--telemetry", default=None, metavar="FILE",
+                   help="append per-guide JSON records; summary goes next to it")
+    p.add_argument("--rate-limit", type=float, nargs=2, default=None,
+                   metavar=("PAGES", "IMAGES"),
+                   help="requests per second per host for the whole batch (0 = off)")
+    _add_profile_args(p)
+    p.set_defaults(func=_cmd_batch)
+
+    p = sub.add_parser("render", help="rebuild a guide from an offline archive")
+    p.add_argument("archive", help="*.guide.zip file")
+    p.add_argument("--out", default=None, help="output directory")
+    p.add_argument("--pdf", action="store_true", help="also convert to PDF")
+    _add_profile_args(p)
+    p.set_defaults(func=_cmd_render)
+
+    p = sub.add_parser("media-report", help="show media store dedup ratio")
+    p.add_argument("--store", default=None, help="media store directory")
+    p.set_defaults(func=_cmd_media_report)
+
+    return ap
+
+
+def main(argv: list[str]) -> int:
+    args = build_arg_parser().parse_args(argv)
+    config = AppConfig.load()
+    return args.func(args, config)
@@ -25,6 +25,9 @@ except ImportError:
     HAS_PILLOW = False
 
 AVAILABLE_THEMES = ["dark", "light", "steam", "cyberpunk"]
+HTML_PARSERS = ("auto", "html.parser", "lxml", "lxml-native")
+DOCX_BACKENDS = ("ooxml", "python-docx")
+PROFILERS = ("", "cprofile", "sampling")
 
 
 @dataclass
@@ -37,10 +40,59 @@ class AppConfig:
     timeout: int = 15
     max_retries: int = 3
     retry_backoff: float = 0.5
+    # Запросов в секунду на хост: страницы сообщества и CDN картинок
+    # (0 — без ограничения, по умолчанию); после 429 скорость снижается сама
+    rate_limit_pages: float = 0.0
+    rate_limit_images: float = 0.0
+    rate_limit_burst: int = 5
+    # SQLite с корзинами, общий для процессов ("" — в памяти процесса)
+    rate_limit_file: str = ""
     max_image_size_mb: int = 50
     max_image_width_inches: float = 6.0
     cell_image_width_inches: float = 1.8
     convert_to_pdf: bool = False
+    # auto | html.parser | lxml | lxml-native (см. html_backends)
+    html_parser: str = "auto"
+    # Строить дерево только для заголовка и тела руководства
+    partial_parse: bool = True
+    # ooxml — прямая запись XML по шаблонам; python-docx — эталонный построитель
+    docx_backend: str = "ooxml"
+    # Писать картинки в DOCX сразу, не держа их в памяти до сохранения
+    stream_docx: bool = True
+    # Уровень deflate для XML-частей DOCX (картинки не пережимаются)
+    docx_compress_level: int = 6
+    # Сканировать страницу во время загрузки и заранее качать картинки
+    stream_parse: bool = True
+    prefetch_workers: int = 4
+    prefetch_max_images: int = 50
+    # Замер пика памяти на руководство (tracemalloc, замедляет работу;
+    # у заданий, идущих параллельно в одном процессе, пик общий)
+    track_memory: bool = False
+    # JSON Lines с телеметрией каждого руководства (пусто — не писать)
+    telemetry_file: str = ""
+    # Профиль каждой выгрузки рядом с DOCX: "" (выкл.) | cprofile | sampling
+    profile: str = ""
+    profile_interval: float = 0.005
+    # Разница снимков tracemalloc между этапами
+    profile_memory: bool = False
+    write_archive: bool = False
+    # Картинки рядом с DOCX — жёсткими ссылками из общего хранилища
+    export_images: bool = False
+    media_store_dir: str = ""
+    # Локальный HTTP-сервер заданий
+    server_host: str = "127.0.0.1"
+    server_port: int = 8765
+    server_workers: int = 2
+    server_queue_size: int = 32
+    server_cache_ttl: int = 3600
+    # Режим наблюдения (секунды)
+    watch_min_interval: int = 900
+    watch_max_interval: int = 86400
+    watch_jitter: float = 0.2
+    watch_per_host: int = 2
+    watch_budget_per_hour: int = 600
+    # Пакетный режим: 0 — по числу ядер
+    batch_processes: int = 0
 
     def __post_init__(self):
         if self.language not in ("en", "ru"):
@@ -49,8 +101,46 @@ class AppConfig:
             self.timeout = 15
         if self.max_retries < 0:
             self.max_retries = 3
+        if self.rate_limit_pages < 0:
+            self.rate_limit_pages = 0.0
+        if self.rate_limit_images < 0:
+            self.rate_limit_images = 0.0
+        if self.rate_limit_burst < 1:
+            self.rate_limit_burst = 5
         if self.theme not in AVAILABLE_THEMES:
             self.theme = "dark"
+        if not 0 < self.server_port < 65536:
+            self.server_port = 8765
+        if self.server_workers < 1:
+            self.server_workers = 2
+        if self.server_queue_size < 1:
+            self.server_queue_size = 32
+        if self.server_cache_ttl < 0:
+            self.server_cache_ttl = 3600
+        if self.watch_min_interval < 1:
+            self.watch_min_interval = 900
+        if self.watch_max_interval < self.watch_min_interval:
+            self.watch_max_interval = max(86400, self.watch_min_interval)
+        if not 0 <= self.watch_jitter < 1:
+            self.watch_jitter = 0.2
+        if self.watch_per_host < 1:
+            self.watch_per_host = 2
+        if self.html_parser not in HTML_PARSERS:
+            self.html_parser = "auto"
+        if self.docx_backend not in DOCX_BACKENDS:
+            self.docx_backend = "ooxml"
+        if not 0 <= self.docx_compress_level <= 9:
+            self.docx_compress_level = 6
+        if self.profile not in PROFILERS:
+            self.profile = ""
+        if not 0 < self.profile_interval <= 1:
+            self.profile_interval = 0.005
+        if self.prefetch_workers < 1:
+            self.prefetch_workers = 4
+        if self.prefetch_max_images < 0:
+            self.prefetch_max_images = 50
+        if self.batch_processes < 0:
+            self.batch_processes = 0
 
     @classmethod
     def load(cls) -> 'AppConfig':
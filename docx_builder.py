@@ -5,12 +5,14 @@ import logging
 from dataclasses import dataclass
 from typing import Callable
 
-from bs4 import NavigableString, Tag
+from docx.oxml import OxmlElement
 from docx.shared import Inches, Pt, RGBColor
+from docx.table import _Cell
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_COLOR_INDEX
 
 from config import HAS_PILLOW, AppConfig
-from utils import add_horizontal_line, add_hyperlink
+from utils import add_horizontal_line, add_hyperlink, HyperlinkIndex
 from network import download_image, ImageCache
 
 if HAS_PILLOW:
@@ -18,6 +20,8 @@ if HAS_PILLOW:
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE = re.compile(r'\s+')
+
 
 @dataclass
 class StyleContext:
@@ -27,14 +31,109 @@ class StyleContext:
     strike: bool = False
     spoiler: bool = False
     code: bool = False
+    quote: bool = False
 
     def copy(self) -> 'StyleContext':
         return StyleContext(
             bold=self.bold, italic=self.italic, underline=self.underline,
             strike=self.strike, spoiler=self.spoiler, code=self.code,
+            quote=self.quote,
         )
 
 
+# ==========================================
+# Именованные стили символов
+# ==========================================
+
+# Оформление частей стиля; при сочетании применяются по порядку
+# (как в _apply_style: подсветка кода перекрывает подсветку спойлера)
+_STYLE_PARTS = (
+    ('spoiler', 'Spoiler', {'highlight_color': WD_COLOR_INDEX.BLACK,
+                            'color': RGBColor(255, 255, 255)}),
+    ('code', 'Code', {'name': 'Courier New', 'size': Pt(9),
+                      'highlight_color': WD_COLOR_INDEX.GRAY_25}),
+    ('quote', 'Quote', {'italic': True}),
+)
+
+
+def _style_combinations():
+    """(code, spoiler, quote) → (имя стиля, свойства шрифта)"""
+    result = {}
+    for mask in range(1, 1 << len(_STYLE_PARTS)):
+        names = []
+        props = {}
+        flags = {}
+        for n, (flag, name, part_props) in enumerate(_STYLE_PARTS):
+            on = bool(mask & (1 << n))
+            flags[flag] = on
+            if on:
+                names.append(name)
+                props.update(part_props)
+        key = (flags['code'], flags['spoiler'], flags['quote'])
+        result[key] = ('Guide ' + ' '.join(names), props)
+    return result
+
+
+CHARACTER_STYLES = _style_combinations()
+
+
+def register_character_styles(doc):
+    """Добавить в документ стили символов для кода, спойлеров и цитат"""
+    styles = doc.styles
+    for name, props in CHARACTER_STYLES.values():
+        if name in styles:
+            continue
+        style = styles.add_style(name, WD_STYLE_TYPE.CHARACTER)
+        font = style.font
+        for attr, value in props.items():
+            if attr == 'color':
+                font.color.rgb = value
+            else:
+                setattr(font, attr, value)
+
+
+def character_style_ids(doc_context) -> dict:
+    """(code, spoiler, quote) → styleId для стилей, которые есть в документе"""
+    try:
+        styles = doc_context.part.styles
+    except AttributeError:
+        return {}
+    result = {}
+    for key, (name, _) in CHARACTER_STYLES.items():
+        style_id = name.replace(' ', '')
+        if styles.element.get_by_id(style_id) is not None:
+            result[key] = style_id
+    return result
+
+
+@dataclass
+class BuilderStats:
+    """Счётчики построителя; ячейки таблиц пишут в те же счётчики"""
+    nodes_visited: int = 0
+    paragraphs: int = 0
+    runs: int = 0
+    # Пустые строки из подряд идущих <br> (_flush_pending_breaks)
+    empty_paragraphs: int = 0
+    tables: int = 0
+    images_inserted: int = 0
+    # --- Потери содержимого ---
+    # Картинка не загрузилась или не вставилась
+    images_skipped: int = 0
+    # Таблица заменена на «[Table]» (вложенная) или не построилась
+    table_fallbacks: int = 0
+    # Поддеревья, пропущенные намеренно (слишком глубокие списки)
+    subtrees_skipped: int = 0
+
+    @property
+    def content_lost(self) -> int:
+        return self.images_skipped + self.table_fallbacks + self.subtrees_skipped
+
+
+# События обхода дерева
+_ENTER = 0
+_EXIT = 1
+
+
 class DocxBuilder:
     BLOCK_TAGS = frozenset([
         'div', 'p', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
@@ -46,21 +145,30 @@ class DocxBuilder:
     STRIKE_TAGS = frozenset(['s', 'strike', 'del'])
     CODE_TAGS = frozenset(['code', 'pre'])
     HEADING_CLASSES = {'bb_h1': 1, 'bb_h2': 2, 'bb_h3': 3}
+    TABLE_CELL_CLASSES = ['bb_table_td', 'bb_table_th']
 
-    MAX_RECURSION_DEPTH = 50
     MAX_LIST_DEPTH = 10
 
     def __init__(self, doc_context, config=None, session=None,
-                 image_cache=None, log_func=None):
+                 image_cache=None, log_func=None, image_loader=None,
+                 stats=None, char_styles=None, links=None):
         self.doc = doc_context
         self.config = config or AppConfig()
         self.session = session
         self.image_cache = image_cache
+        # Функция загрузки картинок (по умолчанию download_image)
+        self.image_loader = image_loader or download_image
         self.log_func = log_func or (lambda msg: None)
         self.current_paragraph = None
         self.is_cell = not hasattr(self.doc, 'add_heading')
-        self._depth = 0
         self._list_depth = 0
+        # Общая статистика обхода (ячейки таблиц пишут в неё же)
+        self.stats = stats if stats is not None else BuilderStats()
+        # Стили символов документа; без них — прямое форматирование
+        self.char_styles = (char_styles if char_styles is not None
+                            else character_style_ids(self.doc))
+        # URL → rId ссылок (общий с ячейками: у них та же часть документа)
+        self.links = links if links is not None else HyperlinkIndex(self.doc.part)
 
         # === Трекер пустых строк ===
         # Считает последовательные <br> для создания пустых абзацев
@@ -71,8 +179,31 @@ class DocxBuilder:
         # Флаг: текущий параграф пуст (только создан, без текста)
         self._paragraph_is_empty = True
 
+        # === Буфер текста ===
+        # Соседние куски текста с одинаковым стилем пишутся одним run
+        self._pending_text = []
+        self._pending_ctx = None
+
+    def reset(self, doc_context):
+        """Начать заново в другом контейнере (следующей ячейке таблицы)"""
+        self.doc = doc_context
+        self.is_cell = not hasattr(self.doc, 'add_heading')
+        self.current_paragraph = None
+        self._list_depth = 0
+        self._consecutive_br = 0
+        self._has_content = False
+        self._paragraph_is_empty = True
+        self._pending_text = []
+        self._pending_ctx = None
+
     def get_paragraph(self, style=None, alignment=WD_ALIGN_PARAGRAPH.LEFT):
+        """Текущий параграф для прямой записи run-ов (буфер текста сброшен)"""
+        self._flush_text()
+        return self._ensure_paragraph(style, alignment)
+
+    def _ensure_paragraph(self, style=None, alignment=WD_ALIGN_PARAGRAPH.LEFT):
         if self.current_paragraph is None:
+            self.stats.paragraphs += 1
             self.current_paragraph = self.doc.add_paragraph(style=style)
             self.current_paragraph.alignment = alignment
             pf = self.current_paragraph.paragraph_format
@@ -83,13 +214,25 @@ class DocxBuilder:
 
     def close_paragraph(self):
         """Завершить текущий параграф"""
+        self._flush_text()
         if self.current_paragraph is not None:
             self._has_content = True
         self.current_paragraph = None
         self._paragraph_is_empty = True
 
+    def _flush_text(self):
+        """Записать накопленный текст одним run"""
+        if not self._pending_text:
+            return
+        self.stats.runs += 1
+        run = self.current_paragraph.add_run("".join(self._pending_text))
+        self._apply_style(run, self._pending_ctx)
+        self._pending_text = []
+        self._pending_ctx = None
+
     def _add_empty_paragraph(self):
         """Добавить пустой параграф (визуальная пустая строка)"""
+        self.stats.paragraphs += 1
         p = self.doc.add_paragraph()
         p.paragraph_format.space_before = Pt(0)
         p.paragraph_format.space_after = Pt(0)
@@ -121,14 +264,24 @@ class DocxBuilder:
 
         for _ in range(empty_lines):
             self._add_empty_paragraph()
+        self.stats.empty_paragraphs += max(empty_lines, 0)
 
         self._consecutive_br = 0
 
     def _apply_style(self, run, ctx):
+        style_id = None
+        if ctx.code or ctx.spoiler or ctx.quote:
+            style_id = self.char_styles.get((ctx.code, ctx.spoiler, ctx.quote))
+        if style_id:
+            # Ссылка на стиль вместо копии оформления в каждом run
+            run._r.style = style_id
         if ctx.bold: run.bold = True
         if ctx.italic: run.italic = True
         if ctx.underline: run.underline = True
         if ctx.strike: run.font.strike = True
+        if style_id:
+            return
+        if ctx.quote: run.italic = True
         if ctx.spoiler:
             run.font.highlight_color = WD_COLOR_INDEX.BLACK
             run.font.color.rgb = RGBColor(255, 255, 255)
@@ -157,11 +310,12 @@ class DocxBuilder:
     def _add_image(self, src):
         self._flush_pending_breaks()
         self.close_paragraph()
-        img_data = download_image(
+        img_data = self.image_loader(
             src, session=self.session,
             config=self.config, cache=self.image_cache
         )
         if not img_data:
+            self.stats.images_skipped += 1
             return
         try:
             max_w = (self.config.cell_image_width_inches
@@ -178,13 +332,17 @@ class DocxBuilder:
                 except Exception:
                     img_data.seek(0)
             p = self.doc.add_paragraph()
+            self.stats.paragraphs += 1
             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
             p.paragraph_format.space_before = Pt(2)
             p.paragraph_format.space_after = Pt(2)
             run = p.add_run()
+            self.stats.runs += 1
             run.add_picture(img_data, width=final_width)
+            self.stats.images_inserted += 1
             self._has_content = True
         except Exception as e:
+            self.stats.images_skipped += 1
             logger.warning(f"Ошибка вставки изображения: {e}")
         self.close_paragraph()
 
@@ -193,25 +351,42 @@ class DocxBuilder:
     # ==========================================
 
     def process_node(self, node, style_ctx=None):
-        self._depth += 1
-        if self._depth > self.MAX_RECURSION_DEPTH:
-            self._depth -= 1
-            return
-        try:
-            if style_ctx is None:
-                style_ctx = StyleContext()
-            if isinstance(node, NavigableString):
-                self._process_text(node, style_ctx)
-            elif isinstance(node, Tag):
-                self._process_tag(node, style_ctx)
-        finally:
-            self._depth -= 1
+        """
+        Обход поддерева без рекурсии: явный стек из событий.
+        (_ENTER, узел, стиль) — обработать узел;
+        (_EXIT, функция, аргумент) — действие после детей узла.
+        Глубина вложенности ограничена только памятью.
+        Текст может остаться в буфере — в конце вызвать close_paragraph().
+        """
+        if style_ctx is None:
+            style_ctx = StyleContext()
+        stack = [(_ENTER, node, style_ctx)]
+        stats = self.stats
+        pop = stack.pop
+        while stack:
+            event, item, arg = pop()
+            if event == _EXIT:
+                item(arg)
+                continue
+            stats.nodes_visited += 1
+            # Текстовые узлы всех парсеров — подклассы str
+            if isinstance(item, str):
+                self._process_text(item, arg)
+            else:
+                self._process_tag(item, arg, stack)
+
+    @staticmethod
+    def _push_children(stack, node, ctx):
+        """Положить детей на стек так, чтобы первый ребёнок снялся первым"""
+        children = list(node.children)
+        children.reverse()
+        stack.extend([(_ENTER, child, ctx) for child in children])
 
     def _process_text(self, node, ctx):
         text = str(node)
 
         if not ctx.code:
-            text = re.sub(r'\s+', ' ', text)
+            text = _WHITESPACE.sub(' ', text)
 
         if not text or (text.isspace() and not ctx.code):
             return
@@ -219,7 +394,7 @@ class DocxBuilder:
         # Есть реальный текст — сбрасываем накопленные переносы
         self._flush_pending_breaks()
 
-        p = self.get_paragraph()
+        self._ensure_paragraph()
 
         # Убираем ведущие пробелы в начале параграфа
         if self._paragraph_is_empty:
@@ -227,12 +402,16 @@ class DocxBuilder:
             if not text:
                 return
 
-        run = p.add_run(text)
-        self._apply_style(run, ctx)
+        if self._pending_text and ctx is not self._pending_ctx \
+                and ctx != self._pending_ctx:
+            self._flush_text()
+        if not self._pending_text:
+            self._pending_ctx = ctx
+        self._pending_text.append(text)
         self._paragraph_is_empty = False
         self._has_content = True
 
-    def _process_tag(self, node, ctx):
+    def _process_tag(self, node, ctx, stack):
         tag = node.name
         classes = set(node.get('class', []))
 
@@ -274,6 +453,7 @@ class DocxBuilder:
         if tag == 'hr':
             self._flush_pending_breaks()
             p = self.doc.add_paragraph()
+            self.stats.paragraphs += 1
             add_horizontal_line(p)
             self.close_paragraph()
             self._has_content = True
@@ -287,17 +467,17 @@ class DocxBuilder:
 
         if tag == 'a':
             self._flush_pending_breaks()
-            self._handle_link(node, new_ctx)
+            self._handle_link(node, new_ctx, stack)
             return
 
         if tag in ('ul', 'ol'):
             self._flush_pending_breaks()
-            self._handle_list(node, tag, new_ctx)
+            self._handle_list(node, tag, new_ctx, stack)
             return
 
         if tag == 'blockquote':
             self._flush_pending_breaks()
-            self._handle_blockquote(node, new_ctx)
+            self._handle_blockquote(node, new_ctx, stack)
             return
 
         if 'bb_table' in classes:
@@ -305,12 +485,13 @@ class DocxBuilder:
             self._handle_table(node)
             return
 
-        # --- Рекурсия ---
-        for child in node.children:
-            self.process_node(child, new_ctx)
-
+        # --- Дети ---
         if new_ctx.code and tag in self.CODE_TAGS:
-            self.close_paragraph()
+            stack.append((_EXIT, self._close_after, None))
+        self._push_children(stack, node, new_ctx)
+
+    def _close_after(self, _):
+        self.close_paragraph()
 
     # ==========================================
     # ПРОВЕРКА ПУСТОГО БЛОКА
@@ -329,17 +510,15 @@ class DocxBuilder:
           <p>&nbsp;</p>
         """
         for child in node.children:
-            if isinstance(child, Tag):
-                if child.name == 'br':
-                    continue
-                # Есть непустой дочерний тег — блок не пустой
-                return False
-            elif isinstance(child, NavigableString):
-                text = str(child).strip()
+            if isinstance(child, str):
+                text = child.strip()
                 # &nbsp; тоже считаем пустым
                 text = text.replace('\xa0', '').replace('&nbsp;', '')
                 if text:
                     return False
+            elif child.name != 'br':
+                # Есть непустой дочерний тег — блок не пустой
+                return False
         return True
 
     # ==========================================
@@ -355,7 +534,9 @@ class DocxBuilder:
             level = int(tag_name[1])
         except (ValueError, IndexError):
             level = 1
+        self.stats.runs += 1
         if not self.is_cell:
+            self.stats.paragraphs += 1
             self.doc.add_heading(text, level=min(level, 9))
         else:
             p = self.get_paragraph()
@@ -370,7 +551,9 @@ class DocxBuilder:
         if not text:
             self.close_paragraph()
             return
+        self.stats.runs += 1
         if not self.is_cell:
+            self.stats.paragraphs += 1
             self.doc.add_heading(text, level=level + 1)
         else:
             p = self.get_paragraph()
@@ -380,7 +563,7 @@ class DocxBuilder:
         self.close_paragraph()
         self._has_content = True
 
-    def _handle_link(self, node, ctx):
+    def _handle_link(self, node, ctx, stack):
         href = node.get('href')
         img_child = node.find('img')
         if img_child:
@@ -393,12 +576,12 @@ class DocxBuilder:
         link_text = node.get_text().strip()
 
         if not link_text:
-            for child in node.children:
-                self.process_node(child, ctx)
+            self._push_children(stack, node, ctx)
             return
 
+        self.stats.runs += 1
         if href:
-            add_hyperlink(p, href, link_text)
+            add_hyperlink(p, href, link_text, index=self.links)
         else:
             run = p.add_run(link_text)
             self._apply_style(run, ctx)
@@ -406,91 +589,126 @@ class DocxBuilder:
         self._paragraph_is_empty = False
         self._has_content = True
 
-    def _handle_list(self, node, list_type, ctx):
-        self._list_depth += 1
-        if self._list_depth > self.MAX_LIST_DEPTH:
-            self._list_depth -= 1
+    def _handle_list(self, node, list_type, ctx, stack):
+        if self._list_depth >= self.MAX_LIST_DEPTH:
+            # Глубже не идём намеренно — учитываем пропуск
+            self.stats.subtrees_skipped += 1
             return
-        try:
-            style = 'List Number' if list_type == 'ol' else 'List Bullet'
-            for li in node.find_all('li', recursive=False):
-                self.current_paragraph = self.doc.add_paragraph(
-                    style=style
-                )
-                self.current_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-                pf = self.current_paragraph.paragraph_format
-                pf.space_before = Pt(0)
-                pf.space_after = Pt(0)
-                if self._list_depth > 1:
-                    pf.left_indent = Inches(0.25 * self._list_depth)
-                self._paragraph_is_empty = True
-                for child in li.children:
-                    self.process_node(child, ctx)
-                self.close_paragraph()
-            self._has_content = True
-        finally:
-            self._list_depth -= 1
+        self._list_depth += 1
+        style = 'List Number' if list_type == 'ol' else 'List Bullet'
+        stack.append((_EXIT, self._end_list, None))
+        items = node.find_all('li', recursive=False)
+        for li in reversed(items):
+            stack.append((_EXIT, self._close_after, None))
+            self._push_children(stack, li, ctx)
+            stack.append((_EXIT, self._start_list_item, style))
+
+    def _start_list_item(self, style):
+        self._flush_text()
+        self.stats.paragraphs += 1
+        self.current_paragraph = self.doc.add_paragraph(style=style)
+        self.current_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        pf = self.current_paragraph.paragraph_format
+        pf.space_before = Pt(0)
+        pf.space_after = Pt(0)
+        if self._list_depth > 1:
+            pf.left_indent = Inches(0.25 * self._list_depth)
+        self._paragraph_is_empty = True
+
+    def _end_list(self, _):
+        self._has_content = True
+        self._list_depth -= 1
 
-    def _handle_blockquote(self, node, ctx):
+    def _handle_blockquote(self, node, ctx, stack):
         self.close_paragraph()
+        p = self._add_quote_paragraph()
+        quote_ctx = ctx.copy()
+        quote_ctx.quote = True
+        self.current_paragraph = p
+        self._paragraph_is_empty = True
+        stack.append((_EXIT, self._end_blockquote, None))
+        self._push_children(stack, node, quote_ctx)
+
+    def _add_quote_paragraph(self):
+        self.stats.paragraphs += 1
         p = self.doc.add_paragraph()
         p.paragraph_format.left_indent = Inches(0.5)
         p.paragraph_format.space_before = Pt(2)
         p.paragraph_format.space_after = Pt(2)
-        quote_ctx = ctx.copy()
-        quote_ctx.italic = True
-        self.current_paragraph = p
-        self._paragraph_is_empty = True
-        for child in node.children:
-            self.process_node(child, quote_ctx)
+        return p
+
+    def _end_blockquote(self, _):
         self.close_paragraph()
         self._has_content = True
 
+    def _cell_builder(self, cell):
+        """Построитель для ячейки таблицы (статистика и стили — общие)"""
+        return DocxBuilder(
+            cell, config=self.config, session=self.session,
+            image_cache=self.image_cache, log_func=self.log_func,
+            image_loader=self.image_loader, stats=self.stats,
+            char_styles=self.char_styles, links=self.links,
+        )
+
     def _handle_table(self, table_node):
         self.close_paragraph()
         if self.is_cell:
+            # Вложенные таблицы Word не поддерживаются — только пометка
+            self.stats.table_fallbacks += 1
+            self.stats.runs += 1
             p = self.get_paragraph()
             p.add_run("[Table]").italic = True
             self.close_paragraph()
             return
         rows = table_node.find_all('div', class_='bb_table_tr')
-        if not rows:
-            return
-        first_cells = rows[0].find_all(
-            'div', class_=['bb_table_td', 'bb_table_th']
-        )
-        cols = len(first_cells)
+        # Один проход по строкам; ширина — по самой длинной строке
+        grid = [row.find_all('div', class_=self.TABLE_CELL_CLASSES)
+                for row in rows]
+        cols = max((len(cells) for cells in grid), default=0)
         if cols == 0:
             return
         try:
-            table = self.doc.add_table(rows=len(rows), cols=cols)
+            table = self.doc.add_table(rows=len(grid), cols=cols)
+            self.stats.tables += 1
             table.style = 'Table Grid'
-            for i, row in enumerate(rows):
-                cells = row.find_all(
-                    'div', class_=['bb_table_td', 'bb_table_th']
-                )
-                for j, cell_html in enumerate(cells):
-                    if j >= cols:
-                        break
-                    cell_docx = table.rows[i].cells[j]
-                    cell_docx._element.clear_content()
-                    cb = DocxBuilder(
-                        cell_docx, config=self.config,
-                        session=self.session,
-                        image_cache=self.image_cache,
-                        log_func=self.log_func
-                    )
-                    for child in cell_html.children:
-                        cb.process_node(child)
-                    if len(cell_docx.paragraphs) == 0:
-                        p = cell_docx.add_paragraph()
-                        p.paragraph_format.space_before = Pt(0)
-                        p.paragraph_format.space_after = Pt(0)
+            cb = None
+            header_ctx = StyleContext(bold=True)
+            leading_header = True
+            # Ячейки берём прямо из w:tr/w:tc — без пересчёта сетки
+            # python-docx на каждое обращение table.rows[i].cells[j]
+            for tr, cells in zip(table._tbl.tr_lst, grid):
+                is_header = [self._is_header_cell(c) for c in cells]
+                leading_header = leading_header and bool(cells) and all(is_header)
+                if leading_header:
+                    # Строка заголовков повторяется на каждой странице
+                    tr.get_or_add_trPr().append(OxmlElement('w:tblHeader'))
+                for tc, cell_html, header in zip(tr.tc_lst, cells, is_header):
+                    cell_docx = _Cell(tc, table)
+                    tc.clear_content()
+                    if cb is None:
+                        cb = self._cell_builder(cell_docx)
                     else:
-                        for p in cell_docx.paragraphs:
-                            p.paragraph_format.space_before = Pt(0)
-                            p.paragraph_format.space_after = Pt(0)
+                        cb.reset(cell_docx)
+                    ctx = header_ctx if header else None
+                    for child in cell_html.children:
+                        cb.process_node(child, ctx)
+                    cb.close_paragraph()
+                    self._finish_cell(cell_docx)
             self._has_content = True
         except Exception as e:
+            self.stats.table_fallbacks += 1
             logger.error(f"Ошибка таблицы: {e}")
-        self.close_paragraph()
\ No newline at end of file
+        self.close_paragraph()
+
+    @staticmethod
+    def _is_header_cell(cell_html):
+        return 'bb_table_th' in cell_html.get('class', [])
+
+    @staticmethod
+    def _finish_cell(cell_docx):
+        paragraphs = cell_docx.paragraphs
+        if not paragraphs:
+            paragraphs = [cell_docx.add_paragraph()]
+        for p in paragraphs:
+            p.paragraph_format.space_before = Pt(0)
+            p.paragraph_format.space_after = Pt(0)
@@ -0,0 +1,138 @@
+"""
+Потоковая запись DOCX
+
+python-docx держит все картинки документа в памяти до doc.save().
+Здесь картинка пишется в zip сразу при добавлении, а в пакете
+остаётся только её «тень»: имя части, SHA-1 и размеры в пикселях.
+XML-части (document.xml, стили, связи) пишутся при save().
+Содержимое частей совпадает с doc.save(); отличается только
+порядок записей в zip (картинки идут первыми).
+
+Сжатие выбирается по типу части: JPEG/PNG/GIF уже сжаты и
+кладутся как есть (ZIP_STORED), XML — deflate с заданным уровнем.
+Без attach() writer просто сохраняет документ с таким сжатием.
+"""
+
+import os
+import logging
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+from docx.image.image import Image
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.package import ImageParts
+from docx.parts.image import ImagePart
+
+logger = logging.getLogger(__name__)
+
+TMP_SUFFIX = ".part"
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Форматы со своим сжатием — deflate их не уменьшит
+PRECOMPRESSED_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/gif", "image/webp",
+})
+
+
+def compress_type_for(content_type: str) -> int:
+    return ZIP_STORED if content_type in PRECOMPRESSED_TYPES else ZIP_DEFLATED
+
+
+class StreamedImagePart(ImagePart):
+    """Часть-картинка, чьи байты уже записаны в zip"""
+
+    def __init__(self, partname, content_type, image, sha1):
+        # Вместо blob — только заголовок картинки (размеры, dpi)
+        shadow = Image(b"", image.filename, image._image_header)
+        super().__init__(partname, content_type, b"", shadow)
+        self._sha1 = sha1
+
+    @property
+    def sha1(self):
+        return self._sha1
+
+
+class _StreamingImageParts(ImageParts):
+    def __init__(self, writer, existing):
+        super().__init__()
+        self._writer = writer
+        for part in existing:
+            self.append(part)
+
+    def _add_image_part(self, image):
+        partname = self._next_image_partname(image.ext)
+        self._writer.write_part(partname, image.blob, image.content_type)
+        part = StreamedImagePart(partname, image.content_type, image, image.sha1)
+        self.append(part)
+        return part
+
+
+class StreamingDocxWriter:
+    """
+    writer.attach(doc) — до первой картинки;
+    writer.save(doc)  — вместо doc.save(path);
+    writer.abort()    — убрать недописанный файл (после save ничего не делает).
+    """
+
+    def __init__(self, path: str, compress_level: int = DEFAULT_COMPRESS_LEVEL):
+        self.path = path
+        self.compress_level = compress_level
+        self._tmp_path = path + TMP_SUFFIX
+        self._zip = None
+        self._done = False
+        self.streamed_bytes = 0
+
+    def attach(self, doc):
+        package = doc.part.package
+        package.__dict__["image_parts"] = _StreamingImageParts(
+            self, list(package.image_parts)
+        )
+
+    def _open(self):
+        if self._zip is None:
+            self._zip = ZipFile(self._tmp_path, "w", compression=ZIP_DEFLATED,
+                                compresslevel=self.compress_level)
+        return self._zip
+
+    def _write(self, membername: str, blob: bytes, content_type: str = ""):
+        self._open().writestr(membername, blob,
+                              compress_type=compress_type_for(content_type))
+
+    def write_part(self, partname, blob: bytes, content_type: str = ""):
+        self._write(partname.membername, blob, content_type)
+        self.streamed_bytes += len(blob)
+
+    def save(self, doc):
+        """Дописать XML-части и атомарно переименовать файл"""
+        package = doc.part.package
+        parts = list(package.iter_parts())
+        zf = self._open()
+        try:
+            self._write(CONTENT_TYPES_URI.membername,
+                        _ContentTypesItem.from_parts(parts).blob)
+            self._write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+            for part in parts:
+                if not isinstance(part, StreamedImagePart):
+                    self._write(part.partname.membername, part.blob,
+                                part.content_type)
+                if len(part.rels):
+                    self._write(part.partname.rels_uri.membername, part.rels.xml)
+        finally:
+            zf.close()
+            self._zip = None
+        os.replace(self._tmp_path, self.path)
+        self._done = True
+
+    def abort(self):
+        if self._done:
+            return
+        if self._zip is not None:
+            try:
+                self._zip.close()
+            except OSError:
+                pass
+            self._zip = None
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,364 @@
+"""
+Выбор HTML-парсера
+
+  html.parser  — встроенный парсер bs4 (медленный, без зависимостей)
+  lxml         — bs4 с деревом от lxml
+  lxml-native  — чистый lxml.html + тонкий адаптер с интерфейсом bs4
+                 (name/get/children/find/find_all/get_text), которого
+                 хватает DocxBuilder и GuideDownloader
+  auto         — lxml-native, если установлен lxml, иначе html.parser
+"""
+
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from config import HTML_PARSERS as BACKENDS
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+
+def available_backends() -> list[str]:
+    result = ["html.parser"]
+    if HAS_LXML:
+        result += ["lxml", "lxml-native"]
+    return result
+
+
+def resolve_backend(name: str) -> str:
+    if name == "auto" or name not in BACKENDS:
+        return "lxml-native" if HAS_LXML else "html.parser"
+    if name in ("lxml", "lxml-native") and not HAS_LXML:
+        logger.warning(f"lxml не установлен, парсер {name} недоступен")
+        return "html.parser"
+    return name
+
+
+_local = threading.local()
+
+
+def _native_parser():
+    # huge_tree: libxml2 иначе молча обрезает дерево глубже ~255 уровней.
+    # Парсер lxml нельзя делить между потоками — свой на каждый поток
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = lxml.html.HTMLParser(huge_tree=True)
+    return parser
+
+
+def parse_html(html: str, backend: str = "auto", parse_only=None):
+    """Разобрать страницу; корень поддерживает find/find_all как у bs4"""
+    backend = resolve_backend(backend)
+    if backend == "lxml-native":
+        return LxmlNode(lxml.html.document_fromstring(html, parser=_native_parser()))
+    return BeautifulSoup(html, backend, parse_only=parse_only)
+
+
+# ==========================================
+# Области руководства
+# ==========================================
+
+# bs4 строит дерево только для заголовка и тела руководства —
+# комментарии, сайдбары и скрипты пропускаются
+GUIDE_STRAINER = SoupStrainer(attrs={"class": re.compile(
+    r"^(workshopItemTitle|subSection detailBox|guide subSections)$"
+)})
+
+STEAM_TITLE_SUFFIX = re.compile(r"\s*::\s*Steam Community.*$")
+
+
+@dataclass
+class GuideSection:
+    node: Any
+    title: Optional[Any] = None
+    desc: Optional[Any] = None
+
+
+@dataclass
+class GuideRegions:
+    title: str = "Steam_Guide"
+    title_node: Optional[Any] = None
+    sections: list[GuideSection] = field(default_factory=list)
+    content: Optional[Any] = None
+    images: list[str] = field(default_factory=list)
+
+    @property
+    def has_body(self) -> bool:
+        return bool(self.sections) or self.content is not None
+
+
+BODY_CLASSES = ("subSection detailBox", "guide subSections")
+
+
+def _class_list(value) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return value.split()
+    return value
+
+
+def _is_body(el, joined: str) -> bool:
+    return joined in BODY_CLASSES or el.get("id") == "guideContent"
+
+
+class _RegionCollector:
+    """
+    Раскладывает теги по областям. Теги подаются в порядке документа;
+    совпадения по классам — те же, что у find(class_=...) в bs4.
+    """
+
+    def __init__(self, wrap):
+        self.wrap = wrap
+        self.regions = GuideRegions()
+        self.section: Optional[GuideSection] = None
+        self._page_title = None
+        self._guide_content = None
+        self._guide_sub_sections = None
+
+    def tag(self, el, name: str, classes: list[str], joined: str,
+            in_body: bool):
+        if name == "div":
+            if joined == "subSection detailBox":
+                self.section = GuideSection(self.wrap(el))
+                self.regions.sections.append(self.section)
+            elif self.section is not None and "subSectionTitle" in classes:
+                if self.section.title is None:
+                    self.section.title = self.wrap(el)
+            elif self.section is not None and "subSectionDesc" in classes:
+                if self.section.desc is None:
+                    self.section.desc = self.wrap(el)
+            elif joined == "guide subSections":
+                if self._guide_sub_sections is None:
+                    self._guide_sub_sections = self.wrap(el)
+            if "workshopItemTitle" in classes and self.regions.title_node is None:
+                self.regions.title_node = self.wrap(el)
+            if self._guide_content is None and el.get("id") == "guideContent":
+                self._guide_content = self.wrap(el)
+        elif name == "img" and in_body:
+            src = el.get("src")
+            if src:
+                self.regions.images.append(src)
+        elif name == "title" and self._page_title is None:
+            self._page_title = self.wrap(el)
+
+    def finish(self) -> GuideRegions:
+        regions = self.regions
+        if not regions.sections:
+            regions.content = self._guide_content or self._guide_sub_sections
+        title = ""
+        if regions.title_node is not None:
+            title = regions.title_node.get_text(strip=True)
+        if not title and self._page_title is not None:
+            title = STEAM_TITLE_SUFFIX.sub(
+                "", self._page_title.get_text(strip=True)
+            )
+        regions.title = title or "Steam_Guide"
+        return regions
+
+
+def _bs4_events(soup) -> Iterator[tuple[str, Any, str]]:
+    """События входа/выхода по тегам bs4, как у etree.iterwalk"""
+    stack = [iter(soup.children)]
+    open_tags = []
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, Tag):
+                yield "start", child, child.name
+                open_tags.append(child)
+                stack.append(iter(child.children))
+                break
+        else:
+            stack.pop()
+            if open_tags:
+                el = open_tags.pop()
+                yield "end", el, el.name
+
+
+# Остальные теги _RegionCollector не нужны — их пропускает сам lxml (на C)
+_NATIVE_TAGS = ("div", "img", "title")
+
+
+def _native_events(root_el) -> Iterator[tuple[str, Any, str]]:
+    for event, el in etree.iterwalk(root_el, events=("start", "end"),
+                                    tag=_NATIVE_TAGS):
+        yield event, el, el.tag
+
+
+def _collect(collector: _RegionCollector, events) -> None:
+    body_depth = 0
+    section_el = None
+    # Один проход с событиями входа/выхода: видно границы тела и секций
+    for event, el, name in events:
+        if event == "end":
+            if el is section_el:
+                collector.section = None
+                section_el = None
+            if name == "div" and _is_body(el, " ".join(_class_list(el.get("class")))):
+                body_depth -= 1
+            continue
+        classes = _class_list(el.get("class"))
+        joined = " ".join(classes)
+        collector.tag(el, name, classes, joined, body_depth > 0)
+        if name == "div":
+            if joined == "subSection detailBox":
+                section_el = el
+            if _is_body(el, joined):
+                body_depth += 1
+
+
+def _extract_bs4(soup) -> GuideRegions:
+    collector = _RegionCollector(lambda el: el)
+    _collect(collector, _bs4_events(soup))
+    return collector.finish()
+
+
+def _extract_native(root: "LxmlNode") -> GuideRegions:
+    collector = _RegionCollector(LxmlNode)
+    _collect(collector, _native_events(root._el))
+    return collector.finish()
+
+
+def extract_regions(root) -> GuideRegions:
+    """Заголовок, секции, тело и список картинок за один обход"""
+    if isinstance(root, LxmlNode):
+        return _extract_native(root)
+    return _extract_bs4(root)
+
+
+def parse_guide(html: str, backend: str = "auto",
+                partial: bool = True) -> GuideRegions:
+    """
+    Разобрать страницу руководства.
+    partial=True — для bs4 строится только дерево областей руководства;
+    если на странице нет ожидаемой разметки, разбираем её целиком.
+    lxml-native (выбор auto) partial не использует: libxml2 строит дерево
+    целиком, а при обходе lxml сам пропускает все теги, кроме div/img/title.
+    Поиск областей заранее (XPath) выигрывает только на страницах, где
+    чужой разметки больше, чем руководства, и проигрывает на больших.
+    """
+    backend = resolve_backend(backend)
+    if partial and backend != "lxml-native":
+        regions = extract_regions(
+            parse_html(html, backend, parse_only=GUIDE_STRAINER)
+        )
+        title_node = regions.title_node
+        if regions.has_body and title_node is not None \
+                and title_node.get_text(strip=True):
+            return regions
+    return extract_regions(parse_html(html, backend))
+
+
+# ==========================================
+# Адаптер lxml → интерфейс bs4
+# ==========================================
+
+class LxmlText(str):
+    """Текстовый узел (аналог NavigableString)"""
+    __slots__ = ()
+
+
+def _match_class(element, class_) -> bool:
+    if class_ is None:
+        return True
+    raw = element.get("class")
+    if raw is None:
+        return False
+    classes = raw.split()
+    if isinstance(class_, str):
+        return class_ in classes or class_ == " ".join(classes)
+    return any(c in classes for c in class_)
+
+
+class LxmlNode:
+    __slots__ = ("_el",)
+
+    def __init__(self, element):
+        self._el = element
+
+    @property
+    def name(self) -> str:
+        return self._el.tag
+
+    def get(self, key: str, default=None):
+        value = self._el.get(key)
+        if value is None:
+            return default
+        if key == "class":
+            return value.split()
+        return value
+
+    @property
+    def children(self) -> Iterator:
+        el = self._el
+        if el.text:
+            yield LxmlText(el.text)
+        for child in el:
+            tag = child.tag
+            if isinstance(tag, str):
+                yield LxmlNode(child)
+            elif tag is etree.Comment:
+                # bs4 отдаёт комментарии как текстовые узлы
+                yield LxmlText(child.text or "")
+            if child.tail:
+                yield LxmlText(child.tail)
+
+    def _iter(self, name, class_, id, recursive):
+        if recursive:
+            candidates = self._el.iterdescendants(name) if name else (
+                e for e in self._el.iterdescendants() if isinstance(e.tag, str)
+            )
+        else:
+            candidates = (e for e in self._el
+                          if isinstance(e.tag, str) and (not name or e.tag == name))
+        for el in candidates:
+            if id is not None and el.get("id") != id:
+                continue
+            if _match_class(el, class_):
+                yield el
+
+    def find(self, name=None, class_=None, id=None) -> Optional["LxmlNode"]:
+        for el in self._iter(name, class_, id, True):
+            return LxmlNode(el)
+        return None
+
+    def find_all(self, name=None, class_=None, id=None,
+                 recursive=True) -> list["LxmlNode"]:
+        return [LxmlNode(el) for el in self._iter(name, class_, id, recursive)]
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        # itertext пропускает текст комментариев — как get_text у bs4
+        strings = self._el.itertext()
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    def decompose(self):
+        """Удалить узел из дерева (хвостовой текст остаётся, как в bs4)"""
+        el = self._el
+        parent = el.getparent()
+        if parent is None:
+            return
+        if el.tail:
+            prev = el.getprevious()
+            if prev is not None:
+                prev.tail = (prev.tail or "") + el.tail
+            else:
+                parent.text = (parent.text or "") + el.tail
+        parent.remove(el)
+
+    def __str__(self) -> str:
+        return etree.tostring(self._el, encoding="unicode", method="html",
+                              with_tail=False)
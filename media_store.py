@@ -0,0 +1,151 @@
+"""
+Общее хранилище изображений с адресацией по содержимому (SHA-256)
+
+Одинаковые картинки (шапки, разделители, иконки) разных руководств
+хранятся один раз; в папке руководства — жёсткие ссылки на них
+(или копии, если ФС не поддерживает ссылки). Копии не видны в st_nlink,
+поэтому каждая дописывается строкой в copies.log хранилища.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import posixpath
+import shutil
+import tempfile
+from io import BytesIO
+from urllib.parse import urlparse
+
+from config import HAS_PILLOW
+
+if HAS_PILLOW:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+KNOWN_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'})
+COPIES_FILE = "copies.log"
+
+
+def guess_extension(url: str, blob: bytes) -> str:
+    if HAS_PILLOW:
+        try:
+            fmt = Image.open(BytesIO(blob)).format
+            if fmt:
+                return '.' + ('jpg' if fmt == 'JPEG' else fmt.lower())
+        except Exception:
+            pass
+    ext = posixpath.splitext(urlparse(url).path)[1].lower()
+    return ext if ext in KNOWN_EXTENSIONS else '.bin'
+
+
+class MediaStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def add(self, blob: bytes, ext: str) -> tuple[str, bool]:
+        """Положить blob; (путь, True если записан впервые)"""
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self._blob_path(digest, ext)
+        if os.path.exists(path):
+            return path, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path, True
+
+    @staticmethod
+    def link(src: str, dest: str) -> bool:
+        """Жёсткая ссылка src → dest; копия, если нельзя. True — ссылка"""
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+            return True
+        except OSError:
+            shutil.copyfile(src, dest)
+            return False
+
+    def export(self, images: dict[str, bytes], dest_dir: str) -> dict:
+        """Выложить картинки руководства в dest_dir; вернуть сводку"""
+        os.makedirs(dest_dir, exist_ok=True)
+        index = {}
+        new_blobs = 0
+        linked = 0
+        copied = []
+        for n, (url, blob) in enumerate(images.items(), 1):
+            ext = guess_extension(url, blob)
+            src, is_new = self.add(blob, ext)
+            name = f"img_{n:03d}{ext}"
+            if self.link(src, os.path.join(dest_dir, name)):
+                linked += 1
+            else:
+                copied.append(os.path.basename(src))
+            new_blobs += is_new
+            index[name] = url
+        if copied:
+            self._record_copies(copied)
+        with open(os.path.join(dest_dir, "index.json"), "w",
+                  encoding="utf-8") as f:
+            json.dump(index, f, indent=1, ensure_ascii=False)
+        return {"images": len(images), "new": new_blobs, "linked": linked}
+
+    def _record_copies(self, names: list[str]):
+        # O_APPEND: строки из параллельных процессов пакета не смешиваются
+        with open(os.path.join(self.root, COPIES_FILE), "a",
+                  encoding="utf-8") as f:
+            f.write("".join(name + "\n" for name in names))
+
+    def _copies(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        try:
+            with open(os.path.join(self.root, COPIES_FILE),
+                      encoding="utf-8") as f:
+                for line in f:
+                    name = line.strip()
+                    if name:
+                        counts[name] = counts.get(name, 0) + 1
+        except FileNotFoundError:
+            pass
+        return counts
+
+    def report(self) -> dict:
+        """
+        Степень дедупликации по всему хранилищу.
+        Использований blob = жёсткие ссылки сверх самого хранилища
+        (st_nlink - 1) + копии из copies.log.
+        """
+        copies = self._copies()
+        blobs = 0
+        stored = 0
+        referenced = 0
+        refs = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                continue  # blob'ы лежат в подпапках, в корне — copies.log
+            for fn in filenames:
+                st = os.stat(os.path.join(dirpath, fn))
+                blobs += 1
+                stored += st.st_size
+                uses = max(st.st_nlink - 1 + copies.get(fn, 0), 1)
+                refs += uses
+                referenced += st.st_size * uses
+        return {
+            "blobs": blobs,
+            "references": refs,
+            "stored_bytes": stored,
+            "referenced_bytes": referenced,
+            "dedup_ratio": round(referenced / stored, 2) if stored else 1.0,
+        }
@@ -1,6 +1,8 @@
 """Сетевой слой"""
 
+import time
 import logging
+import sqlite3
 import threading
 from io import BytesIO
 from urllib.parse import urlparse, parse_qs
@@ -68,16 +70,32 @@ class URLValidator:
         return None
 
 
-def create_session(config: AppConfig) -> requests.Session:
+def create_session(config: AppConfig, pool_size: int = 10,
+                   limiter: Optional["HostRateLimiter"] = None) -> requests.Session:
     session = requests.Session()
     session.headers.update(HEADERS)
-    retry_strategy = Retry(
+    limiter = limiter or HostRateLimiter.from_config(config)
+    retry_cls = Retry if limiter is None else _ThrottledRetry
+    retry_strategy = retry_cls(
         total=config.max_retries,
         backoff_factor=config.retry_backoff,
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET"],
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    if limiter is None:
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+    else:
+        retry_strategy.limiter = limiter
+        adapter = ThrottledAdapter(
+            limiter,
+            max_retries=retry_strategy,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
@@ -127,6 +145,314 @@ class ImageCache:
             return f"Cache: {len(self._cache)} items, hits={self._hits}, miss={self._misses}, rate={rate:.0f}%"
 
 
+class SQLiteImageCache:
+    """
+    Дисковый кеш изображений в SQLite — общий для нескольких процессов.
+    Интерфейс совпадает с ImageCache.
+    """
+
+    def __init__(self, path: str, max_size: int = 5000):
+        self.path = path
+        self._max_size = max_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "url TEXT PRIMARY KEY, data BLOB NOT NULL, stored REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[BytesIO]:
+        try:
+            row = self._connect().execute(
+                "SELECT data FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Дисковый кеш: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return BytesIO(row[0])
+
+    def put(self, url: str, data: BytesIO):
+        data.seek(0)
+        blob = data.read()
+        data.seek(0)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO images (url, data, stored) "
+                    "VALUES (?, ?, julianday('now'))", (url, blob)
+                )
+                conn.execute(
+                    "DELETE FROM images WHERE url IN (SELECT url FROM images "
+                    "ORDER BY rowid DESC LIMIT -1 OFFSET ?)", (self._max_size,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Дисковый кеш: {e}")
+
+    def clear(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM images")
+        except sqlite3.Error as e:
+            logger.warning(f"Дисковый кеш: {e}")
+
+    def close(self):
+        """Закрыть соединение текущего потока"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @property
+    def stats(self) -> str:
+        with self._lock:
+            total = self._hits + self._misses
+            rate = (self._hits / total * 100) if total > 0 else 0
+            return f"Disk cache: hits={self._hits}, miss={self._misses}, rate={rate:.0f}%"
+
+
+# Ответы, после которых хост нужно разгрузить
+THROTTLE_STATUSES = (429, 503)
+
+
+class _MemoryBuckets:
+    """Корзины в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: dict[str, list] = {}
+
+    def update(self, host: str, func):
+        with self._lock:
+            state, result = func(self._states.get(host))
+            self._states[host] = state
+            return result
+
+    def close(self):
+        pass
+
+
+class _SQLiteBuckets:
+    """Корзины в SQLite — общие для процессов пакета, как SQLiteImageCache"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "host TEXT PRIMARY KEY, rate REAL NOT NULL, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL, cut REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, host: str, func):
+        conn = self._connect()
+        # IMMEDIATE — чтение и запись корзины одной транзакцией
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT rate, tokens, updated, cut FROM buckets WHERE host = ?",
+                (host,)
+            ).fetchone()
+            state, result = func(list(row) if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (host, rate, tokens, updated, cut) "
+                "VALUES (?, ?, ?, ?, ?)", (host, *state)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class HostRateLimiter:
+    """
+    Корзина токенов на хост: страницы сообщества и CDN картинок
+    ограничиваются каждый своей скоростью (0 — без ограничения).
+    Без path корзины свои у каждого ограничителя (одна сессия — один
+    ограничитель); с path состояние лежит в SQLite и общее для процессов.
+
+    Скорость подстраивается сама (AIMD): 429/503 режет её вдвое и
+    сдвигает корзину на Retry-After, а дальше она линейно возвращается
+    к заданной за RECOVERY_SECONDS — поток держится чуть ниже порога.
+    """
+
+    DECREASE = 0.5
+    MIN_RATE = 0.05
+    RECOVERY_SECONDS = 60.0
+    # Пачка одновременных 429 — одно снижение, а не несколько
+    CUT_COOLDOWN = 1.0
+    MAX_PAUSE = 300.0
+
+    def __init__(self, page_rate: float, image_rate: float, burst: int = 5,
+                 path: str = ""):
+        self.page_rate = page_rate
+        self.image_rate = image_rate
+        self.burst = burst
+        self._buckets = _SQLiteBuckets(path) if path else _MemoryBuckets()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.throttles = 0
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> Optional["HostRateLimiter"]:
+        if not config.rate_limit_pages and not config.rate_limit_images:
+            return None
+        return cls(config.rate_limit_pages, config.rate_limit_images,
+                   config.rate_limit_burst, config.rate_limit_file)
+
+    def ceiling(self, host: str) -> float:
+        if host in URLValidator.VALID_HOSTS:
+            return self.page_rate
+        return self.image_rate
+
+    def _refill(self, state, ceiling: float, now: float) -> list:
+        if state is None:
+            return [ceiling, float(self.burst), now, 0.0]
+        rate, tokens, updated, cut = state
+        elapsed = now - updated
+        # Корзина сдвинута в будущее паузой Retry-After — ждём её
+        if elapsed > 0:
+            rate = min(ceiling, rate + elapsed * ceiling / self.RECOVERY_SECONDS)
+            tokens = min(float(self.burst), tokens + elapsed * rate)
+            updated = now
+        return [rate, tokens, updated, cut]
+
+    def acquire(self, host: str) -> float:
+        """Занять токен и дождаться его; возвращает время ожидания"""
+        ceiling = self.ceiling(host)
+        if ceiling <= 0:
+            return 0.0
+
+        def take(state):
+            now = time.time()
+            rate, tokens, updated, cut = self._refill(state, ceiling, now)
+            tokens -= 1
+            wait = max(0.0, updated - now) + max(0.0, -tokens) / rate
+            return [rate, tokens, updated, cut], wait
+
+        try:
+            wait = self._buckets.update(host, take)
+        except sqlite3.Error as e:
+            logger.warning(f"Ограничитель запросов: {e}")
+            return 0.0
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.waited += wait
+        return wait
+
+    def throttled(self, host: str, retry_after: Optional[float] = None):
+        """Хост ответил 429/503: снизить скорость и выдержать паузу"""
+        ceiling = self.ceiling(host)
+        if ceiling <= 0:
+            return
+        pause = min(retry_after or 0.0, self.MAX_PAUSE)
+
+        def cut_rate(state):
+            now = time.time()
+            rate, tokens, updated, cut = self._refill(state, ceiling, now)
+            if now - cut >= self.CUT_COOLDOWN:
+                rate = max(self.MIN_RATE, rate * self.DECREASE)
+                cut = now
+            # Запас сгорает, отсчёт корзины — после паузы
+            return [rate, min(tokens, 0.0), max(updated, now + pause), cut], rate
+
+        try:
+            rate = self._buckets.update(host, cut_rate)
+        except sqlite3.Error as e:
+            logger.warning(f"Ограничитель запросов: {e}")
+            return
+        with self._lock:
+            self.throttles += 1
+        logger.info(f"{host}: ответ-отказ, скорость {rate:.2f}/с, пауза {pause:.0f} с")
+
+    def close(self):
+        """Закрыть соединение текущего потока"""
+        self._buckets.close()
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTPAdapter, берущий токен хоста перед каждым запросом"""
+
+    def __init__(self, limiter: HostRateLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).hostname
+        if host:
+            self.limiter.acquire(host)
+        return super().send(request, **kwargs)
+
+
+class _ThrottledRetry(Retry):
+    """
+    Retry, сообщающий ограничителю о 429/503. Повтор тоже берёт токен:
+    пауза Retry-After уже учтена в корзине хоста, и спать её ещё раз
+    (как делает Retry) не нужно.
+    """
+
+    limiter: Optional[HostRateLimiter] = None
+    host: Optional[str] = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.limiter = self.limiter
+        retry.host = self.host
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        host = _pool.host if _pool is not None else self.host
+        if (self.limiter is not None and host and response is not None
+                and response.status in THROTTLE_STATUSES):
+            self.limiter.throttled(host, self.get_retry_after(response))
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        retry.host = host
+        return retry
+
+    def sleep(self, response=None):
+        if self.limiter is None or not self.host:
+            super().sleep(response)
+            return
+        if response is None or response.status not in THROTTLE_STATUSES:
+            self._sleep_backoff()
+        self.limiter.acquire(self.host)
+
+
 _image_cache = ImageCache()
 
 
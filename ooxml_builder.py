@@ -0,0 +1,157 @@
+"""
+OoxmlDocxBuilder — DocxBuilder с прямой записью WordprocessingML
+
+Самые частые элементы (абзацы, run-ы с текстом, пустые строки,
+пункты списков) не собираются через объектный API python-docx,
+а клонируются из готовых шаблонов lxml. Шаблон каждой формы
+снимается с первого экземпляра, созданного обычным путём, поэтому
+XML совпадает с эталонным DocxBuilder байт в байт.
+Редкие элементы (картинки, заголовки, таблицы, ссылки) идут
+через python-docx как раньше.
+"""
+
+from copy import deepcopy
+
+from lxml import etree
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from docx_builder import DocxBuilder
+
+_T = qn('w:t')
+_XML_SPACE = qn('xml:space')
+# Эти символы python-docx превращает в w:tab / w:br
+_SPECIAL_CHARS = frozenset('\t\r\n')
+
+
+class OoxmlDocxBuilder(DocxBuilder):
+
+    def __init__(self, doc_context, *args, templates=None, **kwargs):
+        super().__init__(doc_context, *args, **kwargs)
+        # Шаблоны общие для документа и ячеек его таблиц
+        self._templates = templates if templates is not None else {}
+        self._bind_container()
+
+    def reset(self, doc_context):
+        super().reset(doc_context)
+        self._bind_container()
+
+    def _bind_container(self):
+        if self.is_cell:
+            self._container = self.doc._tc
+            self._anchor = None
+            self._parent = self.doc
+        else:
+            body = self.doc.element.body
+            self._container = body
+            # Новые абзацы — перед sectPr, как у python-docx
+            self._anchor = body.sectPr
+            self._parent = self.doc._body
+
+    def _cell_builder(self, cell):
+        return OoxmlDocxBuilder(
+            cell, config=self.config, session=self.session,
+            image_cache=self.image_cache, log_func=self.log_func,
+            image_loader=self.image_loader, stats=self.stats,
+            char_styles=self.char_styles, links=self.links,
+            templates=self._templates,
+        )
+
+    # ------------------------------------------
+    # Шаблоны
+    # ------------------------------------------
+
+    def _append(self, element):
+        if self._anchor is not None:
+            self._anchor.addprevious(element)
+        else:
+            self._container.append(element)
+
+    def _clone(self, key, build):
+        """
+        Новый элемент формы key. Первый раз — build() через python-docx
+        (элемент уже в документе), с него снимается шаблон.
+        """
+        template = self._templates.get(key)
+        if template is None:
+            element = build()
+            self._templates[key] = deepcopy(element)
+            return element
+        # Все формы — абзацы; build() считает сам
+        self.stats.paragraphs += 1
+        element = deepcopy(template)
+        self._append(element)
+        return element
+
+    # ------------------------------------------
+    # Горячие пути DocxBuilder
+    # ------------------------------------------
+
+    def _ensure_paragraph(self, style=None, alignment=WD_ALIGN_PARAGRAPH.LEFT):
+        if self.current_paragraph is not None:
+            return self.current_paragraph
+        if style is not None:
+            return super()._ensure_paragraph(style, alignment)
+        p = self._clone(
+            ('p', alignment),
+            lambda: super(OoxmlDocxBuilder, self)._ensure_paragraph(
+                None, alignment)._p,
+        )
+        self.current_paragraph = Paragraph(p, self._parent)
+        self._paragraph_is_empty = True
+        return self.current_paragraph
+
+    def _add_empty_paragraph(self):
+        def build():
+            super(OoxmlDocxBuilder, self)._add_empty_paragraph()
+            return self._container.xpath('./w:p')[-1]
+        self._clone(('empty',), build)
+
+    def _start_list_item(self, style):
+        self._flush_text()
+
+        def build():
+            super(OoxmlDocxBuilder, self)._start_list_item(style)
+            return self.current_paragraph._p
+        # Отступ в pPr зависит от глубины списка
+        p = self._clone(('li', style, max(self._list_depth, 1)), build)
+        self.current_paragraph = Paragraph(p, self._parent)
+        self._paragraph_is_empty = True
+
+    def _add_quote_paragraph(self):
+        p = self._clone(
+            ('quote',),
+            lambda: super(OoxmlDocxBuilder, self)._add_quote_paragraph()._p,
+        )
+        return Paragraph(p, self._parent)
+
+    def _flush_text(self):
+        if not self._pending_text:
+            return
+        text = "".join(self._pending_text)
+        ctx = self._pending_ctx
+        self._pending_text = []
+        self._pending_ctx = None
+        p = self.current_paragraph._p
+        self.stats.runs += 1
+
+        key = ('r', ctx.bold, ctx.italic, ctx.underline, ctx.strike,
+               ctx.spoiler, ctx.code, ctx.quote)
+        template = self._templates.get(key)
+        if template is None:
+            run = self.current_paragraph.add_run()
+            self._apply_style(run, ctx)
+            self._templates[key] = deepcopy(run._r)
+            r = run._r
+        else:
+            r = deepcopy(template)
+            p.append(r)
+
+        if _SPECIAL_CHARS.isdisjoint(text):
+            t = etree.SubElement(r, _T)
+            t.text = text
+            if len(text.strip()) < len(text):
+                t.set(_XML_SPACE, 'preserve')
+        else:
+            r.text = text
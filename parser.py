@@ -1,32 +1,77 @@
 """Парсер руководств Steam — обновлённая секция PDF"""
 
 import os
-import re
+import copy
+import time
+import hashlib
 import logging
 import threading
-from typing import Callable
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 import requests
-from bs4 import BeautifulSoup
 from docx import Document
 from docx.shared import Pt
 
 from config import AppConfig
 from translations import get_text
 from utils import clean_filename
-from network import create_session, URLValidator, ImageCache
-from docx_builder import DocxBuilder
+from network import create_session, download_image, URLValidator, ImageCache
+from docx_builder import BuilderStats, DocxBuilder, register_character_styles
+from ooxml_builder import OoxmlDocxBuilder
+from docx_writer import StreamingDocxWriter
+from html_backends import GuideRegions, parse_guide
+from media_store import MediaStore
+from streaming import GuideStreamScanner, ImagePrefetcher, fetch_streaming
+from archive import (
+    ARCHIVE_EXT, GuideArchive, RecordingImageCache, write_archive,
+)
 from pdf_converter import convert_docx_to_pdf, check_available_converters
+from telemetry import JobTelemetry, start_tracing, stop_tracing, write_record
+from profiling import JobProfiler
 
 logger = logging.getLogger(__name__)
 
+MEDIA_STORE_DIR = ".media"
+
+# Заголовки ответа, сохраняемые в архиве
+ARCHIVED_HEADERS = frozenset({
+    'content-type', 'date', 'etag', 'last-modified', 'expires',
+})
+
+
+@dataclass
+class DownloadResult:
+    """Итог одной загрузки: созданные файлы"""
+    url: str
+    files: list[str] = field(default_factory=list)
+    # Пик памяти Python-аллокаций (байт), если включён track_memory;
+    # tracemalloc общий на процесс — у параллельных заданий пик общий
+    peak_memory: Optional[int] = None
+    # Запись телеметрии (см. telemetry.JobTelemetry.record)
+    telemetry: Optional[dict] = None
+    # Счётчики построителя: абзацы, run-ы, пропущенное содержимое
+    builder_stats: Optional[BuilderStats] = None
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.files)
+
 
 class GuideDownloader:
-    def __init__(self, config: AppConfig):
+    # Заготовка документа со стилями: одна на процесс, на руководство — копия
+    _template = None
+    _template_lock = threading.Lock()
+
+    def __init__(self, config: AppConfig, session=None,
+                 image_cache: Optional[ImageCache] = None):
         self.config = config
-        self.session = create_session(config)
-        self.image_cache = ImageCache(max_size=100)
+        self.session = session or create_session(config)
+        # Общий кеш (сервер) не очищаем между загрузками
+        self._owns_cache = image_cache is None
+        self.image_cache = image_cache or ImageCache(max_size=100)
         self._cancelled = threading.Event()
+        self._prefetcher: Optional[ImagePrefetcher] = None
 
     def cancel(self):
         self._cancelled.set()
@@ -35,23 +80,80 @@ class GuideDownloader:
     def is_cancelled(self):
         return self._cancelled.is_set()
 
+    def _close_prefetcher(self):
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+
     def download(self, url, save_dir, lang_code, log_func,
-                 finish_func, convert_pdf=False):
+                 finish_func, convert_pdf=False,
+                 html: Optional[str] = None) -> DownloadResult:
+        """html — уже загруженная страница (режим наблюдения), иначе GET"""
         self._cancelled.clear()
-        self.image_cache.clear()
+        if self._owns_cache:
+            self.image_cache.clear()
+        result = DownloadResult(url)
+        telemetry = JobTelemetry(url)
+        profiler = JobProfiler.from_config(self.config)
+        if profiler is not None:
+            telemetry.on_stage = profiler.stage_done
+            profiler.start()
+        track_memory = self.config.track_memory
+        if track_memory:
+            start_tracing()
         try:
-            self._do_download(url, save_dir, lang_code,
-                              log_func, convert_pdf)
+            result.files = self._do_download(url, save_dir, lang_code,
+                                             log_func, convert_pdf, html,
+                                             telemetry)
         except Exception as e:
             logger.error(f"Ошибка загрузки: {e}", exc_info=True)
             log_func(f"Error: {e}")
         finally:
+            if track_memory:
+                result.peak_memory = stop_tracing()
+                log_func(get_text(lang_code, "log_peak_memory",
+                                  f"{result.peak_memory / 1048576:.1f}"))
+                telemetry.peak_traced = result.peak_memory
+            self._close_prefetcher()
             logger.debug(self.image_cache.stats)
+            if profiler is not None:
+                profiler.stop()
+                self._save_profile(profiler, result, save_dir,
+                                   lang_code, log_func)
+            self._finish_telemetry(result, telemetry)
             finish_func()
+        return result
 
-    def _do_download(self, url, save_dir, lang_code,
-                     log_func, convert_pdf):
+    @staticmethod
+    def _save_profile(profiler: JobProfiler, result: DownloadResult,
+                      save_dir, lang_code, log_func):
+        """Файлы профиля рядом с DOCX (или profile_<id> при ошибке)"""
+        if result.files:
+            base = os.path.splitext(result.files[0])[0]
+        else:
+            gid = URLValidator.extract_guide_id(result.url) or "unknown"
+            base = os.path.join(save_dir, f"profile_{gid}")
+        try:
+            for path in profiler.write(base):
+                log_func(get_text(lang_code, "log_profile_saved", path))
+        except OSError as e:
+            logger.warning(f"Профиль: {e}")
+
+    def _finish_telemetry(self, result: DownloadResult,
+                          telemetry: JobTelemetry):
+        telemetry.ok = result.ok
+        result.builder_stats = telemetry.builder_stats
+        result.telemetry = telemetry.record()
+        if self.config.telemetry_file:
+            try:
+                write_record(self.config.telemetry_file, result.telemetry)
+            except OSError as e:
+                logger.warning(f"Телеметрия: {e}")
+
+    def _do_download(self, url, save_dir, lang_code, log_func, convert_pdf,
+                     html=None, telemetry=None) -> list[str]:
         T = lambda key, *a: get_text(lang_code, key, *a)
+        telemetry = telemetry or JobTelemetry(url)
         log_func(T("log_start", url))
 
         # Предварительная проверка PDF-конвертера
@@ -68,146 +170,291 @@ class GuideDownloader:
                 os.makedirs(save_dir, exist_ok=True)
             except OSError as e:
                 log_func(f"{T('err_creating_dir')} {e}")
-                return
+                return []
 
         if self.is_cancelled:
             log_func(T("log_cancelled"))
-            return
+            return []
 
-        try:
-            response = self.session.get(url, timeout=self.config.timeout)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-        except requests.ConnectionError:
-            log_func(T("err_net_connection"))
-            return
-        except requests.Timeout:
-            log_func(T("err_net_timeout"))
-            return
-        except requests.HTTPError as e:
-            log_func(T("err_access", e.response.status_code))
-            return
-        except requests.RequestException as e:
-            log_func(f"{T('err_net')} {e}")
-            return
+        # Счётчики кеша — только этого задания (общий кеш копит свои)
+        image_cache = telemetry.meter_cache(self.image_cache)
+        page_meta = {}
+        early_path = None
+        if html is None:
+            scanner = None
+            if self.config.stream_parse:
+                # Имя файла и загрузка картинок — ещё до конца страницы
+                self._prefetcher = ImagePrefetcher(
+                    self.session, self.config, image_cache
+                )
 
-        if self.is_cancelled:
-            log_func(T("log_cancelled"))
-            return
+                def on_title(title):
+                    nonlocal early_path
+                    early_path = self._target_path(save_dir, title, url)
+                    log_func(T("log_file_target", early_path))
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        doc = Document()
-        self._setup_styles(doc)
+                scanner = GuideStreamScanner(
+                    on_title=on_title,
+                    on_section=lambda t: logger.debug(f"Секция: {t}"),
+                    on_image=self._prefetcher.submit,
+                )
+            with telemetry.stage("fetch"):
+                fetched = self._fetch_page(url, log_func, T, scanner)
+            if fetched is None:
+                return []
+            response, html = fetched
+            telemetry.page_bytes = self._response_bytes(response, html)
+            page_meta = {
+                "status": response.status_code,
+                "fetched": time.time(),
+                "headers": {
+                    k: v for k, v in response.headers.items()
+                    if k.lower() in ARCHIVED_HEADERS
+                },
+            }
 
-        guide_title = self._extract_title(soup)
-        doc.add_heading(guide_title, 0)
+        if self.is_cancelled:
+            log_func(T("log_cancelled"))
+            return []
 
-        safe_title = clean_filename(guide_title)
-        if not safe_title or len(safe_title) < 2:
-            gid = URLValidator.extract_guide_id(url)
-            safe_title = f"manual_{gid}" if gid else "manual_unknown"
+        with telemetry.stage("parse"):
+            regions = parse_guide(html, self.config.html_parser,
+                                  partial=self.config.partial_parse)
+        if self._prefetcher is None and self.config.stream_parse and regions.images:
+            # HTML пришёл готовым (наблюдение) — сканера не было, картинки
+            # тела известны после разбора: качаем их, пока строится документ
+            self._prefetcher = ImagePrefetcher(self.session, self.config, image_cache)
+            for src in regions.images:
+                self._prefetcher.submit(src)
+        # Заготовка документа — отдельно от обхода: иначе в build
+        # смешались бы две разные по природе части
+        with telemetry.stage("build_init"):
+            doc = self.new_document()
+            guide_title = regions.title
+            doc.add_heading(guide_title, 0)
 
-        full_path = os.path.join(save_dir, f"{safe_title}.docx")
-        log_func(T("log_file_target", full_path))
+        full_path = self._target_path(save_dir, guide_title, url)
+        safe_title = os.path.splitext(os.path.basename(full_path))[0]
+        if full_path != early_path:
+            log_func(T("log_file_target", full_path))
 
         if self.is_cancelled:
             log_func(T("log_cancelled"))
-            return
+            return []
 
-        builder = DocxBuilder(
-            doc, config=self.config, session=self.session,
-            image_cache=self.image_cache, log_func=log_func
+        if self.config.write_archive or self.config.export_images:
+            image_cache = RecordingImageCache(image_cache)
+
+        writer = StreamingDocxWriter(
+            full_path, compress_level=self.config.docx_compress_level
         )
+        if self.config.stream_docx:
+            # Картинки сразу уходят в файл, а не копятся в памяти до save
+            writer.attach(doc)
+        try:
+            builder_cls = (OoxmlDocxBuilder if self.config.docx_backend == "ooxml"
+                           else DocxBuilder)
+            loader = self._prefetcher.fetch if self._prefetcher else download_image
+            builder = builder_cls(
+                doc, config=self.config, session=self.session,
+                image_cache=image_cache, log_func=log_func,
+                image_loader=telemetry.wrap_loader(loader),
+            )
+            telemetry.builder_stats = builder.stats
 
-        if not self._process_content(soup, doc, builder,
-                                     lang_code, log_func):
-            log_func(T("err_content"))
-            return
+            with telemetry.stage("build"):
+                built = self._process_content(regions, doc, builder,
+                                              lang_code, log_func)
+            if not built:
+                log_func(T("err_content"))
+                return []
+            # Дерево страницы больше не нужно — до сохранения DOCX
+            regions = None
+            stats = builder.stats
+            if stats.content_lost:
+                log_func(T("log_content_lost", stats.images_skipped,
+                           stats.table_fallbacks, stats.subtrees_skipped))
 
-        if self.is_cancelled:
-            log_func(T("log_cancelled"))
-            return
+            if self.is_cancelled:
+                log_func(T("log_cancelled"))
+                return []
 
-        # Сохранение DOCX
-        try:
-            doc.save(full_path)
-            log_func(T("log_success", full_path))
-        except PermissionError:
-            log_func(T("err_permission"))
-            return
-        except OSError as e:
-            log_func(f"Error: {e}")
-            return
+            # Сохранение DOCX
+            try:
+                with telemetry.stage("save"):
+                    writer.save(doc)
+                log_func(T("log_success", full_path))
+                files = [full_path]
+            except PermissionError:
+                log_func(T("err_permission"))
+                return []
+            except OSError as e:
+                log_func(f"Error: {e}")
+                return []
+        finally:
+            writer.abort()
+
+        with telemetry.stage("export"):
+            self._export_extras(url, html, save_dir, safe_title, image_cache,
+                                page_meta, files, log_func, T)
 
         # Конвертация в PDF
         if convert_pdf and not self.is_cancelled:
             log_func(T("log_pdf_converting"))
-            success, result = convert_docx_to_pdf(full_path, log_func)
+            with telemetry.stage("pdf"):
+                success, result = convert_docx_to_pdf(full_path, log_func)
             if success:
                 log_func(T("log_pdf_success", result))
+                files.append(result)
             else:
                 log_func(f"⚠ {T('err_pdf_failed')}")
                 log_func(result)
 
-    def _setup_styles(self, doc):
+        return files
+
+    def _export_extras(self, url, html, save_dir, safe_title, image_cache,
+                       page_meta, files, log_func, T):
+        """Архив страницы и картинки рядом с DOCX (по настройкам)"""
+        if self.config.write_archive:
+            archive_path = os.path.join(save_dir, safe_title + ARCHIVE_EXT)
+            try:
+                write_archive(archive_path, GuideArchive(
+                    url, html, image_cache.images, page_meta
+                ))
+                log_func(T("log_archive_saved", archive_path))
+                files.append(archive_path)
+            except OSError as e:
+                log_func(f"Error: {e}")
+
+        if self.config.export_images and image_cache.images:
+            store = MediaStore(
+                self.config.media_store_dir
+                or os.path.join(save_dir, MEDIA_STORE_DIR)
+            )
+            images_dir = os.path.join(save_dir, f"{safe_title}_files")
+            try:
+                summary = store.export(image_cache.images, images_dir)
+                log_func(T("log_images_exported", summary["images"],
+                           summary["new"], images_dir))
+                files.append(images_dir)
+            except OSError as e:
+                log_func(f"Error: {e}")
+
+    @staticmethod
+    def _target_path(save_dir, guide_title, url) -> str:
+        safe_title = clean_filename(guide_title)
+        if not safe_title or len(safe_title) < 2:
+            gid = URLValidator.extract_guide_id(url)
+            safe_title = f"manual_{gid}" if gid else "manual_unknown"
+        return os.path.join(save_dir, f"{safe_title}.docx")
+
+    @staticmethod
+    def _response_bytes(response, html: str) -> int:
+        """Байт получено по сети (до распаковки gzip), иначе — размер HTML"""
+        tell = getattr(getattr(response, "raw", None), "tell", None)
+        if tell is not None:
+            try:
+                return int(tell())
+            except (TypeError, ValueError, OSError):
+                pass
+        return len(html.encode("utf-8"))
+
+    def _fetch_page(self, url, log_func, T, scanner=None
+                    ) -> Optional[tuple[requests.Response, str]]:
+        try:
+            if scanner is not None:
+                return fetch_streaming(self.session, url, self.config, scanner)
+            response = self.session.get(url, timeout=self.config.timeout)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            return response, response.text
+        except requests.ConnectionError:
+            log_func(T("err_net_connection"))
+        except requests.Timeout:
+            log_func(T("err_net_timeout"))
+        except requests.HTTPError as e:
+            log_func(T("err_access", e.response.status_code))
+        except requests.RequestException as e:
+            log_func(f"{T('err_net')} {e}")
+        return None
+
+    @classmethod
+    def new_document(cls):
+        """
+        Новый документ со стилями руководства.
+        Document() разбирает шаблон python-docx, а стили добавляются
+        поверх — это делается один раз, дальше заготовка копируется.
+        """
+        with cls._template_lock:
+            if cls._template is None:
+                template = Document()
+                cls._setup_styles(template)
+                cls._template = template
+            return copy.deepcopy(cls._template)
+
+    @staticmethod
+    def _setup_styles(doc):
         try:
             style = doc.styles['Normal']
             style.font.name = 'Calibri'
             style.font.size = Pt(11)
             style.paragraph_format.space_before = Pt(0)
             style.paragraph_format.space_after = Pt(0)
+            register_character_styles(doc)
         except Exception as e:
             logger.warning(f"Ошибка стилей: {e}")
 
-    def _extract_title(self, soup):
-        title_node = soup.find('div', class_='workshopItemTitle')
-        if title_node:
-            t = title_node.get_text(strip=True)
-            if t:
-                return t
-        title_tag = soup.find('title')
-        if title_tag:
-            t = title_tag.get_text(strip=True)
-            t = re.sub(r'\s*::\s*Steam Community.*$', '', t)
-            if t:
-                return t
-        return "Steam_Guide"
-
-    def _process_content(self, soup, doc, builder,
+    @staticmethod
+    def content_fingerprint(regions: GuideRegions) -> str:
+        """SHA-256 от заголовка и тела руководства (без комментариев и виджетов)"""
+        h = hashlib.sha256()
+        if regions.title_node is not None:
+            h.update(str(regions.title_node).encode('utf-8'))
+        nodes = [s.node for s in regions.sections]
+        if not nodes and regions.content is not None:
+            nodes = [regions.content]
+        for node in nodes:
+            h.update(str(node).encode('utf-8'))
+        return h.hexdigest()
+
+    def _process_content(self, regions: GuideRegions, doc, builder,
                          lang_code, log_func):
         T = lambda key, *a: get_text(lang_code, key, *a)
-        sections = soup.find_all('div', class_='subSection detailBox')
+        sections = regions.sections
 
         if sections:
             log_func(T("log_sections_found", len(sections)))
             for section in sections:
                 if self.is_cancelled:
                     return True
-                title_div = section.find('div', class_='subSectionTitle')
+                title_div = section.title
                 if title_div:
                     ch = title_div.get_text(" ", strip=True)
                     doc.add_heading(ch, 1)
                     short = ch[:40] + ("..." if len(ch) > 40 else "")
                     log_func(T("log_processing", short))
-                desc_div = section.find('div', class_='subSectionDesc')
+                desc_div = section.desc
                 if desc_div:
                     for child in desc_div.children:
                         if self.is_cancelled:
                             return True
                         builder.process_node(child)
                     builder.close_paragraph()
+                # Секция готова — освобождаем её поддерево
+                section.node.decompose()
+                section.title = section.desc = None
+            sections.clear()
             return True
 
-        content = (
-            soup.find('div', id='guideContent')
-            or soup.find('div', class_='guide subSections')
-        )
-        if content:
+        content = regions.content
+        if content is not None:
             log_func(T("log_processing", "main content"))
-            for child in content.children:
+            for child in list(content.children):
                 if self.is_cancelled:
                     return True
                 builder.process_node(child)
+                if not isinstance(child, str):
+                    child.decompose()
             builder.close_paragraph()
             return True
 
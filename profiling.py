@@ -0,0 +1,245 @@
+"""
+Профилирование одной выгрузки
+
+  cprofile  — детерминированный cProfile (точные вызовы, замедляет работу)
+  sampling  — выборка стека потока задания раз в profile_interval секунд
+
+Рядом с DOCX пишутся:
+  <имя>.prof       — pstats (python -m pstats, snakeviz);
+                     в режиме sampling числа — доли выборок, а не вызовы
+  <имя>.collapsed  — свёрнутые стеки для flamegraph.pl / speedscope:
+                     sampling — число выборок; cprofile — микросекунды,
+                     восстановленные из графа вызовов pstats (время вызова
+                     делится между вызывающими пропорционально, поэтому
+                     стеки глубже одного уровня приблизительны)
+  <имя>.memory.txt — с profile_memory: разница снимков tracemalloc
+                     между этапами (см. telemetry.JobTelemetry.stage)
+
+Выборка и cProfile видят только поток задания; tracemalloc —
+общий на процесс (telemetry.start_tracing), при параллельных
+заданиях снимки смешиваются.
+Выключено по умолчанию: без profile/profile_memory профилировщик
+не создаётся.
+"""
+
+import os
+import sys
+import cProfile
+import logging
+import pstats
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from telemetry import start_tracing, stop_tracing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXT = ".prof"
+COLLAPSED_EXT = ".collapsed"
+MEMORY_EXT = ".memory.txt"
+MEMORY_TOP = 15
+TRACEMALLOC_FRAMES = 10
+
+
+def _frame_key(code) -> tuple:
+    # Ключ функции как у pstats: (файл, строка, имя)
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _frame_label(key: tuple) -> str:
+    filename, line, name = key
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class StackSampler(threading.Thread):
+    """Фоновый поток: стек заданного потока раз в interval секунд"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="ProfileSampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        # Стек от корня к листу → число выборок
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path: str):
+        _write_collapsed(path, self.samples)
+
+
+def _write_collapsed(path: str, stacks: Counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(";".join(_frame_label(k) for k in stack))
+            f.write(f" {count}\n")
+
+
+def _collapse_pstats(stats: dict) -> Counter:
+    """
+    Граф вызовов pstats → стеки с собственным временем в микросекундах.
+    pstats хранит только пары вызывающий → вызываемый, поэтому доля
+    функции в каждом пути — доля ребра в её общем времени (ct).
+    Рекурсия обрывается на функции, уже стоящей на стеке; ветви
+    короче микросекунды отбрасываются.
+    """
+    callees: dict = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in stats.items()
+             if not entry[4] or all(c not in stats for c in entry[4])]
+    stacks: Counter = Counter()
+    # (стек, доля времени функции на этом пути)
+    pending = [((root,), 1.0) for root in roots]
+    while pending:
+        stack, share = pending.pop()
+        func = stack[-1]
+        _, _, tt, ct, _ = stats[func]
+        own = round(tt * share * 1e6)
+        if own:
+            stacks[stack] += own
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = stats[callee][3]
+            if callee in stack or not callee_ct:
+                continue
+            child = share * min(edge_ct / callee_ct, 1.0)
+            if callee_ct * child >= 1e-6:
+                pending.append((stack + (callee,), child))
+    return stacks
+
+
+class _SampledStats:
+    """
+    Выборки в формате cProfile (create_stats/stats), чтобы pstats
+    мог их сохранить: tt — собственное время, ct — с вложенными,
+    nc — число выборок с функцией на стеке.
+    """
+
+    def __init__(self, samples: Counter, interval: float):
+        self.stats = {}
+        totals: dict = {}
+        for stack, count in samples.items():
+            seconds = count * interval
+            leaf = stack[-1]
+            for key in set(stack):
+                nc, tt, ct = totals.get(key, (0, 0.0, 0.0))
+                totals[key] = (nc + count, tt + (seconds if key == leaf else 0.0),
+                               ct + seconds)
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers = self.stats.setdefault(callee, {})
+                n, _, _, t = callers.get(caller, (0, 0, 0.0, 0.0))
+                callers[caller] = (n + count, n + count, 0.0, t + seconds)
+        self.stats = {
+            key: (nc, nc, tt, ct, self.stats.get(key, {}))
+            for key, (nc, tt, ct) in totals.items()
+        }
+
+    def create_stats(self):
+        pass
+
+
+class JobProfiler:
+    """
+    profiler.start() / profiler.stop() — в потоке задания;
+    profiler.stage_done(name) — снимок памяти после этапа;
+    profiler.write(base) — файлы <base>.prof/.collapsed/.memory.txt
+    """
+
+    def __init__(self, mode: str = "sampling", interval: float = 0.005,
+                 memory: bool = False):
+        self.mode = mode
+        self.interval = interval
+        self.memory = memory
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._snapshot = None
+        self._memory_report: list[str] = []
+
+    @classmethod
+    def from_config(cls, config) -> Optional["JobProfiler"]:
+        if not config.profile and not config.profile_memory:
+            return None
+        return cls(config.profile, config.profile_interval,
+                   config.profile_memory)
+
+    def start(self):
+        if self.memory:
+            start_tracing(TRACEMALLOC_FRAMES)
+            self._snapshot = self._take_snapshot()
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._profile = profile
+                return
+            except ValueError as e:
+                # Уже работает другой профилировщик (3.12+: один на процесс)
+                logger.warning(f"cProfile недоступен, только выборка: {e}")
+        if self.mode:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self.memory:
+            stop_tracing()
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def stage_done(self, name: str):
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        snapshot = self._take_snapshot()
+        diff = snapshot.compare_to(self._snapshot, "lineno")
+        self._snapshot = snapshot
+        delta = sum(stat.size_diff for stat in diff)
+        self._memory_report.append(f"== {name}: {delta / 1048576:+.2f} MB ==")
+        self._memory_report.extend(f"  {stat}" for stat in diff[:MEMORY_TOP])
+        self._memory_report.append("")
+
+    def write(self, base: str) -> list[str]:
+        """Сохранить результаты; base — путь без расширения"""
+        paths = []
+        if self._profile is not None:
+            stats = pstats.Stats(self._profile)
+            stats.dump_stats(base + PROFILE_EXT)
+            _write_collapsed(base + COLLAPSED_EXT, _collapse_pstats(stats.stats))
+            paths += [base + PROFILE_EXT, base + COLLAPSED_EXT]
+        elif self._sampler is not None:
+            pstats.Stats(
+                _SampledStats(self._sampler.samples, self.interval)
+            ).dump_stats(base + PROFILE_EXT)
+            paths.append(base + PROFILE_EXT)
+            self._sampler.write_collapsed(base + COLLAPSED_EXT)
+            paths.append(base + COLLAPSED_EXT)
+        if self._memory_report:
+            with open(base + MEMORY_EXT, "w", encoding="utf-8") as f:
+                f.write("\n".join(self._memory_report))
+            paths.append(base + MEMORY_EXT)
+        return paths
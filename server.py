@@ -0,0 +1,425 @@
+"""
+Локальный HTTP-сервер заданий на выгрузку руководств
+
+API:
+  POST   /jobs                      {"url": "..."} или {"urls": [...], "pdf": true}
+  GET    /jobs/<id>                 статус задания
+  GET    /jobs/<id>/events          прогресс (text/event-stream)
+  GET    /jobs/<id>/files/<name>    скачать DOCX/PDF
+  DELETE /jobs/<id>                 отмена
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import mimetypes
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, quote, unquote
+from typing import Optional
+
+from config import AppConfig
+from network import create_session, URLValidator, ImageCache
+from parser import GuideDownloader
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINAL_STATES = frozenset({JOB_DONE, JOB_FAILED, JOB_CANCELLED})
+
+
+class Job:
+    def __init__(self, urls: list[str], convert_pdf: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = urls
+        self.convert_pdf = convert_pdf
+        self.state = JOB_QUEUED
+        self.files: list[str] = []
+        self.log: list[str] = []
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.downloader: Optional[GuideDownloader] = None
+        self.cond = threading.Condition()
+
+    def add_log(self, message: str):
+        with self.cond:
+            self.log.append(message)
+            self.cond.notify_all()
+
+    def set_state(self, state: str):
+        with self.cond:
+            self.state = state
+            if state in FINAL_STATES:
+                self.finished = time.time()
+            self.cond.notify_all()
+
+    @property
+    def is_final(self) -> bool:
+        return self.state in FINAL_STATES
+
+    def to_dict(self) -> dict:
+        with self.cond:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "urls": list(self.urls),
+                "pdf": self.convert_pdf,
+                "files": [os.path.basename(f) for f in self.files],
+                "log_lines": len(self.log),
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+
+class JobManager:
+    """Ограниченная очередь заданий + пул воркеров с общими сессией и кешем"""
+
+    MAX_JOBS_KEPT = 1000
+    MAX_RESULTS_KEPT = 1000
+
+    def __init__(self, config: AppConfig, output_dir: str,
+                 workers: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        self.config = config
+        self.output_dir = output_dir
+        self.workers = workers or config.server_workers
+        self.session = create_session(config, pool_size=self.workers * 4)
+        self.image_cache = ImageCache(max_size=500)
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=queue_size or config.server_queue_size
+        )
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        # (url, pdf) -> (время, файлы) — кеш готовых результатов, LRU
+        self._results: OrderedDict[tuple[str, bool], tuple[float, list[str]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._worker, daemon=True, name=f"JobWorker-{i}"
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stopping.set()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.downloader:
+                job.downloader.cancel()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+    # ------------------------------------------
+    # Публичный интерфейс
+    # ------------------------------------------
+
+    def submit(self, urls: list[str], convert_pdf: bool = False) -> Job:
+        """Создать задание. Бросает queue.Full при переполнении очереди."""
+        job = Job(urls, convert_pdf)
+        cached = [self._cached_files(u, convert_pdf) for u in urls]
+        if all(files is not None for files in cached):
+            # Всё уже готово — задание завершается без очереди
+            for url, files in zip(urls, cached):
+                job.add_log(f"Cached: {url}")
+                job.files.extend(files)
+            job.set_state(JOB_DONE)
+            self._register(job)
+            return job
+
+        self._queue.put_nowait(job)
+        self._register(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if job.state == JOB_QUEUED:
+            job.set_state(JOB_CANCELLED)
+        elif job.state == JOB_RUNNING and job.downloader:
+            job.downloader.cancel()
+        return True
+
+    # ------------------------------------------
+    # Внутреннее
+    # ------------------------------------------
+
+    def _register(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.MAX_JOBS_KEPT:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.is_final:
+                    break
+                del self._jobs[oldest_id]
+
+    def _cached_files(self, url: str, convert_pdf: bool) -> Optional[list[str]]:
+        key = (url, convert_pdf)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            created, files = entry
+            if time.time() - created > self.config.server_cache_ttl:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+        if not all(os.path.isfile(f) for f in files):
+            with self._lock:
+                self._results.pop(key, None)
+            return None
+        return files
+
+    def _store_result(self, url: str, convert_pdf: bool, files: list[str]):
+        # PDF мог не получиться — тогда это результат только для DOCX
+        if convert_pdf and not any(f.lower().endswith(".pdf") for f in files):
+            convert_pdf = False
+        key = (url, convert_pdf)
+        now = time.time()
+        with self._lock:
+            self._results[key] = (now, files)
+            self._results.move_to_end(key)
+            # Самые давние — в начале: просроченные и лишние сверх лимита
+            while self._results:
+                oldest_key, (created, _) = next(iter(self._results.items()))
+                if (len(self._results) <= self.MAX_RESULTS_KEPT
+                        and now - created <= self.config.server_cache_ttl):
+                    break
+                del self._results[oldest_key]
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                if job.state == JOB_QUEUED:
+                    self._run_job(job)
+            except Exception as e:
+                logger.error(f"Ошибка задания {job.id}: {e}", exc_info=True)
+                job.add_log(f"Error: {e}")
+                job.set_state(JOB_FAILED)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: Job):
+        job.set_state(JOB_RUNNING)
+        job_dir = os.path.join(self.output_dir, job.id)
+        job.downloader = GuideDownloader(
+            self.config, session=self.session, image_cache=self.image_cache
+        )
+        failed = False
+        for url in job.urls:
+            if job.downloader.is_cancelled:
+                break
+            files = self._cached_files(url, job.convert_pdf)
+            if files is not None:
+                job.add_log(f"Cached: {url}")
+            else:
+                result = job.downloader.download(
+                    url, job_dir, self.config.language,
+                    job.add_log, lambda: None, job.convert_pdf,
+                )
+                files = result.files
+                if result.ok:
+                    self._store_result(url, job.convert_pdf, files)
+                else:
+                    failed = True
+            with job.cond:
+                job.files.extend(files)
+
+        if job.downloader.is_cancelled:
+            job.set_state(JOB_CANCELLED)
+        elif failed:
+            job.set_state(JOB_FAILED)
+        else:
+            job.set_state(JOB_DONE)
+        logger.info(f"Задание {job.id}: {job.state}, {self.image_cache.stats}")
+
+
+# ==========================================
+# HTTP
+# ==========================================
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SteamGuideSaver"
+    manager: JobManager = None
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> tuple[Optional[Job], list[str]]:
+        parts = [unquote(p) for p in urlparse(self.path).path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "jobs":
+            return None, parts
+        return self.manager.get(parts[1]), parts
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Invalid JSON"})
+            return
+        if not isinstance(data, dict):
+            self._send_json(400, {"error": "Invalid JSON"})
+            return
+
+        raw_urls = data.get("urls") or ([data["url"]] if data.get("url") else [])
+        if not raw_urls or not isinstance(raw_urls, list):
+            self._send_json(400, {"error": "No URL given"})
+            return
+
+        urls = []
+        for raw in raw_urls:
+            ok, result = URLValidator.validate(str(raw))
+            if not ok:
+                self._send_json(400, {"error": result, "url": raw})
+                return
+            urls.append(result)
+
+        try:
+            job = self.manager.submit(urls, bool(data.get("pdf", False)))
+        except queue.Full:
+            self._send_json(503, {"error": "Job queue is full"})
+            return
+        self._send_json(202 if not job.is_final else 200, job.to_dict())
+
+    def do_GET(self):
+        job, parts = self._route()
+        if job is None:
+            self._send_json(404, {"error": "Job not found"})
+            return
+        if len(parts) == 2:
+            self._send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[2] == "events":
+            self._stream_events(job)
+        elif len(parts) == 4 and parts[2] == "files":
+            self._send_file(job, parts[3])
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_DELETE(self):
+        job, parts = self._route()
+        if job is None or len(parts) != 2:
+            self._send_json(404, {"error": "Job not found"})
+            return
+        self.manager.cancel(job.id)
+        self._send_json(202, job.to_dict())
+
+    def _send_file(self, job: Job, name: str):
+        matches = [f for f in job.files if os.path.basename(f) == name]
+        if not matches or not os.path.isfile(matches[0]):
+            self._send_json(404, {"error": "File not found"})
+            return
+        path = matches[0]
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        # Заголовки уходят в latin-1: имя в filename* кодируется по RFC 5987,
+        # filename= — ASCII-запасной вариант для старых клиентов
+        fallback = name.encode("ascii", "replace").decode().replace("?", "_")
+        fallback = fallback.replace("\\", "_").replace('"', "_")
+        self.send_header(
+            "Content-Disposition",
+            f'attachment; filename="{fallback}"; '
+            "filename*=UTF-8''" + quote(name),
+        )
+        self.end_headers()
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                self.wfile.write(chunk)
+
+    def _stream_events(self, job: Job):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = 0
+        try:
+            while True:
+                with job.cond:
+                    if sent >= len(job.log) and not job.is_final:
+                        job.cond.wait(timeout=15)
+                    lines = job.log[sent:]
+                    final = job.is_final
+                sent += len(lines)
+                for line in lines:
+                    for part in line.splitlines() or [""]:
+                        self.wfile.write(f"data: {part}\n".encode("utf-8"))
+                    self.wfile.write(b"\n")
+                if not lines:
+                    self.wfile.write(b": keepalive\n\n")
+                if final and sent >= len(job.log):
+                    payload = json.dumps(job.to_dict(), ensure_ascii=False)
+                    self.wfile.write(
+                        f"event: end\ndata: {payload}\n\n".encode("utf-8")
+                    )
+                    break
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def create_server(manager: JobManager, host: str,
+                  port: int) -> ThreadingHTTPServer:
+    handler = type("BoundJobRequestHandler", (JobRequestHandler,),
+                   {"manager": manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(config: AppConfig, output_dir: Optional[str] = None,
+          host: Optional[str] = None, port: Optional[int] = None,
+          workers: Optional[int] = None):
+    """Запустить сервер и блокироваться до Ctrl+C"""
+    manager = JobManager(config, output_dir or config.save_dir,
+                         workers=workers)
+    manager.start()
+    server = create_server(manager, host or config.server_host,
+                           port or config.server_port)
+    logger.info(f"Сервер заданий: http://{server.server_address[0]}:"
+                f"{server.server_address[1]} ({manager.workers} воркеров)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.stop()
@@ -0,0 +1,175 @@
+"""
+Потоковая загрузка страницы руководства
+
+Страница читается через iter_content и параллельно скармливается
+инкрементальному HTML-сканеру. Как только в потоке появляются заголовок,
+границы секций и картинки тела, о них сообщается сразу:
+имя файла известно до конца загрузки, а картинки начинают
+скачиваться в кеш (ImagePrefetcher) ещё до разбора страницы.
+"""
+
+import codecs
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+from io import BytesIO
+from typing import Callable, Optional
+
+import requests
+
+from config import AppConfig
+from network import download_image
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# С этого места на странице идут комментарии — сканировать дальше незачем
+STOP_CLASS_PREFIX = "commentthread"
+
+
+class GuideStreamScanner(HTMLParser):
+    """Лёгкий сканер потока: заголовок, секции, картинки тела"""
+
+    def __init__(self, on_title: Optional[Callable] = None,
+                 on_section: Optional[Callable] = None,
+                 on_image: Optional[Callable] = None):
+        super().__init__(convert_charrefs=True)
+        self.on_title = on_title or (lambda title: None)
+        self.on_section = on_section or (lambda title: None)
+        self.on_image = on_image or (lambda src: None)
+        self.done = False
+        self._div_depth = 0
+        self._body_depth = None      # глубина div, открывшего тело
+        self._capture_depth = None   # глубина div, текст которого собираем
+        self._capture_kind = None
+        self._buffer: list[str] = []
+        self._title_seen = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "img":
+            if self._body_depth is not None:
+                src = dict(attrs).get("src")
+                if src:
+                    self.on_image(src)
+            return
+        if tag != "div":
+            return
+        self._div_depth += 1
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        joined = " ".join(classes)
+        if classes and classes[0].startswith(STOP_CLASS_PREFIX):
+            self.done = True
+            return
+        if self._body_depth is None and (
+            joined in ("subSection detailBox", "guide subSections")
+            or attrs.get("id") == "guideContent"
+        ):
+            self._body_depth = self._div_depth
+        if self._capture_depth is None:
+            if "workshopItemTitle" in classes and not self._title_seen:
+                self._start_capture("title")
+            elif "subSectionTitle" in classes:
+                self._start_capture("section")
+
+    def _start_capture(self, kind: str):
+        self._capture_depth = self._div_depth
+        self._capture_kind = kind
+        self._buffer = []
+
+    def handle_endtag(self, tag):
+        if self.done or tag != "div":
+            return
+        if self._capture_depth == self._div_depth:
+            text = " ".join("".join(self._buffer).split())
+            if self._capture_kind == "title":
+                self._title_seen = True
+                if text:
+                    self.on_title(text)
+            elif text:
+                self.on_section(text)
+            self._capture_depth = None
+        if self._body_depth == self._div_depth:
+            self._body_depth = None
+        self._div_depth -= 1
+
+    def handle_data(self, data):
+        if self._capture_depth is not None:
+            self._buffer.append(data)
+
+
+def fetch_streaming(session, url: str, config: AppConfig,
+                    scanner: GuideStreamScanner) -> tuple[requests.Response, str]:
+    """GET со сканированием на лету; возвращает (ответ, полный HTML)"""
+    response = session.get(url, timeout=config.timeout, stream=True)
+    try:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parts = []
+        for chunk in response.iter_content(CHUNK_SIZE):
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if not scanner.done:
+                scanner.feed(text)
+        parts.append(decoder.decode(b"", final=True))
+    finally:
+        response.close()
+    return response, "".join(parts)
+
+
+class ImagePrefetcher:
+    """
+    Фоновая загрузка картинок в кеш. fetch() отдаёт картинку,
+    дожидаясь уже начатой загрузки вместо повторного запроса.
+    """
+
+    def __init__(self, session, config: AppConfig, cache,
+                 max_images: Optional[int] = None):
+        self.session = session
+        self.config = config
+        self.cache = cache
+        self._max_images = (config.prefetch_max_images
+                            if max_images is None else max_images)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, config.prefetch_workers),
+            thread_name_prefix="Prefetch",
+        )
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, url: str):
+        if not url or not url.startswith("http"):
+            return
+        with self._lock:
+            if (self._closed or url in self._futures
+                    or len(self._futures) >= self._max_images):
+                return
+            self._futures[url] = self._pool.submit(
+                download_image, url, session=self.session,
+                config=self.config, cache=self.cache,
+            )
+
+    def fetch(self, url, session=None, config=None, cache=None) -> Optional[BytesIO]:
+        """Совместим по сигнатуре с network.download_image"""
+        with self._lock:
+            future = self._futures.get(url)
+        if future is not None:
+            # Дожидаемся начатой загрузки — дальше картинка берётся из кеша
+            try:
+                future.result()
+            except Exception:
+                pass
+        return download_image(
+            url, session=session or self.session,
+            config=config or self.config, cache=cache or self.cache,
+        )
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
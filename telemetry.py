@@ -0,0 +1,352 @@
+"""
+Телеметрия выгрузки
+
+Для каждого руководства собирается запись: время по этапам
+(стена и CPU потока), объём загруженных данных, число картинок,
+попадания в кеш и пик памяти. Запись — обычный dict, готовый
+для json.dumps; пакет сводит записи в перцентили p50/p95/p99.
+
+Этапы могут быть вложенными (загрузка картинок идёт внутри сборки) —
+время вложенного этапа вычитается из внешнего, так что сумма
+этапов не превышает общего времени.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict
+from io import BytesIO
+from typing import Callable, Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "parse", "build_init", "build", "image_io", "save",
+          "export", "pdf")
+PERCENTILES = (50, 95, 99)
+
+_file_lock = threading.Lock()
+
+# tracemalloc один на процесс: задания (track_memory, profile_memory)
+# делят его по счётчику — запускает первое, останавливает последнее
+_trace_lock = threading.Lock()
+_trace_jobs = 0
+_trace_owned = False
+
+
+def start_tracing(frames: int = 1):
+    """
+    Начать замер памяти задания. Пик сбрасывается, только если других
+    заданий нет — при параллельных заданиях пик у них общий.
+    """
+    global _trace_jobs, _trace_owned
+    with _trace_lock:
+        if _trace_jobs == 0:
+            _trace_owned = not tracemalloc.is_tracing()
+            if _trace_owned:
+                tracemalloc.start(frames)
+            else:
+                tracemalloc.reset_peak()
+        _trace_jobs += 1
+
+
+def stop_tracing() -> int:
+    """Закончить замер задания; возвращает пик (байт) с начала замера"""
+    global _trace_jobs, _trace_owned
+    with _trace_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _trace_jobs -= 1
+        if _trace_jobs == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+        return peak
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Пиковый RSS процесса в байтах за всё время его жизни — только растёт,
+    поэтому в перцентили по руководствам не попадает
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Текущий RSS процесса в байтах (Linux; иначе None)"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class MeteredImageCache:
+    """Прокси к кешу изображений со счётчиками одного задания"""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # put вызывается только после загрузки из сети
+        self.downloads = 0
+        self.bytes_downloaded = 0
+
+    def get(self, url: str) -> Optional[BytesIO]:
+        data = self._inner.get(url)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, url: str, data: BytesIO):
+        with self._lock:
+            self.downloads += 1
+            self.bytes_downloaded += data.getbuffer().nbytes
+        self._inner.put(url, data)
+
+    def clear(self):
+        self._inner.clear()
+
+    @property
+    def stats(self) -> str:
+        return self._inner.stats
+
+
+class JobTelemetry:
+    """
+    with telemetry.stage("parse"): ...
+    telemetry.record() — итоговая запись задания
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ok = False
+        self.started = time.time()
+        self._wall0 = time.perf_counter()
+        self._rss0 = current_rss()
+        self._process_peak0 = peak_rss()
+        # Наибольший RSS, замеченный на границах этапов
+        self.peak_rss = self._rss0
+        self._cpu0 = time.thread_time()
+        self.stages: dict[str, dict[str, float]] = {}
+        self._stack: list[list[float]] = []
+        self.page_bytes = 0
+        self.images_requested = 0
+        self.images_loaded = 0
+        self.cache: Optional[MeteredImageCache] = None
+        self.peak_traced: Optional[int] = None
+        # docx_builder.BuilderStats задания (общие для ячеек таблиц)
+        self.builder_stats = None
+        # Вызывается после каждого этапа верхнего уровня (профилировщик)
+        self.on_stage: Optional[Callable[[str], None]] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        # [начало стены, начало CPU, время вложенных стены, вложенных CPU]
+        frame = [time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        self._stack.append(frame)
+        self._sample_rss()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._sample_rss()
+            wall = time.perf_counter() - frame[0]
+            cpu = time.thread_time() - frame[1]
+            if self._stack:
+                parent = self._stack[-1]
+                parent[2] += wall
+                parent[3] += cpu
+            elif self.on_stage is not None:
+                self.on_stage(name)
+            totals = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            totals["wall"] += wall - frame[2]
+            totals["cpu"] += cpu - frame[3]
+
+    def _sample_rss(self):
+        rss = current_rss()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def _job_peak_rss(self) -> Optional[int]:
+        """
+        Пик RSS за задание: максимум выборок на границах этапов (image_io —
+        на каждой картинке). Если за задание вырос и пик процесса, пик
+        был внутри задания — берётся точное значение ядра
+        """
+        self._sample_rss()
+        peak = self.peak_rss
+        process_peak = peak_rss()
+        if (process_peak is not None and self._process_peak0 is not None
+                and process_peak > self._process_peak0):
+            peak = max(peak or 0, process_peak)
+        return peak
+
+    def meter_cache(self, cache) -> MeteredImageCache:
+        self.cache = MeteredImageCache(cache)
+        return self.cache
+
+    def wrap_loader(self, loader: Callable) -> Callable:
+        """Загрузчик картинок с замером этапа image_io"""
+        def load(*args, **kwargs):
+            with self.stage("image_io"):
+                data = loader(*args, **kwargs)
+            with self._lock:
+                self.images_requested += 1
+                if data:
+                    self.images_loaded += 1
+            return data
+        return load
+
+    def record(self) -> dict:
+        cache = self.cache
+        hits = cache.hits if cache else 0
+        misses = cache.misses if cache else 0
+        downloads = cache.downloads if cache else 0
+        loaded = self.images_loaded
+        rss = current_rss()
+        job_peak = self._job_peak_rss()
+        return {
+            "url": self.url,
+            "ok": self.ok,
+            "started": self.started,
+            "wall": time.perf_counter() - self._wall0,
+            "cpu": time.thread_time() - self._cpu0,
+            "stages": {
+                name: {k: round(v, 6) for k, v in values.items()}
+                for name, values in self.stages.items()
+            },
+            "bytes": {
+                "page": self.page_bytes,
+                "images": cache.bytes_downloaded if cache else 0,
+            },
+            "images": {
+                "requested": self.images_requested,
+                "loaded": self.images_loaded,
+                "failed": self.images_requested - self.images_loaded,
+            },
+            # С предзагрузкой каждая картинка даёт промах (фон) и попадание
+            # (сборка), поэтому доля попаданий считается по картинкам:
+            # сколько из вставленных не пришлось качать в этом задании
+            "cache": {
+                "hits": hits,
+                "misses": misses,
+                "downloads": downloads,
+                "hit_rate": (max(loaded - downloads, 0) / loaded
+                             if loaded else None),
+            },
+            "memory": {
+                "rss": rss,
+                "peak_rss": job_peak,
+                "rss_delta": (rss - self._rss0
+                              if rss is not None and self._rss0 is not None
+                              else None),
+                "process_peak_rss": peak_rss(),
+                "peak_traced": self.peak_traced,
+            },
+            "builder": (asdict(self.builder_stats)
+                        if self.builder_stats is not None else {}),
+        }
+
+
+def write_record(path: str, record: dict):
+    """Дописать запись строкой JSON (JSON Lines)"""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _file_lock:
+        # Одна запись в режиме append — строки процессов не перемешиваются
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_records(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ==========================================
+# Сводка по пакету
+# ==========================================
+
+# Не метрики руководства: время старта и пик процесса за всю жизнь
+_NOT_SUMMARIZED = frozenset({"started", "process_peak_rss"})
+
+
+def _flatten(record: dict, prefix: str = "") -> dict[str, float]:
+    """Числовые поля записи: {"stages.build.wall": 0.42, ...}"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and key not in _NOT_SUMMARIZED:
+            flat[name] = value
+    return flat
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy по умолчанию)"""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("empty")
+    pos = (len(ordered) - 1) * p / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(records: Iterable[dict]) -> dict:
+    """p50/p95/p99, сумма и максимум по каждой числовой метрике"""
+    records = [r for r in records if r]
+    columns: dict[str, list[float]] = {}
+    for record in records:
+        for name, value in _flatten(record).items():
+            columns.setdefault(name, []).append(value)
+    metrics = {}
+    for name in sorted(columns):
+        values = columns[name]
+        entry = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+        entry.update(count=len(values), sum=sum(values), max=max(values))
+        metrics[name] = entry
+    return {
+        "guides": len(records),
+        "ok": sum(1 for r in records if r.get("ok")),
+        "metrics": metrics,
+    }
+
+
+def summary_path(records_path: str) -> str:
+    return os.path.splitext(records_path)[0] + ".summary.json"
+
+
+def format_summary(summary: dict) -> str:
+    """Таблица времён этапов для лога"""
+    lines = [f"guides={summary['guides']} ok={summary['ok']}"]
+    metrics = summary["metrics"]
+    for name in ("wall", "cpu") + tuple(f"stages.{s}.wall" for s in STAGES):
+        entry = metrics.get(name)
+        if entry is None:
+            continue
+        lines.append(
+            f"{name:<22} " + " ".join(
+                f"p{p}={entry[f'p{p}']:.3f}s" for p in PERCENTILES
+            )
+        )
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from config import AppConfig
+from archive import ArchiveImageCache, OfflineSession
+from parser import GuideDownloader
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GUIDE_PAGES = ["guide_sections.html", "guide_content.html"]
+
+
+def read_docx_text(path: str) -> str:
+    """Текст документа: абзацы, затем таблицы построчно"""
+    doc = Document(path)
+    lines = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            lines.append(" | ".join(c.text for c in row.cells))
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def build_guide(tmp_path):
+    """Собрать DOCX из записанной страницы без сети"""
+    def build(page: str, images=None, **overrides) -> str:
+        with open(os.path.join(FIXTURES_DIR, page), encoding="utf-8") as f:
+            html = f.read()
+        config = AppConfig(**overrides)
+        downloader = GuideDownloader(
+            config, session=OfflineSession(),
+            image_cache=ArchiveImageCache(images or {}),
+        )
+        out = tmp_path / f"{page}-{len(list(tmp_path.iterdir()))}"
+        result = downloader.download(
+            "https://steamcommunity.com/sharedfiles/filedetails/?id=1",
+            str(out), "en", lambda msg: None, lambda: None, html=html,
+        )
+        assert result.ok
+        return result.files[0]
+    return build
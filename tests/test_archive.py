@@ -0,0 +1,34 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from archive import (
+    GuideArchive, write_archive, read_archive, compress_html,
+    decompress_html, ArchiveImageCache, OfflineSession,
+)
+from network import download_image
+
+
+class TestArchive:
+    def test_html_roundtrip(self):
+        html = '<div class="subSection detailBox">Привет</div>' * 10
+        assert decompress_html(compress_html(html)) == html
+
+    def test_bundle_roundtrip(self, tmp_path):
+        path = str(tmp_path / "g.guide.zip")
+        images = {"http://a/1.png": b"img", "http://a/2.png": b"img"}
+        write_archive(path, GuideArchive("http://guide", "<p>x</p>", images))
+        restored = read_archive(path)
+        assert restored.url == "http://guide"
+        assert restored.html == "<p>x</p>"
+        assert restored.images == images
+
+    def test_offline_download(self):
+        cache = ArchiveImageCache({"http://a/1.png": b"img"})
+        assert download_image("http://a/1.png", session=OfflineSession(),
+                              cache=cache).read() == b"img"
+        assert download_image("http://a/2.png", session=OfflineSession(),
+                              cache=cache) is None
+        with pytest.raises(requests.ConnectionError):
+            OfflineSession().get("http://a/3.png")
@@ -0,0 +1,146 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import requests
+
+from config import AppConfig
+from parser import GuideDownloader
+from benchmarks.bench_suite import main as suite_main, run_suite, scaling_efficiency
+from benchmarks.compare import compare, main as compare_main
+from benchmarks.faults import FaultPlan, FaultRule
+from benchmarks.fixtures import FIXTURES, load_fixtures, numbered_copy
+from benchmarks.load_harness import run_load
+from benchmarks.steam_server import StandInServer
+
+
+@pytest.fixture(scope="module")
+def pages():
+    return load_fixtures()
+
+
+def test_fixture_set(pages):
+    assert set(pages) == set(FIXTURES)
+    copy = numbered_copy(pages["small"], 3)
+    assert 'class="workshopItemTitle">3 ' in copy
+
+
+def test_batch_scaling(pages):
+    # Пакет в пуле forkserver/spawn: конфиг и инициализатор пиклятся
+    report = run_suite(("batch",), {"small": pages["small"]}, AppConfig(),
+                       repeat=1, copies=2, scaling=(1, 2))
+    assert set(report["results"]) == {"batch/p1", "batch/p2"}
+    efficiency = scaling_efficiency(report["results"])
+    assert list(efficiency) == [1, 2] and efficiency[1] == 1.0
+
+
+def test_stand_in_serves_page_and_images(pages, tmp_path):
+    with StandInServer({"small": pages["small"]}, latency=0.01) as server:
+        html = requests.get(server.page_url("small"), timeout=5).text
+        assert "images.steamusercontent.com" not in html
+        assert server.base_url + "/ugc/1/AAA/" in html
+        assert requests.get(server.base_url + "/nope", timeout=5).status_code == 404
+
+        result = GuideDownloader(AppConfig()).download(
+            server.page_url("small"), str(tmp_path), "en",
+            lambda msg: None, lambda: None,
+        )
+    assert result.ok
+    assert result.telemetry["images"]["loaded"] == 2
+    assert result.telemetry["bytes"]["images"] > 0
+
+
+def test_suite_writes_json(pages, tmp_path):
+    report = run_suite(("parse", "build", "save"), {"small": pages["small"]},
+                       AppConfig(), repeat=2)
+    assert set(report["results"]) == {"parse/small", "build/small", "save/small"}
+    assert len(report["results"]["parse/small"]["seconds"]) == 2
+
+    out = tmp_path / "results.json"
+    suite_main(["--bench", "parse", "--fixture", "deep", "--repeat", "1",
+                "--out", str(out)])
+    saved = json.loads(out.read_text())
+    assert saved["meta"]["repeat"] == 1
+    assert list(saved["results"]) == ["parse/deep"]
+
+
+def _report(**metrics):
+    results = {}
+    for key, values in metrics.items():
+        name, metric = key.split("__")
+        results.setdefault(name.replace("_", "/", 1), {})[metric] = values
+    return {"meta": {}, "results": results}
+
+
+class TestCompare:
+    def test_noise_is_not_regression(self):
+        base = _report(parse_huge__seconds=[0.10, 0.14, 0.09, 0.13, 0.10])
+        new = _report(parse_huge__seconds=[0.12, 0.15, 0.10, 0.13, 0.12])
+        [c] = compare(base, new)
+        assert c.change > 0.15 and not c.regressed
+
+    def test_slowdown_fails(self):
+        base = _report(build_huge__seconds=[1.00, 1.01, 0.99, 1.00, 1.02])
+        new = _report(build_huge__seconds=[1.30, 1.29, 1.31, 1.30, 1.32])
+        [c] = compare(base, new)
+        assert c.regressed
+
+    def test_direction_and_exact_metrics(self):
+        base = _report(batch_all__guides_per_sec=[10, 10.1, 9.9],
+                       save_huge__docx_bytes=[1000])
+        new = _report(batch_all__guides_per_sec=[7, 7.1, 6.9],
+                      save_huge__docx_bytes=[1010])
+        result = {c.metric: c.regressed for c in compare(base, new)}
+        assert result == {"batch/all:guides_per_sec": True,
+                          "save/huge:docx_bytes": False}
+
+    def test_gate_exit_code(self, tmp_path):
+        base, new = tmp_path / "base.json", tmp_path / "new.json"
+        base.write_text(json.dumps(_report(save_small__docx_bytes=[1000])))
+        new.write_text(json.dumps(_report(save_small__docx_bytes=[1100])))
+        assert compare_main([str(base), str(new)]) == 1
+        assert compare_main([str(base), str(new), "--threshold",
+                             "save/*:docx_bytes=0.2"]) == 0
+
+
+class TestFaults:
+    def test_parse_rule(self):
+        rule = FaultRule.parse("429:0.5:retry_after=2,end=6,path=/ugc/")
+        assert (rule.kind, rule.probability, rule.retry_after) == ("429", 0.5, 2)
+        assert (rule.end, rule.path) == (6, "/ugc/")
+        with pytest.raises(ValueError):
+            FaultRule.parse("teapot:1")
+
+    def test_retried_statuses_amplify(self, pages):
+        # Картинки всегда получают 503: каждая — 1 + max_retries запросов
+        plan = FaultPlan([FaultRule("503", 1.0, path="/ugc/")])
+        config = AppConfig(retry_backoff=0, max_retries=2)
+        with StandInServer({"small": pages["small"]}, faults=plan) as server:
+            result = run_load(server, config, "small", images=5, pages=1,
+                              concurrency=2)
+        assert (result["image"]["ok"], result["page"]["ok"]) == (0, 1)
+        assert result["server_requests"] == 5 * 3 + 1
+        assert result["retry_amplification"] == pytest.approx(16 / 6)
+        assert result["faults"] == {"503": 15}
+
+    def test_truncated_bodies_fail_and_waste(self, pages):
+        plan = FaultPlan([FaultRule("truncate", 1.0, path="/ugc/")])
+        with StandInServer({"small": pages["small"]}, faults=plan) as server:
+            result = run_load(server, AppConfig(), "small",
+                              images=5, pages=1,
+                              concurrency=2)
+        assert result["image"]["ok"] == 0
+        assert result["page"]["ok"] == 1
+        assert result["wasted_bytes"] > 0
+
+    def test_slow_bodies_are_not_wasted(self, pages):
+        plan = FaultPlan([FaultRule("slow", 1.0, path="/ugc/", delay=0.001,
+                                    chunk=64 * 1024)])
+        with StandInServer({"small": pages["small"]}, faults=plan) as server:
+            result = run_load(server, AppConfig(), "small",
+                              images=2, pages=0, concurrency=2)
+        assert result["ok"] == 2
+        assert result["faults"] == {"slow": 2}
+        assert result["wasted_bytes"] == 0 and result["bytes_sent"] > 0
@@ -2,8 +2,11 @@ import pytest
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils import clean_filename, validate_save_path
-from docx_builder import StyleContext
+from utils import clean_filename, validate_save_path, add_hyperlink, HyperlinkIndex
+from docx import Document
+
+from docx_builder import StyleContext, DocxBuilder, register_character_styles
+from html_backends import parse_html
 
 
 class TestCleanFilename:
@@ -33,6 +36,187 @@ class TestStyleContext:
         assert ctx.bold and not ctx.italic
 
 
+def _build(html, backend="html.parser", styles=False):
+    root = parse_html(html, backend).find('div', id='r')
+    doc = Document()
+    if styles:
+        register_character_styles(doc)
+    builder = DocxBuilder(doc)
+    builder.process_node(root)
+    builder.close_paragraph()
+    return doc, builder
+
+
+class TestWalker:
+    @pytest.mark.parametrize("backend", ["html.parser", "lxml-native"])
+    def test_deep_nesting_kept(self, backend):
+        n = 1500
+        html = '<div id="r">' + '<span>x' * n + '</span>' * n + '</div>'
+        doc, builder = _build(html, backend)
+        assert doc.paragraphs[-1].text == 'x' * n
+        assert builder.stats.subtrees_skipped == 0
+        assert builder.stats.nodes_visited == 2 * n + 1
+
+    def test_order_with_lists_and_quotes(self):
+        html = ('<div id="r">a<ul><li>b<ol><li>c</li></ol></li><li>d</li></ul>'
+                '<blockquote>e</blockquote>f</div>')
+        doc, _ = _build(html)
+        texts = [p.text for p in doc.paragraphs if p.text]
+        assert texts == ['a', 'b', 'c', 'd', 'e', 'f']
+
+    def test_too_deep_list_counted(self):
+        depth = DocxBuilder.MAX_LIST_DEPTH + 2
+        html = ('<div id="r">' + '<ul><li>x' * depth
+                + '</li></ul>' * depth + '</div>')
+        doc, builder = _build(html)
+        assert sum(p.text == 'x' for p in doc.paragraphs) == DocxBuilder.MAX_LIST_DEPTH
+        assert builder.stats.subtrees_skipped == 1
+
+
+class TestRunCoalescing:
+    def test_same_style_one_run(self):
+        doc, _ = _build('<div id="r"><span>a </span>b<span> c</span></div>')
+        runs = doc.paragraphs[-1].runs
+        assert [r.text for r in runs] == ['a b c']
+
+    def test_style_change_splits(self):
+        doc, _ = _build('<div id="r">a <b>b</b><b> c</b> d</div>')
+        runs = doc.paragraphs[-1].runs
+        assert [r.text for r in runs] == ['a ', 'b c', ' d']
+        assert [bool(r.bold) for r in runs] == [False, True, False]
+
+    def test_link_keeps_order(self):
+        doc, _ = _build('<div id="r">see <a href="https://x.org">x</a> now</div>')
+        assert doc.paragraphs[-1].text == 'see x now'
+
+
+class TestCharacterStyles:
+    HTML = ('<div id="r"><code>x = 1</code><br><span class="bb_spoiler">s</span>'
+            '<blockquote>q <span class="bb_spoiler">qs</span></blockquote></div>')
+
+    def test_named_styles(self):
+        doc, _ = _build(self.HTML, styles=True)
+        runs = [r for p in doc.paragraphs for r in p.runs]
+        assert [r.style.name for r in runs] == [
+            'Guide Code', 'Guide Spoiler', 'Guide Quote', 'Guide Spoiler Quote',
+        ]
+        # Оформление — в стиле, а не в каждом run
+        assert runs[0].font.name is None
+        assert doc.styles['Guide Code'].font.name == 'Courier New'
+        assert doc.styles['Guide Spoiler Quote'].font.italic
+
+    def test_direct_fallback(self):
+        doc, _ = _build(self.HTML)
+        runs = [r for p in doc.paragraphs for r in p.runs]
+        assert runs[0].font.name == 'Courier New'
+        assert runs[2].italic and runs[3].italic
+
+    def test_register_twice(self):
+        doc = Document()
+        register_character_styles(doc)
+        register_character_styles(doc)
+        assert 'Guide Code' in doc.styles
+
+
+class TestTable:
+    HTML = ('<div id="r"><div class="bb_table">'
+            '<div class="bb_table_tr"><div class="bb_table_th">Item</div>'
+            '<div class="bb_table_th">Dmg</div></div>'
+            '<div class="bb_table_tr"><div class="bb_table_td">Sword</div></div>'
+            '<div class="bb_table_tr"><div class="bb_table_td">Bow</div>'
+            '<div class="bb_table_td">9</div><div class="bb_table_td">ranged</div></div>'
+            '</div></div>')
+
+    def test_ragged_rows(self):
+        doc, _ = _build(self.HTML)
+        table = doc.tables[0]
+        assert len(table.columns) == 3
+        assert [[c.text for c in row.cells] for row in table.rows] == [
+            ['Item', 'Dmg', ''], ['Sword', '', ''], ['Bow', '9', 'ranged'],
+        ]
+
+    def test_header_row(self):
+        doc, _ = _build(self.HTML)
+        rows = doc.tables[0].rows
+        assert rows[0].cells[0].paragraphs[0].runs[0].bold
+        assert not rows[1].cells[0].paragraphs[0].runs[0].bold
+        assert rows[0]._tr.xpath('./w:trPr/w:tblHeader')
+        assert not rows[1]._tr.xpath('./w:trPr/w:tblHeader')
+
+
+class TestBuilderStats:
+    def test_counts(self):
+        doc, builder = _build(
+            '<div id="r">a<br><br><br>b <b>c</b>'
+            '<a href="https://x.org">x</a><ul><li>i</li></ul></div>'
+        )
+        stats = builder.stats
+        assert stats.empty_paragraphs == 2
+        # a, пустые ×2, «b c x», пункт списка
+        assert stats.paragraphs == len(doc.paragraphs) == 5
+        # a | b | c (жирный) | ссылка | i
+        assert stats.runs == 5
+        assert stats.content_lost == 0
+
+    def test_content_loss(self):
+        html = ('<div id="r"><img src="https://127.0.0.1:9/none.png">'
+                '<div class="bb_table"><div class="bb_table_tr"><div class="bb_table_td">'
+                '<div class="bb_table"><div class="bb_table_tr">'
+                '<div class="bb_table_td">inner</div></div></div>'
+                '</div></div></div></div>')
+        root = parse_html(html, 'html.parser').find('div', id='r')
+        builder = DocxBuilder(Document(), image_loader=lambda *a, **k: None)
+        builder.process_node(root)
+        builder.close_paragraph()
+        stats = builder.stats
+        assert stats.images_skipped == 1
+        # Счётчик ячейки — общий с внешним построителем
+        assert stats.tables == 1 and stats.table_fallbacks == 1
+        assert stats.content_lost == 2
+
+
+class TestHyperlinkIndex:
+    @staticmethod
+    def _links(use_index):
+        from io import BytesIO
+        from PIL import Image
+        doc = Document()
+        index = HyperlinkIndex(doc.part) if use_index else None
+        for n in range(30):
+            p = doc.add_paragraph()
+            add_hyperlink(p, f"https://example.com/{n % 12}", f"link {n}", index=index)
+            if n % 7 == 0:
+                buf = BytesIO()
+                Image.new("RGB", (4, 4), (n, 0, 0)).save(buf, "PNG")
+                buf.seek(0)
+                doc.add_picture(buf)
+        rels = {r_id: (rel.reltype, rel.target_ref)
+                for r_id, rel in doc.part.rels.items()}
+        return doc.element.xml, rels
+
+    def test_same_as_relate_to(self):
+        assert self._links(True) == self._links(False)
+
+    def test_repeated_url_one_rel(self):
+        doc = Document()
+        index = HyperlinkIndex(doc.part)
+        before = len(doc.part.rels)
+        ids = {index.rid("https://a.org") for _ in range(5)}
+        assert len(ids) == 1 and len(doc.part.rels) == before + 1
+
+
+class TestDocumentTemplate:
+    def test_copies_are_independent(self):
+        from parser import GuideDownloader
+        a = GuideDownloader.new_document()
+        b = GuideDownloader.new_document()
+        a.add_paragraph("only in a")
+        assert len(a.paragraphs) == 1 and len(b.paragraphs) == 0
+        assert a.part.package is not b.part.package
+        assert 'Guide Code' in b.styles
+        assert b.styles['Normal'].font.name == 'Calibri'
+
+
 class TestValidatePath:
     def test_valid_existing(self, tmp_path):
         ok, result = validate_save_path(str(tmp_path))
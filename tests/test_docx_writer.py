@@ -0,0 +1,90 @@
+import pytest
+import sys, os
+import zipfile
+from io import BytesIO
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+from docx_writer import StreamingDocxWriter, StreamedImagePart, TMP_SUFFIX
+
+
+def _png(color) -> BytesIO:
+    buf = BytesIO()
+    Image.new("RGB", (40, 20), color).save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+
+def _fill(doc):
+    doc.add_heading("Title", 0)
+    for color in ("red", "green", "red"):
+        doc.add_paragraph(f"Picture {color}")
+        doc.add_paragraph().add_run().add_picture(_png(color), width=Inches(1))
+
+
+def test_same_parts_as_doc_save(tmp_path):
+    ref = tmp_path / "ref.docx"
+    doc = Document()
+    _fill(doc)
+    doc.save(ref)
+
+    out = tmp_path / "out.docx"
+    doc = Document()
+    writer = StreamingDocxWriter(str(out))
+    writer.attach(doc)
+    _fill(doc)
+    writer.save(doc)
+
+    with zipfile.ZipFile(ref) as a, zipfile.ZipFile(out) as b:
+        assert sorted(a.namelist()) == sorted(b.namelist())
+        for name in a.namelist():
+            assert a.read(name) == b.read(name), name
+    # Одинаковые картинки — одна часть
+    assert len([n for n in b.namelist() if n.startswith("word/media/")]) == 2
+    assert not os.path.exists(str(out) + TMP_SUFFIX)
+    assert len(Document(str(out)).inline_shapes) == 3
+
+
+def test_image_bytes_not_kept(tmp_path):
+    doc = Document()
+    writer = StreamingDocxWriter(str(tmp_path / "out.docx"))
+    writer.attach(doc)
+    _fill(doc)
+    parts = list(doc.part.package.image_parts)
+    assert parts and all(isinstance(p, StreamedImagePart) for p in parts)
+    assert all(p.blob == b"" for p in parts)
+    assert writer.streamed_bytes > 0
+    writer.abort()
+
+
+def test_abort_removes_partial(tmp_path):
+    out = tmp_path / "out.docx"
+    doc = Document()
+    writer = StreamingDocxWriter(str(out))
+    writer.attach(doc)
+    _fill(doc)
+    assert os.path.exists(str(out) + TMP_SUFFIX)
+    writer.abort()
+    assert not os.path.exists(str(out) + TMP_SUFFIX)
+    assert not out.exists()
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_media_stored_xml_deflated(tmp_path, stream):
+    out = tmp_path / "out.docx"
+    doc = Document()
+    writer = StreamingDocxWriter(str(out), compress_level=1)
+    if stream:
+        writer.attach(doc)
+    _fill(doc)
+    writer.save(doc)
+    with zipfile.ZipFile(out) as zf:
+        for info in zf.infolist():
+            if info.filename.startswith("word/media/"):
+                assert info.compress_type == zipfile.ZIP_STORED
+            elif info.filename.endswith(".xml"):
+                assert info.compress_type == zipfile.ZIP_DEFLATED
+    assert len(Document(str(out)).inline_shapes) == 3
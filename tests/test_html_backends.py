@@ -0,0 +1,66 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FIXTURES_DIR, GUIDE_PAGES, read_docx_text
+from html_backends import (
+    available_backends, parse_guide, parse_html, resolve_backend,
+)
+
+
+@pytest.mark.parametrize("page", GUIDE_PAGES)
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_same_docx_text(build_guide, page, backend):
+    reference = read_docx_text(build_guide(page, html_parser="html.parser"))
+    assert read_docx_text(build_guide(page, html_parser=backend)) == reference
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_find_api(backend):
+    root = parse_html(
+        '<div class="a b" id="x">t<span class="b">s</span>u</div>', backend
+    )
+    assert root.find("div", class_="a b").get("id") == "x"
+    assert root.find("div", id="x").get("class") == ["a", "b"]
+    assert len(root.find_all(class_="b")) == 2
+    assert root.find("div").get_text() == "tsu"
+
+
+def test_auto_resolves():
+    assert resolve_backend("auto") in available_backends()
+
+
+@pytest.mark.parametrize("page", GUIDE_PAGES)
+@pytest.mark.parametrize("backend", available_backends())
+def test_partial_parse_same_docx_text(build_guide, page, backend):
+    full = read_docx_text(build_guide(page, html_parser=backend,
+                                      partial_parse=False))
+    assert read_docx_text(build_guide(page, html_parser=backend)) == full
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_regions_single_pass(backend):
+    with open(os.path.join(FIXTURES_DIR, "guide_sections.html"),
+              encoding="utf-8") as f:
+        regions = parse_guide(f.read(), backend)
+    assert regions.title == "Beginner's Handbook: Tips & Tricks"
+    assert [s.title.get_text(strip=True) for s in regions.sections] == [
+        "Introduction", "Item stats", "Empty section"]
+    assert len(regions.images) == 2
+
+
+@pytest.mark.parametrize("partial", [True, False])
+@pytest.mark.parametrize("backend", available_backends())
+def test_section_ends_with_its_div(backend, partial):
+    html = (
+        '<div class="workshopItemTitle">T</div><div class="guide subSections">'
+        '<div class="subSection detailBox"><div class="subSectionTitle">A</div>'
+        '</div><div class="subSectionTitle">stray</div>'
+        '<div class="subSectionDesc">stray <img src="http://x/1.jpg"></div></div>'
+        '<img src="http://x/outside.jpg">'
+    )
+    regions = parse_guide(html, backend, partial=partial)
+    [section] = regions.sections
+    assert section.title.get_text(strip=True) == "A"
+    assert section.desc is None
+    assert regions.images == ["http://x/1.jpg"]
@@ -0,0 +1,31 @@
+import pytest
+import sys, os
+from io import BytesIO
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network import ImageCache, SQLiteImageCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return ImageCache(max_size=2)
+    return SQLiteImageCache(str(tmp_path / "c.sqlite"), max_size=2)
+
+
+class TestImageCache:
+    def test_roundtrip(self, cache):
+        assert cache.get("a") is None
+        cache.put("a", BytesIO(b"123"))
+        assert cache.get("a").read() == b"123"
+
+    def test_eviction(self, cache):
+        for key in ("a", "b", "c"):
+            cache.put(key, BytesIO(key.encode()))
+        assert cache.get("c") is not None
+        assert sum(cache.get(k) is not None for k in ("a", "b", "c")) == 2
+
+    def test_shared_file(self, tmp_path):
+        path = str(tmp_path / "c.sqlite")
+        SQLiteImageCache(path).put("u", BytesIO(b"x"))
+        assert SQLiteImageCache(path).get("u").read() == b"x"
@@ -0,0 +1,44 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_store import MediaStore
+
+
+class TestMediaStore:
+    def test_dedup_across_guides(self, tmp_path):
+        probe = tmp_path / "probe"
+        probe.write_bytes(b"")
+        try:
+            os.link(probe, tmp_path / "probe-link")
+        except OSError:
+            pytest.skip("ФС без жёстких ссылок")
+        store = MediaStore(str(tmp_path / "store"))
+        images = {"http://a/header.png": b"header", "http://a/x.png": b"x"}
+        first = store.export(images, str(tmp_path / "g1"))
+        second = store.export(images, str(tmp_path / "g2"))
+        assert first["new"] == 2 and second["new"] == 0
+        assert (tmp_path / "g2" / "img_001.png").read_bytes() == b"header"
+        assert first["linked"] == second["linked"] == 2
+        report = store.report()
+        assert report["blobs"] == 2 and report["dedup_ratio"] == 2.0
+
+    def test_copy_fallback_still_counted(self, tmp_path, monkeypatch):
+        def no_link(src, dest):
+            raise OSError("links not supported")
+        monkeypatch.setattr(os, "link", no_link)
+        store = MediaStore(str(tmp_path / "store"))
+        images = {"http://a/header.png": b"header", "http://a/x.png": b"x"}
+        store.export(images, str(tmp_path / "g1"))
+        second = store.export(images, str(tmp_path / "g2"))
+        assert second["linked"] == 0
+        assert (tmp_path / "g2" / "img_001.png").read_bytes() == b"header"
+        report = store.report()
+        assert report["blobs"] == 2 and report["references"] == 4
+        assert report["dedup_ratio"] == 2.0
+
+    def test_same_blob_once(self, tmp_path):
+        store = MediaStore(str(tmp_path))
+        p1, new1 = store.add(b"data", ".png")
+        p2, new2 = store.add(b"data", ".png")
+        assert p1 == p2 and new1 and not new2
@@ -0,0 +1,32 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AppConfig
+from benchmarks.bench_suite import BENCHES, run_suite
+from benchmarks.compare import compare, format_report, load
+from benchmarks.fixtures import load_fixtures
+
+# Проверка скорости против эталона — только по запросу:
+#   PERF_BASELINE=base.json [PERF_BENCHES=parse,build] pytest tests/test_perf_gate.py
+BASELINE = os.environ.get("PERF_BASELINE")
+
+
+@pytest.mark.skipif(not BASELINE, reason="PERF_BASELINE не задан")
+def test_no_regressions():
+    base = load(BASELINE)
+    meta = base.get("meta", {})
+    benches = os.environ.get("PERF_BENCHES", ",".join(
+        b for b in BENCHES if b != "batch")).split(",")
+    config = AppConfig(html_parser=meta.get("html_parser", "auto"),
+                       docx_backend=meta.get("docx_backend", "ooxml"))
+    # Только руководства, которые есть в эталоне
+    names = {name.split("/", 1)[1] for name in base["results"]}
+    pages = {name: html for name, html in
+             load_fixtures(os.environ.get("PERF_FIXTURES", "")).items()
+             if name in names}
+    new = run_suite(benches, pages, config, repeat=meta.get("repeat", 5),
+                    latency=meta.get("latency", 0.0),
+                    bandwidth=meta.get("bandwidth", 0))
+    comparisons = compare(base, new)
+    assert not any(c.regressed for c in comparisons), format_report(comparisons)
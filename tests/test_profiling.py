@@ -0,0 +1,38 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pstats
+
+from config import AppConfig
+from profiling import COLLAPSED_EXT, MEMORY_EXT, PROFILE_EXT, JobProfiler
+
+
+def test_off_by_default():
+    assert JobProfiler.from_config(AppConfig()) is None
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sampling"])
+def test_profile_files_next_to_docx(build_guide, mode):
+    path = build_guide("guide_sections.html", profile=mode,
+                       profile_interval=0.001, profile_memory=True)
+    base = os.path.splitext(path)[0]
+    stats = pstats.Stats(base + PROFILE_EXT)
+    assert stats.total_tt > 0
+    with open(base + COLLAPSED_EXT, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    counts = []
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and stack
+        counts.append(int(count))
+    if mode == "cprofile":
+        assert any(name == "parse_guide" for _, _, name in stats.stats)
+        assert any("parse_guide (" in line for line in lines)
+        # Микросекунды собственного времени — почти всё время профиля
+        assert sum(counts) == pytest.approx(stats.total_tt * 1e6, rel=0.05)
+
+    with open(base + MEMORY_EXT, encoding="utf-8") as f:
+        report = f.read()
+    for stage in ("parse", "build", "save"):
+        assert f"== {stage}:" in report
@@ -0,0 +1,67 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from config import AppConfig
+from network import HostRateLimiter, create_session
+from benchmarks.faults import FaultPlan, FaultRule
+from benchmarks.steam_server import StandInServer
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    path = str(tmp_path / "rate.sqlite") if request.param == "sqlite" else ""
+    limiter = HostRateLimiter(page_rate=1, image_rate=20, burst=2, path=path)
+    yield limiter
+    limiter.close()
+
+
+def test_burst_then_paced(limiter, request):
+    host = f"{request.node.name}.cdn.test"
+    assert limiter.acquire(host) == 0
+    assert limiter.acquire(host) == 0
+    assert limiter.acquire(host) == pytest.approx(0.05, abs=0.02)
+    assert limiter.ceiling("steamcommunity.com") == 1
+
+
+def test_throttle_cuts_rate_once_and_pauses(limiter, request):
+    host = f"{request.node.name}.cdn.test"
+    limiter.acquire(host)
+    limiter.throttled(host, retry_after=0.2)
+    # Второй 429 той же пачки — без повторного снижения
+    limiter.throttled(host, retry_after=0.2)
+    assert limiter.throttles == 2
+    # Пауза 0.2 с + токен при скорости 10/с
+    assert limiter.acquire(host) == pytest.approx(0.3, abs=0.05)
+
+
+def test_shared_between_processes(tmp_path):
+    path = str(tmp_path / "rate.sqlite")
+    first = HostRateLimiter(0, 10, burst=1, path=path)
+    second = HostRateLimiter(0, 10, burst=1, path=path)
+    assert first.acquire("img.test") == 0
+    assert second.acquire("img.test") == pytest.approx(0.1, abs=0.03)
+    # Без файла корзины у каждого ограничителя свои
+    first, second = HostRateLimiter(0, 10, burst=1), HostRateLimiter(0, 10, burst=1)
+    assert first.acquire("img.test") == 0
+    assert second.acquire("img.test") == 0
+
+
+def test_session_honours_retry_after_once(tmp_path):
+    # 429 в первые полсекунды: один повтор через Retry-After, без двойного сна
+    plan = FaultPlan([FaultRule("429", 1.0, retry_after=1, end=0.5)])
+    config = AppConfig(retry_backoff=0, rate_limit_images=20,
+                       rate_limit_file=str(tmp_path / "r.sqlite"))
+    limiter = HostRateLimiter.from_config(config)
+    session = create_session(config, limiter=limiter)
+    with StandInServer({}, faults=plan) as server:
+        start = time.perf_counter()
+        response = session.get(server.base_url + "/ugc/1/", timeout=5)
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert server.requests == 2 and limiter.throttles == 1
+    assert 0.9 < elapsed < 1.8
+    # По умолчанию выключен
+    assert HostRateLimiter.from_config(AppConfig()) is None
@@ -0,0 +1,92 @@
+import pytest
+import sys, os, json, queue, threading, time
+import urllib.request, urllib.error, urllib.parse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AppConfig
+from server import JobManager, create_server, JOB_DONE, JOB_QUEUED
+
+GUIDE = "https://steamcommunity.com/sharedfiles/filedetails/?id=1"
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(AppConfig(), str(tmp_path), workers=1, queue_size=1)
+
+
+class TestJobManager:
+    def test_queue_bounded(self, manager):
+        job = manager.submit([GUIDE])
+        assert job.state == JOB_QUEUED
+        with pytest.raises(queue.Full):
+            manager.submit([GUIDE])
+
+    def test_cached_result(self, manager, tmp_path):
+        out = tmp_path / "guide.docx"
+        out.write_bytes(b"x")
+        manager._results[(GUIDE, False)] = (time.time(), [str(out)])
+        job = manager.submit([GUIDE])
+        assert job.state == JOB_DONE
+        assert job.to_dict()["files"] == ["guide.docx"]
+
+    def test_result_cache_pruned(self, manager, tmp_path):
+        out = tmp_path / "guide.docx"
+        out.write_bytes(b"x")
+        manager.MAX_RESULTS_KEPT = 2
+        manager._results[("old", False)] = (time.time() - 10 ** 6, [str(out)])
+        for n in range(3):
+            manager._store_result(f"{GUIDE}{n}", False, [str(out)])
+        assert list(manager._results) == [(f"{GUIDE}1", False), (f"{GUIDE}2", False)]
+
+    def test_failed_pdf_not_cached_as_pdf(self, manager, tmp_path):
+        out = tmp_path / "guide.docx"
+        out.write_bytes(b"x")
+        manager._store_result(GUIDE, True, [str(out)])
+        assert manager._cached_files(GUIDE, True) is None
+        assert manager._cached_files(GUIDE, False) == [str(out)]
+
+
+class TestHTTP:
+    def test_bad_url_and_status(self, manager):
+        server = create_server(manager, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            req = urllib.request.Request(
+                base + "/jobs", data=json.dumps({"url": "https://x.com"}).encode(),
+                method="POST",
+            )
+            with pytest.raises(urllib.error.HTTPError) as e:
+                urllib.request.urlopen(req)
+            assert e.value.code == 400
+
+            req = urllib.request.Request(
+                base + "/jobs", data=json.dumps({"urls": [GUIDE]}).encode(),
+                method="POST",
+            )
+            with urllib.request.urlopen(req) as r:
+                job_id = json.load(r)["id"]
+            with urllib.request.urlopen(f"{base}/jobs/{job_id}") as r:
+                assert json.load(r)["state"] == JOB_QUEUED
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_download_cyrillic_name(self, manager, tmp_path):
+        out = tmp_path / "Гайд.docx"
+        out.write_bytes(b"docx")
+        manager._results[(GUIDE, False)] = (time.time(), [str(out)])
+        job = manager.submit([GUIDE])
+        server = create_server(manager, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            url = f"{base}/jobs/{job.id}/files/{urllib.parse.quote(out.name)}"
+            with urllib.request.urlopen(url) as r:
+                assert r.read() == b"docx"
+                disposition = r.headers["Content-Disposition"]
+            assert 'filename="____.docx"' in disposition
+            assert "filename*=UTF-8''%D0%93%D0%B0%D0%B9%D0%B4.docx" in disposition
+        finally:
+            server.shutdown()
+            server.server_close()
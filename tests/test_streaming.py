@@ -0,0 +1,30 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FIXTURES_DIR
+from streaming import GuideStreamScanner
+
+
+def scan(page, chunk_size):
+    with open(os.path.join(FIXTURES_DIR, page), encoding="utf-8") as f:
+        html = f.read()
+    found = {"title": [], "section": [], "image": []}
+    scanner = GuideStreamScanner(
+        on_title=found["title"].append,
+        on_section=found["section"].append,
+        on_image=found["image"].append,
+    )
+    for i in range(0, len(html), chunk_size):
+        scanner.feed(html[i:i + chunk_size])
+    return found, scanner
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_scanner_reports_early(chunk_size):
+    found, scanner = scan("guide_sections.html", chunk_size)
+    assert found["title"] == ["Beginner's Handbook: Tips & Tricks"]
+    assert found["section"] == ["Introduction", "Item stats", "Empty section"]
+    assert len(found["image"]) == 2
+    # Комментарии не сканируются
+    assert scanner.done
@@ -0,0 +1,116 @@
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tracemalloc
+from io import BytesIO
+
+from PIL import Image
+
+from conftest import FIXTURES_DIR
+from config import AppConfig
+from archive import ArchiveImageCache, OfflineSession
+from parser import GuideDownloader
+from telemetry import (
+    JobTelemetry, current_rss, percentile, read_records, start_tracing,
+    stop_tracing, summarize, summary_path,
+)
+from batch import report_telemetry
+
+
+def _png() -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (8, 8), (0, 0, 255)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_nested_stage_is_excluded_from_parent():
+    telemetry = JobTelemetry("u")
+    with telemetry.stage("build"):
+        time.sleep(0.02)
+        with telemetry.stage("image_io"):
+            time.sleep(0.05)
+    stages = telemetry.record()["stages"]
+    assert stages["image_io"]["wall"] >= 0.05
+    assert 0.02 <= stages["build"]["wall"] < 0.05
+
+
+@pytest.mark.skipif(current_rss() is None, reason="RSS только из /proc")
+def test_peak_rss_seen_inside_stage():
+    telemetry = JobTelemetry("u")
+    size = 64 * 1024 * 1024
+    with telemetry.stage("build"):
+        blob = b"x" * size
+        with telemetry.stage("image_io"):
+            pass
+        del blob
+    memory = telemetry.record()["memory"]
+    # Блок освобождён до конца задания, но пик его помнит
+    assert memory["peak_rss"] - memory["rss"] > size // 2
+
+
+def test_percentile_interpolates():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([7], 95) == 7
+
+
+def test_summarize_flattens_numeric_fields():
+    records = [
+        {"url": "a", "ok": True, "wall": 1.0, "stages": {"parse": {"wall": 0.1}}},
+        {"url": "b", "ok": False, "wall": 3.0, "stages": {"parse": {"wall": 0.3}}},
+    ]
+    summary = summarize(records)
+    assert summary["guides"] == 2 and summary["ok"] == 1
+    assert summary["metrics"]["wall"]["p50"] == 2.0
+    assert summary["metrics"]["stages.parse.wall"]["max"] == 0.3
+    assert "ok" not in summary["metrics"]
+    # Пик процесса за всю жизнь — не метрика руководства
+    records[0]["memory"] = {"process_peak_rss": 10, "rss": 5}
+    assert set(summarize(records)["metrics"]) == {
+        "wall", "stages.parse.wall", "memory.rss"}
+
+
+def test_download_emits_record(tmp_path):
+    with open(os.path.join(FIXTURES_DIR, "guide_sections.html"),
+              encoding="utf-8") as f:
+        html = f.read()
+    records_path = str(tmp_path / "runs.jsonl")
+    config = AppConfig(telemetry_file=records_path)
+    downloader = GuideDownloader(
+        config, session=OfflineSession(),
+        image_cache=ArchiveImageCache({
+            "https://images.steamusercontent.com/ugc/1/AAA/": _png(),
+        }),
+    )
+    result = downloader.download(
+        "https://steamcommunity.com/sharedfiles/filedetails/?id=1",
+        str(tmp_path / "out"), "en", lambda msg: None, lambda: None, html=html,
+    )
+    assert result.ok
+    record = result.telemetry
+    assert read_records(records_path) == [record]
+    assert {"parse", "build", "image_io", "save"} <= set(record["stages"])
+    assert record["images"] == {"requested": 2, "loaded": 1, "failed": 1}
+    assert record["cache"]["hit_rate"] == 1.0
+    assert record["bytes"]["page"] == 0  # страница не скачивалась
+
+    summary = report_telemetry(config, [result], lambda msg: None)
+    assert summary["metrics"]["stages.save.wall"]["count"] == 1
+    assert os.path.exists(summary_path(records_path))
+
+
+def test_tracing_shared_between_jobs():
+    assert not tracemalloc.is_tracing()
+    start_tracing()
+    start_tracing()
+    # Второе задание не сбрасывает пик первого
+    blob = bytearray(4 * 1024 * 1024)
+    del blob
+    assert stop_tracing() >= 4 * 1024 * 1024
+    # Первое задание закончилось — замер второго продолжается
+    assert tracemalloc.is_tracing()
+    assert stop_tracing() >= 4 * 1024 * 1024
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,123 @@
+import pytest
+import sys, os, io, random, threading, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from config import AppConfig
+from parser import DownloadResult, GuideDownloader
+from watcher import GuideWatcher, _HostSlotSession, normalize_guide
+from conftest import FIXTURES_DIR
+
+
+def make_watcher(tmp_path, ids, **cfg):
+    config = AppConfig(watch_jitter=0.0, **cfg)
+    return GuideWatcher(config, ids, str(tmp_path), rng=random.Random(0))
+
+
+class TestSchedule:
+    def test_backoff_and_speedup(self, tmp_path):
+        w = make_watcher(tmp_path, ["1"], watch_min_interval=100,
+                         watch_max_interval=1000, watch_budget_per_hour=0)
+        e = w.entries["1"]
+        for _ in range(10):
+            w._reschedule(e, changed=False)
+        assert e.interval == 1000
+        w._reschedule(e, changed=True)
+        assert e.interval == 500
+
+    def test_failed_fetch_not_backed_off(self, tmp_path):
+        w = make_watcher(tmp_path, ["1"], watch_min_interval=100,
+                         watch_max_interval=1000, watch_budget_per_hour=0)
+        e = w.entries["1"]
+        e.interval = 800
+
+        class Down:
+            def get(self, url, **kwargs):
+                raise requests.ConnectionError("down")
+        w.session = Down()
+        w._run_entry(e)
+        assert e.interval == 800 and e.errors == 1 and e.checks == 0
+        assert e.next_check - time.time() == pytest.approx(100, abs=1)
+
+    def test_budget_stretches(self, tmp_path):
+        ids = [str(i) for i in range(100)]
+        w = make_watcher(tmp_path, ids, watch_min_interval=3600,
+                         watch_budget_per_hour=10)
+        assert w._budget_factor() == pytest.approx(10.0)
+
+
+def test_normalize_guide():
+    assert normalize_guide("123") == "123"
+    assert normalize_guide(
+        "https://steamcommunity.com/sharedfiles/filedetails/?id=9") == "9"
+    assert normalize_guide("https://google.com") is None
+
+
+class _EtagSession:
+    """Страница с ETag: 304, если клиент прислал тот же"""
+
+    def __init__(self, html: str):
+        self.html = html
+
+    def get(self, url, headers=None, timeout=None):
+        response = requests.Response()
+        response.headers["ETag"] = '"v2"'
+        if (headers or {}).get("If-None-Match") == '"v2"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = self.html.encode("utf-8")
+        return response
+
+
+def test_failed_rebuild_is_retried(tmp_path, monkeypatch):
+    with open(os.path.join(FIXTURES_DIR, "guide_sections.html"), encoding="utf-8") as f:
+        html = f.read()
+    w = make_watcher(tmp_path, ["1"])
+    w.session = _EtagSession(html)
+    outcomes = [[], [str(tmp_path / "guide.docx")]]
+    monkeypatch.setattr(
+        GuideDownloader, "download",
+        lambda self, url, *args, **kwargs: DownloadResult(url, files=outcomes.pop(0)),
+    )
+    entry = w.entries["1"]
+    # Пересборка не удалась — ETag не запоминается, и повтор не получит 304
+    assert not w.check(entry)
+    assert entry.etag == "" and entry.fingerprint == ""
+    assert w.check(entry)
+    assert entry.etag == '"v2"' and entry.fingerprint
+    assert not w.check(entry)
+
+
+def test_image_requests_capped_per_host(tmp_path):
+    w = make_watcher(tmp_path, ["1"], watch_per_host=2)
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    lock = threading.Lock()
+
+    class Slow:
+        def get(self, url, **kwargs):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            response = requests.Response()
+            response.status_code = 404
+            response.raw = io.BytesIO(b"")
+            return response
+
+    session = _HostSlotSession(Slow(), w._host_slot, 1024)
+    threads = [
+        threading.Thread(target=session.get, args=(f"https://{host}/ugc/{n}/",),
+                         kwargs={"stream": True})
+        for host in ("images.steamusercontent.com", "cdn.test") for n in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == {"images.steamusercontent.com": 2, "cdn.test": 2}
@@ -39,6 +39,11 @@ TRANSLATIONS = {
         "log_sections_found": "Found {} sections",
         "log_processing": "Processing: {}",
         "log_file_target": "Target: {}",
+        "log_archive_saved": "Archive saved: {}",
+        "log_images_exported": "Images: {} ({} new in store) → {}",
+        "log_peak_memory": "Peak memory: {} MB",
+        "log_content_lost": "⚠ Skipped: {} images, {} tables, {} nested blocks",
+        "log_profile_saved": "Profile: {}",
         "err_net": "Network error:",
         "msg_error": "Error",
         "msg_warning": "Warning",
@@ -88,6 +93,11 @@ TRANSLATIONS = {
         "log_sections_found": "Найдено секций: {}",
         "log_processing": "Обработка: {}",
         "log_file_target": "Целевой файл: {}",
+        "log_archive_saved": "Архив сохранён: {}",
+        "log_images_exported": "Изображения: {} (новых в хранилище: {}) → {}",
+        "log_peak_memory": "Пик памяти: {} МБ",
+        "log_content_lost": "⚠ Пропущено: изображений {}, таблиц {}, вложенных блоков {}",
+        "log_profile_saved": "Профиль: {}",
         "err_net": "Ошибка сети:",
         "msg_error": "Ошибка",
         "msg_warning": "Предупреждение",
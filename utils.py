@@ -3,6 +3,7 @@
 import re
 import os
 import logging
+from copy import deepcopy
 
 from docx.shared import RGBColor
 from docx.oxml.ns import qn
@@ -72,7 +73,61 @@ def add_horizontal_line(paragraph):
         logger.warning(f"Ошибка горизонтальной линии: {e}")
 
 
-def add_hyperlink(paragraph, url, text, color=None, underline=True):
+RT_HYPERLINK = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+
+class HyperlinkIndex:
+    """
+    URL → rId внешних ссылок одной части документа.
+    part.relate_to() ищет совпадение и свободный rId перебором всех
+    связей — на сотнях ссылок это квадратично. Здесь оба шага O(1);
+    rId выдаются те же, что выдал бы python-docx.
+    """
+
+    def __init__(self, part):
+        self.part = part
+        self._rels = part.rels
+        self._by_url = {
+            rel.target_ref: r_id for r_id, rel in self._rels.items()
+            if rel.is_external and rel.reltype == RT_HYPERLINK
+        }
+        self._next = 1
+
+    def rid(self, url: str) -> str:
+        r_id = self._by_url.get(url)
+        if r_id is None:
+            # Связи не удаляются — все номера ниже _next заняты
+            while f"rId{self._next}" in self._rels:
+                self._next += 1
+            r_id = f"rId{self._next}"
+            self._rels.add_relationship(RT_HYPERLINK, url, r_id, is_external=True)
+            self._by_url[url] = r_id
+        return r_id
+
+
+# Готовые rPr ссылок: (цвет, подчёркивание) → элемент для копирования
+_HYPERLINK_RPR = {}
+
+
+def _hyperlink_rpr(color, underline):
+    key = (str(color) if color else None, bool(underline))
+    template = _HYPERLINK_RPR.get(key)
+    if template is None:
+        template = OxmlElement('w:rPr')
+        if color:
+            c_elem = OxmlElement('w:color')
+            c_elem.set(qn('w:val'), color.rgb if hasattr(color, 'rgb') else "0563C1")
+            template.append(c_elem)
+        if underline:
+            u = OxmlElement('w:u')
+            u.set(qn('w:val'), 'single')
+            template.append(u)
+        _HYPERLINK_RPR[key] = template
+    return deepcopy(template)
+
+
+def add_hyperlink(paragraph, url, text, color=None, underline=True, index=None):
+    """index — HyperlinkIndex части документа (без него — part.relate_to)"""
     if color is None:
         color = RGBColor(0x05, 0x63, 0xC1)
 
@@ -80,25 +135,14 @@ def add_hyperlink(paragraph, url, text, color=None, underline=True):
         return paragraph.add_run(text)
 
     try:
-        part = paragraph.part
-        r_id = part.relate_to(
-            url,
-            "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
-            is_external=True
-        )
+        if index is not None:
+            r_id = index.rid(url)
+        else:
+            r_id = paragraph.part.relate_to(url, RT_HYPERLINK, is_external=True)
         hyperlink = OxmlElement('w:hyperlink')
         hyperlink.set(qn('r:id'), r_id)
         new_run = OxmlElement('w:r')
-        rPr = OxmlElement('w:rPr')
-        if color:
-            c_elem = OxmlElement('w:color')
-            c_elem.set(qn('w:val'), color.rgb if hasattr(color, 'rgb') else "0563C1")
-            rPr.append(c_elem)
-        if underline:
-            u = OxmlElement('w:u')
-            u.set(qn('w:val'), 'single')
-            rPr.append(u)
-        new_run.append(rPr)
+        new_run.append(_hyperlink_rpr(color, underline))
         new_run.text = text
         hyperlink.append(new_run)
         paragraph._p.append(hyperlink)
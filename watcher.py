@@ -0,0 +1,311 @@
+"""
+Режим наблюдения — поддерживает зеркало руководств в актуальном состоянии
+
+Каждое руководство перепроверяется по расписанию с джиттером:
+условный GET (If-None-Match / If-Modified-Since), затем сравнение
+отпечатка содержимого. Файлы пересобираются только при изменениях.
+Редко меняющиеся руководства проверяются всё реже, часто
+редактируемые — чаще; общий бюджет запросов в час растягивает
+интервалы, так что объём запросов растёт сублинейно. Сбой проверки
+интервал не растягивает: повтор — через watch_min_interval.
+
+Не больше watch_per_host одновременных запросов на хост — и к
+страницам, и к CDN картинок во время пересборки.
+"""
+
+import os
+import json
+import time
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, fields
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from config import AppConfig
+from network import create_session, URLValidator, ImageCache
+from parser import GuideDownloader
+from html_backends import parse_guide
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".watch_state.json"
+
+# Множители интервала после проверки
+GROWTH_UNCHANGED = 1.5
+SHRINK_CHANGED = 0.5
+
+
+@dataclass
+class WatchEntry:
+    guide_id: str
+    url: str
+    interval: float
+    next_check: float = 0.0
+    etag: str = ""
+    last_modified: str = ""
+    fingerprint: str = ""
+    checks: int = 0
+    changes: int = 0
+    errors: int = 0
+    last_changed: float = 0.0
+
+
+class _HostSlotSession:
+    """
+    Сессия для пересборки: каждый запрос занимает слот своего хоста.
+    Потоковый ответ дочитывается под слотом (картинки всё равно читаются
+    целиком), иначе передача тела шла бы уже без ограничения
+    """
+
+    def __init__(self, session, host_slot: Callable, max_bytes: int):
+        self._session = session
+        self._host_slot = host_slot
+        self._max_bytes = max_bytes
+
+    def get(self, url, **kwargs):
+        with self._host_slot(url):
+            response = self._session.get(url, **kwargs)
+            if kwargs.get("stream"):
+                length = response.headers.get("content-length", "")
+                if (response.ok and not
+                        (length.isdigit() and int(length) > self._max_bytes)):
+                    response.content
+                else:
+                    response.close()
+            return response
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def normalize_guide(value: str) -> Optional[str]:
+    """ID или ссылка → ID руководства"""
+    value = value.strip()
+    if value.isdigit():
+        return value
+    ok, result = URLValidator.validate(value)
+    if ok:
+        return URLValidator.extract_guide_id(result)
+    return None
+
+
+class GuideWatcher:
+    def __init__(self, config: AppConfig, guide_ids: list[str],
+                 save_dir: str, log_func: Optional[Callable] = None,
+                 rng: Optional[random.Random] = None):
+        self.config = config
+        self.save_dir = save_dir
+        self.log_func = log_func or (lambda msg: None)
+        self._rng = rng or random.Random()
+        self._per_host = config.watch_per_host
+        self.session = create_session(config, pool_size=self._per_host * 2)
+        self.image_cache = ImageCache(max_size=200)
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heap: list[tuple[float, str]] = []
+        self.entries: dict[str, WatchEntry] = {}
+
+        saved = self._load_state()
+        for gid in guide_ids:
+            url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={gid}"
+            entry = saved.get(gid) or WatchEntry(
+                gid, url, float(config.watch_min_interval)
+            )
+            self.entries[gid] = entry
+            heapq.heappush(self._heap, (entry.next_check, gid))
+
+    # ------------------------------------------
+    # Состояние
+    # ------------------------------------------
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.save_dir, STATE_FILE)
+
+    def _load_state(self) -> dict[str, WatchEntry]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        known = {f.name for f in fields(WatchEntry)}
+        result = {}
+        for gid, raw in data.items():
+            try:
+                result[gid] = WatchEntry(
+                    **{k: v for k, v in raw.items() if k in known}
+                )
+            except TypeError:
+                continue
+        return result
+
+    def _save_state(self):
+        with self._lock:
+            data = {gid: asdict(e) for gid, e in self.entries.items()}
+        tmp = self.state_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения состояния: {e}")
+
+    # ------------------------------------------
+    # Планировщик
+    # ------------------------------------------
+
+    def _budget_factor(self) -> float:
+        """Во сколько раз растянуть интервалы, чтобы уложиться в бюджет"""
+        budget = self.config.watch_budget_per_hour
+        if budget <= 0:
+            return 1.0
+        with self._lock:
+            rate = sum(3600.0 / e.interval for e in self.entries.values())
+        return max(1.0, rate / budget)
+
+    def _reschedule(self, entry: WatchEntry, changed: Optional[bool]):
+        """changed: True/False — итог проверки, None — сбой"""
+        lo = float(self.config.watch_min_interval)
+        hi = float(self.config.watch_max_interval)
+        if changed is None:
+            # Сбой ничего не говорит о стабильности руководства
+            delay = lo
+        else:
+            factor = SHRINK_CHANGED if changed else GROWTH_UNCHANGED
+            entry.interval = min(hi, max(lo, entry.interval * factor))
+            delay = entry.interval
+        delay *= self._budget_factor()
+        jitter = self.config.watch_jitter
+        delay *= 1.0 + self._rng.uniform(-jitter, jitter)
+        entry.next_check = time.time() + delay
+        with self._lock:
+            heapq.heappush(self._heap, (entry.next_check, entry.guide_id))
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self._per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    # ------------------------------------------
+    # Проверка одного руководства
+    # ------------------------------------------
+
+    def check(self, entry: WatchEntry) -> Optional[bool]:
+        """
+        Проверить руководство: True — файлы пересобраны, False — без
+        изменений, None — сбой загрузки или пересборки
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        with self._host_slot(entry.url):
+            try:
+                response = self.session.get(
+                    entry.url, headers=headers, timeout=self.config.timeout
+                )
+            except requests.RequestException as e:
+                logger.warning(f"Наблюдение {entry.guide_id}: {e}")
+                entry.errors += 1
+                return None
+
+        entry.checks += 1
+        if response.status_code == 304:
+            return False
+        if response.status_code != 200:
+            logger.warning(
+                f"Наблюдение {entry.guide_id}: HTTP {response.status_code}"
+            )
+            entry.errors += 1
+            return None
+
+        # Валидаторы сохраняются только вместе с учтённым содержимым:
+        # иначе после неудачной пересборки следующая проверка получит 304
+        etag = response.headers.get("ETag", "")
+        last_modified = response.headers.get("Last-Modified", "")
+        response.encoding = "utf-8"
+        html = response.text
+        fingerprint = GuideDownloader.content_fingerprint(
+            parse_guide(html, self.config.html_parser,
+                        partial=self.config.partial_parse)
+        )
+        if fingerprint == entry.fingerprint:
+            entry.etag, entry.last_modified = etag, last_modified
+            return False
+
+        self.log_func(f"Changed: {entry.guide_id}")
+        downloader = GuideDownloader(
+            self.config, image_cache=self.image_cache,
+            session=_HostSlotSession(
+                self.session, self._host_slot,
+                self.config.max_image_size_mb * 1024 * 1024,
+            ),
+        )
+        result = downloader.download(
+            entry.url, self.save_dir, self.config.language,
+            self.log_func, lambda: None, self.config.convert_to_pdf,
+            html=html,
+        )
+        if not result.ok:
+            entry.errors += 1
+            return None
+        entry.etag, entry.last_modified = etag, last_modified
+        entry.fingerprint = fingerprint
+        entry.changes += 1
+        entry.last_changed = time.time()
+        return True
+
+    def _run_entry(self, entry: WatchEntry):
+        changed = None
+        try:
+            changed = self.check(entry)
+        except Exception as e:
+            entry.errors += 1
+            logger.error(f"Наблюдение {entry.guide_id}: {e}", exc_info=True)
+        finally:
+            self._reschedule(entry, changed)
+            self._save_state()
+
+    # ------------------------------------------
+    # Главный цикл
+    # ------------------------------------------
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, once: bool = False):
+        """Крутиться до stop(); once=True — один проход по всем"""
+        os.makedirs(self.save_dir, exist_ok=True)
+        workers = max(1, self._per_host)
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix="Watch") as pool:
+            if once:
+                list(pool.map(self._run_entry, list(self.entries.values())))
+                return
+            while not self._stop.is_set():
+                with self._lock:
+                    due = self._heap[0][0] if self._heap else None
+                if due is None:
+                    # Все руководства сейчас в работе
+                    self._stop.wait(1.0)
+                    continue
+                wait = due - time.time()
+                if wait > 0:
+                    self._stop.wait(min(wait, 5.0))
+                    continue
+                with self._lock:
+                    _, gid = heapq.heappop(self._heap)
+                pool.submit(self._run_entry, self.entries[gid])